@@ -20,6 +20,16 @@ download_offline_data:
 tests: install_requirements ## Execute tests
 	export PYTHONPATH=$PYTHONPATH:$(pwd) && pytest .
 
+.PHONY: benchmarks
+benchmarks: install_requirements ## Execute performance benchmarks
+	python -m benchmarks.benchmark_compound_correlations
+	python -m benchmarks.benchmark_config_generator
+	python -m benchmarks.benchmark_file_ingest
+	python -m benchmarks.benchmark_pairwise_approximate
+	python -m benchmarks.benchmark_pairwise_correlations
+	python -m benchmarks.benchmark_serialization
+	python -m benchmarks.benchmark_tsfel_extract
+
 .PHONY: lint
 lint: install_requirements ## Lint the code
 	flake8 $(shell find . -name '*.py')
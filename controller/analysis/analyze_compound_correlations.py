@@ -14,16 +14,154 @@
 
 import logging
 
+import numpy as np
 import pandas as pd
 import statsmodels.api as sm
+import common.configuration_api as api
+from scipy import stats
 from abc import ABC
+from analysis.analyze_pairwise_correlations import merge_top_k, normalize_features
 from analysis.analyzer import Analyzer
 from common.configuration_api import InsightsAnalysisChainType
 
 logger = logging.getLogger(__name__)
 
+# relative cutoff of the singular values of the designs, as statsmodels' pinv
+RCOND = 1e-15
+
+
+def ols_pvalues(designs, responses):
+    """
+    p-values of the coefficients of the ordinary least squares fits of the `responses` (... x m observations) on
+    the `designs` (... x m x p), for a whole stack of fits at once; as statsmodels `OLS(...).fit().pvalues`,
+    rank deficient designs get the minimum norm solution and fits without residual degrees of freedom get NaN.
+    """
+    pinvs = np.linalg.pinv(designs, rcond=RCOND)
+    params = (pinvs @ responses[..., None])[..., 0]
+    df_resid = designs.shape[-2] - np.linalg.matrix_rank(designs)
+    residuals = responses - (designs @ params[..., None])[..., 0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = (residuals * residuals).sum(axis=-1) / df_resid
+        bse = np.sqrt(scale[..., None] * (pinvs * pinvs).sum(axis=-1))
+        tvalues = params / bse
+        return 2 * stats.t.sf(np.abs(tvalues), np.asarray(df_resid)[..., None])
+
+
+class LeaveOneOutRegressions:
+    """
+    The regressions of each signal (column of the features x signals matrix `features`) on a constant and all the
+    other signals, derived from a single SVD of the shared design `[1, features]` instead of one fit per signal.
+    With A = U S V^T (rank r), removing the column j of A keeps the rank r unless the column j is not spanned by
+    the other columns (leverage V[j] . V[j] == 1). When it is spanned, the signal is fitted exactly (no residual) by
+    the minimum norm coefficients V V[j] / (1 - leverage), so every predictor with a non zero coefficient is
+    significant as long as the fit has residual degrees of freedom (m - r > 0). The (at most r) signals not spanned
+    by the others are fitted one by one.
+    """
+
+    def __init__(self, features, block_size=1024):
+        self.design = np.column_stack([np.ones(len(features)), features])
+        self.block_size = block_size
+        _, singular_values, vt = np.linalg.svd(self.design, full_matrices=False)
+        # the rank as numpy's matrix_rank (used by statsmodels)
+        tolerance = singular_values.max(initial=0) * max(self.design.shape) * np.finfo(np.float64).eps
+        self.rank = int((singular_values > tolerance).sum())
+        self.vectors = vt[:self.rank].T
+        self.leverages = (self.vectors * self.vectors).sum(axis=1)
+        self.df_resid = len(self.design) - self.rank
+        self.spanned = self.leverages[1:] < 1 - 1e-9
+
+    def coefficients(self, columns):
+        # the minimum norm coefficients of the exact fits of the spanned signals `columns` (design columns x signals)
+        indexes = np.asarray(columns) + 1
+        coefficients = self.vectors @ self.vectors[indexes].T / (1 - self.leverages[indexes])
+        coefficients[indexes, np.arange(len(indexes))] = 0
+        return coefficients
+
+    def significant(self, threshold):
+        """
+        Whether each signal has significant predictors (p-value below `threshold`).
+        """
+        size = self.design.shape[1] - 1
+        has_predictors = np.zeros(size, dtype=bool)
+        if self.df_resid > 0:
+            for start in range(0, size, self.block_size):
+                columns = np.arange(start, min(start + self.block_size, size))
+                columns = columns[self.spanned[columns]]
+                coefficients = self.nonzero(self.coefficients(columns))
+                has_predictors[columns] = coefficients[1:].any(axis=0)
+        for column in np.flatnonzero(~self.spanned):
+            has_predictors[column] = len(self.predictors(column, threshold)) > 0
+        return has_predictors
+
+    def predictors(self, column, threshold):
+        """
+        The significant predictors (p-value below `threshold`) of the signal `column`, as signal indexes.
+        """
+        if self.spanned[column]:
+            if self.df_resid <= 0:
+                return np.empty(0, dtype=np.int64)
+            significant = self.nonzero(self.coefficients([column]))[1:, 0]
+        else:
+            pvalues = ols_pvalues(np.delete(self.design, column + 1, axis=1), self.design[:, column + 1])
+            significant = np.insert(pvalues[1:] < threshold, column, False)
+        return np.flatnonzero(significant)
+
+    @staticmethod
+    def nonzero(coefficients):
+        # coefficients above the rounding errors of the columns of coefficients
+        return np.abs(coefficients) > np.abs(coefficients).max(axis=0, initial=0) * 1e-9
+
+
+class CandidateRegressions:
+    """
+    The regressions of each signal (column of the features x signals matrix `features`) on a constant and only
+    its `top_k` most correlated signals (absolute pearson correlation over the features), batched in a single
+    stack of least squares fits. With few features per signal, restricting the predictors leaves residual
+    degrees of freedom, so the p-values of the fits are meaningful.
+    """
+
+    def __init__(self, features, top_k, threshold, block_size=2048):
+        size = features.shape[1]
+        self.top_k = max(0, min(top_k, size - 1))
+        self.candidates = self.top_candidates(features, self.top_k, block_size)
+        designs = np.concatenate([np.ones((size, len(features), 1)),
+                                  np.moveaxis(features[:, np.maximum(self.candidates, 0)], 0, 1)], axis=2)
+        # signals with less candidates (NaN correlations) get zero predictors, never significant
+        designs[:, :, 1:] *= self.candidates[:, None, :] >= 0
+        pvalues = ols_pvalues(designs, features.T)
+        self.significant_predictors = (pvalues[:, 1:] < threshold) & (self.candidates >= 0)
+
+    @staticmethod
+    def top_candidates(features, top_k, block_size):
+        # the indexes of the top_k signals with the highest absolute correlation with each signal (-1 if none)
+        vectors = normalize_features(features.T, api.GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_PEARSON.value)
+        size = len(vectors)
+        top_indexes = np.full((size, top_k), -1, dtype=np.int64)
+        top_values = np.full((size, top_k), np.nan)
+        for start in range(0, size, block_size):
+            end = min(start + block_size, size)
+            for column_start in range(0, size, block_size):
+                column_end = min(column_start + block_size, size)
+                tile = np.abs(vectors[start:end] @ vectors[column_start:column_end].T)
+                # a signal is not its own candidate
+                tile[np.arange(start, end)[:, None] == np.arange(column_start, column_end)] = np.nan
+                top_indexes[start:end], top_values[start:end] = merge_top_k(
+                    top_indexes[start:end], top_values[start:end], np.arange(column_start, column_end), tile, False)
+        top_indexes[np.isnan(top_values)] = -1
+        return top_indexes
+
+    def significant(self, threshold):
+        return self.significant_predictors.any(axis=1)
+
+    def predictors(self, column, threshold):
+        return np.sort(self.candidates[column][self.significant_predictors[column]])
+
 
 class CompoundCorrelationAnalyzer(Analyzer, ABC):
+    # this is an opinionated list of selected features used to commute the linear correlation between
+    # multiple independent signals and the dependent signal
+    required_features = ["value_Min", "value_Max", "value_Mean", "value_Var", "value_PeakToPeakDistance",
+                         "value_AbsoluteEnergy"]
 
     def analyze(self, *args, **kwargs):
         # This method is using the original raw signals, this is not really working well,
@@ -35,20 +173,60 @@ class CompoundCorrelationAnalyzer(Analyzer, ABC):
         signals = self.get_filtered_signals()
         compound_similarity_threshold = kwargs.get("compound_similarity_threshold")
 
+        selected_features = self.required_features
+
+        # features x signals matrix, one column per signal name (the last signal of a name)
+        features, _ = signals.features_matrix(selected_features)
+        positions = {}
+        for position, signal in enumerate(signals.signals):
+            positions[signal.metadata["__name__"]] = position
+        signals_features_matrix = pd.DataFrame(features[list(positions.values())].T, index=selected_features,
+                                               columns=list(positions))
+
+        threshold = 1.0 - compound_similarity_threshold
+        compound_engine = kwargs.get("compound_engine") or \
+            api.CompoundCorrelationEngine.COMPOUND_CORRELATION_STATSMODELS.value
+        if compound_engine == api.CompoundCorrelationEngine.COMPOUND_CORRELATION_STATSMODELS.value:
+            if kwargs.get("compound_top_k") is not None:
+                raise ValueError("compound_top_k requires compound_engine: batched")
+            dependent_signals, predictors = self.statsmodels_regressions(signals_features_matrix, threshold)
+        elif compound_engine == api.CompoundCorrelationEngine.COMPOUND_CORRELATION_BATCHED.value:
+            dependent_signals, predictors = self.batched_regressions(signals_features_matrix, threshold,
+                                                                     kwargs.get("compound_top_k"))
+        else:
+            raise ValueError(f"unsupported compound correlation engine {compound_engine}")
+
         # will hold the signals we need to keep based on the analysis
-        signals_to_keep = []
+        signals_to_keep = set(signals_features_matrix.columns) - set(dependent_signals)
+
+        compound_insights = "Based on compound correlation relationship predictions we can also reduce:\n"
+        compound_insights += "-=-=--=-=-=--=-=-=--=-=-=--=-=-=--=\n"
+        signals_to_reduce = []
+        for the_signal in dependent_signals:
+            # skip signals that are used to predict other signals
+            if the_signal in signals_to_keep:
+                continue
+            constructed_from = predictors(the_signal)
 
-        # this is an opinionated list of selected features used to commute the linear correlation between
-        # multiple independent signals and the dependent signal
-        selected_features = ["value_Min", "value_Max", "value_Mean", "value_Var", "value_PeakToPeakDistance",
-                             "value_AbsoluteEnergy"]
+            compound_insights += \
+                (f'<a href="javascript:void(0);" onclick="submitForm(&apos;{the_signal}&apos;);">'
+                 f'{the_signal}</a> - it is constructed from '
+                 f'{constructed_from}\n\n')
 
-        signals_features_matrix = pd.DataFrame()
-        for signal in signals.signals:
-            signals_features_matrix[signal.metadata["__name__"]] = (
-                signal.metadata["extracted_features"][selected_features].transpose())
+            signals_to_reduce.append(
+                {"signal": the_signal, "constructed_from": constructed_from})
+            signals_to_keep.update(constructed_from)
+        compound_insights += "-=-=--=\n\n"
 
-        threshold = 1.0 - compound_similarity_threshold
+        logging.debug(f"\n\n{compound_insights}\n")
+        self.tag_signals_by_names([signal["signal"] for signal in signals_to_reduce],
+                                  InsightsAnalysisChainType.INSIGHTS_ANALYSIS_COMPOUND_CORRELATIONS.value)
+        return self.get_signals(), compound_insights
+
+    @staticmethod
+    def statsmodels_regressions(signals_features_matrix, threshold):
+        # one statsmodels OLS per signal, on all the other signals: the signals with significant predictors, in order,
+        # and their predictors
         dependent_signals = {}
         for the_signal in signals_features_matrix.columns:
             features_matrix_to_test = signals_features_matrix.drop(columns=[
@@ -68,29 +246,23 @@ class CompoundCorrelationAnalyzer(Analyzer, ABC):
                     f"The significant predictors for {the_signal} are: {significant_signal_predictors}")
                 dependent_signals[the_signal] = significant_signal_predictors
             else:
-                signals_to_keep += [the_signal]
                 logger.debug(
                     f"The significant predictors for {the_signal} are: None")
+        return list(dependent_signals), dependent_signals.get
 
-        compound_insights = "Based on compound correlation relationship predictions we can also reduce:\n"
-        compound_insights += "-=-=--=-=-=--=-=-=--=-=-=--=-=-=--=\n"
-        signals_to_reduce = []
-        for the_signal in dependent_signals:
-            # skip signals that are used to predict other signals
-            if the_signal in signals_to_keep:
-                continue
-
-            compound_insights += \
-                (f'<a href="javascript:void(0);" onclick="submitForm(&apos;{the_signal}&apos;);">'
-                 f'{the_signal}</a> - it is constructed from '
-                 f'{dependent_signals[the_signal]}\n\n')
+    @staticmethod
+    def batched_regressions(signals_features_matrix, threshold, top_k=None):
+        # the regressions of all the signals derived at once, on all the other signals or on their top_k candidates
+        names = list(signals_features_matrix.columns)
+        features = signals_features_matrix.to_numpy(dtype=np.float64)
+        regressions = CandidateRegressions(features, top_k, threshold) if top_k else LeaveOneOutRegressions(features)
+        has_predictors = regressions.significant(threshold)
+        logger.info(f"compound correlations of {len(names)} signals: {int(has_predictors.sum())} signals with "
+                    f"significant predictors")
+        columns = {name: column for column, name in enumerate(names)}
 
-            signals_to_reduce.append(
-                {"signal": the_signal, "constructed_from": dependent_signals[the_signal]})
-            signals_to_keep += dependent_signals[the_signal]
-        compound_insights += "-=-=--=\n\n"
+        def predictors(name):
+            # the predictors are only listed for the reduced signals (they can be all the other signals)
+            return [names[index] for index in regressions.predictors(columns[name], threshold).tolist()]
 
-        logging.debug(f"\n\n{compound_insights}\n")
-        self.tag_signals_by_names([signal["signal"] for signal in signals_to_reduce],
-                                  InsightsAnalysisChainType.INSIGHTS_ANALYSIS_COMPOUND_CORRELATIONS.value)
-        return self.get_signals(), compound_insights
+        return [names[column] for column in np.flatnonzero(has_predictors).tolist()], predictors
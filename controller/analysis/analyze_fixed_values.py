@@ -21,6 +21,7 @@ logger = logging.getLogger(__name__)
 
 
 class FixedValuesAnalyzer(Analyzer, ABC):
+    required_features = ["value_Min", "value_Max", "value_Var"]
 
     def analyze(self, *args, **kwargs):
         """
@@ -30,16 +31,18 @@ class FixedValuesAnalyzer(Analyzer, ABC):
         signals = self.get_filtered_signals()
 
         fixed_value_signals = []
+        fixed_value_signals_set = set()
         fixed_value_insights = "Based on analysis, the following signals have fixed values:\n"
         fixed_value_insights += "-=-=--=-=-=--=-=-=--=-=-=--=-=-=--=\n"
-        for signal in signals:
-            if signal.metadata["__name__"] in fixed_value_signals:
+        features, _ = signals.features_matrix(self.required_features)
+        fixed_value = (features[:, 0] == features[:, 1]) & (features[:, 2] == 0)
+        for signal, is_fixed_value in zip(signals, fixed_value.tolist()):
+            if signal.metadata["__name__"] in fixed_value_signals_set:
                 continue
-            if ((signal.metadata["extracted_features"]["value_Min"][0] ==
-                 signal.metadata["extracted_features"]["value_Max"][0]) and
-                    signal.metadata["extracted_features"]["value_Var"][0] == 0):
+            if is_fixed_value:
                 signal_name = signal.metadata["__name__"]
                 fixed_value_signals.append(signal_name)
+                fixed_value_signals_set.add(signal_name)
                 fixed_value_insights += \
                     (f'<a href="javascript:void(0);" onclick="submitForm(&apos;{signal_name}&apos;);">'
                      f'{signal_name}</a> - Signal has fixed value\n')
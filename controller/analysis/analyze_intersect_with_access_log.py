@@ -22,6 +22,7 @@ logger = logging.getLogger(__name__)
 
 
 class AccessLogIntersectionAnalyzer(Analyzer, ABC):
+    required_features = []
 
     def analyze(self, *args, **kwargs):
         """
@@ -21,6 +21,7 @@ logger = logging.getLogger(__name__)
 
 
 class MetadataClassificationAnalyzer(Analyzer, ABC):
+    required_features = []
 
     def analyze(self, *args, **kwargs):
         """
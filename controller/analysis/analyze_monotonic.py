@@ -13,49 +13,61 @@
 #  limitations under the License.
 
 import logging
+
+import numpy as np
 from abc import ABC
 from analysis.analyzer import Analyzer
 from common.configuration_api import InsightsAnalysisChainType
+from common.signal_store import segment_changes
 
 logger = logging.getLogger(__name__)
 
 
+def monotonic_changes(signals):
+    """
+    Number of increases, of decreases and of counter resets between the consecutive samples of each of the
+    `signals` (see `segment_changes`), computed over the columnar samples of all the signals at once. Signals without
+    samples (trimmed by the extract) use the changes kept in their metadata (`monotonic_changes`) when their samples
+    were discarded.
+    """
+    store = signals.samples_store()
+    increases, decreases, resets = segment_changes(store.values, store.offsets)
+    lengths = store.lengths
+    for index, signal in enumerate(signals):
+        if lengths[index] == 0 and "monotonic_changes" in signal.metadata:
+            changes = signal.metadata["monotonic_changes"]
+            increases[index], decreases[index] = changes[:2]
+            # changes kept before the counter resets were counted: none of the decreases is a reset
+            resets[index] = changes[2] if len(changes) > 2 else 0
+    return increases, decreases, resets
+
+
 class MonotonicAnalyzer(Analyzer, ABC):
+    required_features = []
 
     def analyze(self, *args, **kwargs):
         """
-        Find signals which are monotonic
+        Find signals which are monotonic: never increasing, or never decreasing except for up to
+        `monotonic_counter_resets` counter resets (decreases towards zero, see `segment_changes`)
         """
 
         signals = self.get_filtered_signals()
+        counter_resets = kwargs.get("monotonic_counter_resets") or 0
+
+        increases, decreases, resets = monotonic_changes(signals)
+        # the counter resets are only tolerated in increasing signals: all their decreases must be resets
+        monotonic = (increases == 0) | ((decreases == resets) & (resets <= counter_resets))
+        # a name is monotonic if any of its signals is monotonic
+        monotonic_signals = list(dict.fromkeys(signals.signals[index].metadata["__name__"]
+                                               for index in np.flatnonzero(monotonic).tolist()))
 
-        monotonic_signals = []
         monotonic_insights = "Based on analysis, the following signals are monotonic:\n"
         monotonic_insights += "-=-=--=-=-=--=-=-=--=-=-=--=-=-=--=\n"
-        for signal in signals:
-            if signal.metadata["__name__"] in monotonic_signals:
-                continue
-            if self.monotonic_inc(signal) or self.monotonic_dec(signal):
-                signal_name = signal.metadata["__name__"]
-                monotonic_signals.append(signal_name)
-                monotonic_insights += \
-                    (f'<a href="javascript:void(0);" onclick="submitForm(&apos;{signal_name}&apos;);">'
-                     f'{signal_name}</a> - Signal is monotonic\n')
+        for signal_name in monotonic_signals:
+            monotonic_insights += \
+                (f'<a href="javascript:void(0);" onclick="submitForm(&apos;{signal_name}&apos;);">'
+                 f'{signal_name}</a> - Signal is monotonic\n')
         monotonic_insights += "-=-=--=\n\n"
 
         self.tag_signals_by_names(monotonic_signals, InsightsAnalysisChainType.INSIGHTS_ANALYSIS_MONOTONIC.value)
         return self.get_signals(), monotonic_insights
-
-    def monotonic_inc(self, signal):
-        # assuming the time series is in order
-        for k in range(len(signal.time_series)-1):
-            if signal.time_series[k][1] < signal.time_series[k+1][1]:
-                return False
-        return True
-
-    def monotonic_dec(self, signal):
-        # assuming the time series is in order
-        for k in range(len(signal.time_series)-1):
-            if signal.time_series[k][1] > signal.time_series[k+1][1]:
-                return False
-        return True
@@ -17,15 +17,259 @@ import logging
 import numpy as np
 import pandas as pd
 import common.configuration_api as api
-from scipy.spatial.distance import pdist, squareform
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial.distance import cdist, pdist, squareform
+from scipy.stats import rankdata
 from abc import ABC
 from analysis.analyzer import Analyzer
+from common.access_log import AccessLog
 from common.configuration_api import InsightsAnalysisChainType
 
 logger = logging.getLogger(__name__)
 
 
+def first_correlated(corr_matrix, threshold, distance=False, block_size=1024):
+    """
+    For each signal (column `j` of the square `corr_matrix`), the first signal (row `i < j`) correlated with it:
+    with a correlation above `threshold`, or with a distance up to `threshold` (`distance`); -1 if there is none.
+    The matrix is scanned by blocks of `block_size` columns, so that the comparisons hold at most
+    n x `block_size` booleans.
+    """
+    size = len(corr_matrix)
+    first = np.full(size, -1, dtype=np.int64)
+    for start in range(0, size, block_size):
+        end = min(start + block_size, size)
+        if end < 2:
+            # the first signal has no signal before it
+            continue
+        # only the rows above the diagonal (upper triangle) of the columns of the block
+        block = corr_matrix[:end - 1, start:end]
+        hits = block <= threshold if distance else block > threshold
+        hits &= np.arange(end - 1)[:, None] < np.arange(start, end)
+        found = hits.any(axis=0)
+        first[start:end][found] = hits.argmax(axis=0)[found]
+    return first
+
+
+def correlated_pairs(corr_matrix, threshold, distance=False, block_size=1024):
+    """
+    The pairs (i < j) of signals of the square `corr_matrix` with a correlation above `threshold`,
+    or with a distance up to `threshold` (`distance`), as two arrays of i and j sorted by (i, j).
+    The matrix is scanned by blocks of `block_size` rows.
+    """
+    rows, columns = [], []
+    for start in range(0, len(corr_matrix), block_size):
+        block = corr_matrix[start:start + block_size]
+        hits = block <= threshold if distance else block > threshold
+        hits &= np.arange(start, start + len(block))[:, None] < np.arange(len(corr_matrix))
+        block_rows, block_columns = np.nonzero(hits)
+        rows.append(start + block_rows)
+        columns.append(block_columns)
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(rows), np.concatenate(columns)
+
+
+def redundancy_clusters(size, rows, columns, priority=None):
+    """
+    Clusters of redundant signals: the connected components of the graph of the `size` signals with an edge
+    between the correlated signals `rows[k]` and `columns[k]`, whatever the order of the signals or of the edges.
+    Returns, for each signal, its cluster label and the representative signal of its cluster: the signal of the
+    cluster with the lowest `priority` (the first signal of the cluster on ties, or without `priority`).
+    """
+    graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, columns)), shape=(size, size))
+    _, labels = connected_components(graph, directed=False)
+    if priority is None:
+        priority = np.zeros(size)
+    # the signals sorted by cluster, then by priority and position: the first signal of each cluster represents it
+    order = np.lexsort((np.arange(size), priority, labels))
+    cluster_starts = np.flatnonzero(np.diff(labels[order], prepend=-1))
+    representatives = np.empty(size, dtype=np.int64)
+    representatives[labels[order[cluster_starts]]] = order[cluster_starts]
+    return labels, representatives[labels]
+
+
+def normalize_features(features, method):
+    # rows of the (signals x features) matrix centered and scaled so that the (pearson or spearman) correlation
+    # of two signals is the dot product of their rows; signals with constant features get NaN (no correlation)
+    if method == api.GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_SPEARMAN.value:
+        features = rankdata(features, axis=1)
+    centered = features - features.mean(axis=1, keepdims=True)
+    norms = np.sqrt((centered * centered).sum(axis=1, keepdims=True))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return centered / norms
+
+
+def merge_top_k(top_indexes, top_values, candidate_indexes, candidate_values, distance):
+    # merge the candidate neighbors (a row of values per signal) into the top-k neighbors of the signals
+    values = np.concatenate([top_values, candidate_values], axis=1)
+    indexes = np.concatenate([top_indexes, np.broadcast_to(candidate_indexes, candidate_values.shape)], axis=1)
+    keys = values if distance else -values
+    keys = np.where(np.isnan(keys), np.inf, keys)
+    keep = np.argpartition(keys, top_indexes.shape[1] - 1, axis=1)[:, :top_indexes.shape[1]]
+    return np.take_along_axis(indexes, keep, axis=1), np.take_along_axis(values, keep, axis=1)
+
+
+def blocked_correlations(features, threshold, method, distance_method="", block_size=2048, top_k=10):
+    """
+    Pairwise correlations (or distances, with the `distance` method) of the signals (rows of the
+    signals x features matrix `features`), computed tile by tile over blocks of `block_size` signals
+    so that the n x n matrix is never held. Returns:
+    - for each signal, the first signal before it correlated with it (as `first_correlated`);
+    - the sparse edge list of the correlated pairs (i < j): arrays of i, j and the correlation (or distance);
+    - the indexes and values of the `top_k` most correlated (or closest) signals of each signal,
+      most correlated first (index -1 when there are fewer signals).
+    """
+    distance = method == api.GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_DISTANCE.value
+    if method == api.GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_KENDALL.value:
+        raise ValueError("the kendall similarity method is not supported by the blocked pairwise correlations, "
+                         "use the pearson or spearman method or the dense mode")
+    vectors = np.asarray(features, dtype=np.float64) if distance else normalize_features(features, method)
+    size = len(vectors)
+    first = np.full(size, -1, dtype=np.int64)
+    edges = []
+    top_k = min(top_k, size - 1) if size else 0
+    top_indexes = np.full((size, top_k), -1, dtype=np.int64)
+    top_values = np.full((size, top_k), np.nan)
+
+    for row_start in range(0, size, block_size):
+        row_end = min(row_start + block_size, size)
+        rows = vectors[row_start:row_end]
+        # the tiles of the upper triangle, the row blocks of each column block are visited in order
+        for column_start in range(row_start, size, block_size):
+            column_end = min(column_start + block_size, size)
+            columns = vectors[column_start:column_end]
+            tile = cdist(rows, columns, metric=distance_method) if distance else rows @ columns.T
+            upper = np.arange(row_start, row_end)[:, None] < np.arange(column_start, column_end)
+            hits = (tile <= threshold if distance else tile > threshold) & upper
+
+            found = hits.any(axis=0) & (first[column_start:column_end] < 0)
+            first[column_start:column_end][found] = row_start + hits.argmax(axis=0)[found]
+            hit_rows, hit_columns = np.nonzero(hits)
+            edges.append((row_start + hit_rows, column_start + hit_columns, tile[hit_rows, hit_columns]))
+
+            if top_k:
+                if column_start == row_start:
+                    # a signal is not its own neighbor
+                    tile = np.where(np.arange(len(rows))[:, None] == np.arange(len(columns)), np.nan, tile)
+                top_indexes[row_start:row_end], top_values[row_start:row_end] = merge_top_k(
+                    top_indexes[row_start:row_end], top_values[row_start:row_end],
+                    np.arange(column_start, column_end), tile, distance)
+                if column_start != row_start:
+                    top_indexes[column_start:column_end], top_values[column_start:column_end] = merge_top_k(
+                        top_indexes[column_start:column_end], top_values[column_start:column_end],
+                        np.arange(row_start, row_end), tile.T, distance)
+
+    # edges sorted by (i, j), neighbors sorted by decreasing correlation (increasing distance)
+    edge_rows, edge_columns, edge_values = (np.concatenate(parts) for parts in zip(*edges)) if edges else \
+        (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+    order = np.lexsort((edge_columns, edge_rows))
+    keys = top_values if distance else -top_values
+    order_top = np.argsort(np.where(np.isnan(keys), np.inf, keys), axis=1, kind="stable")
+    top_indexes = np.take_along_axis(top_indexes, order_top, axis=1)
+    top_values = np.take_along_axis(top_values, order_top, axis=1)
+    top_indexes[np.isnan(top_values)] = -1
+    return first, (edge_rows[order], edge_columns[order], edge_values[order]), (top_indexes, top_values)
+
+
+def bucket_pairs(members, vectors, threshold, block_size):
+    # the pairs (i < j) of the signals `members` (sorted indexes) of a hash bucket with a correlation above
+    # `threshold`, verified exactly tile by tile
+    pairs = []
+    for row_start in range(0, len(members), block_size):
+        rows = members[row_start:row_start + block_size]
+        for column_start in range(row_start, len(members), block_size):
+            columns = members[column_start:column_start + block_size]
+            tile = vectors[rows] @ vectors[columns].T
+            hits = (tile > threshold) & (rows[:, None] < columns)
+            hit_rows, hit_columns = np.nonzero(hits)
+            pairs.append((rows[hit_rows], columns[hit_columns], tile[hit_rows, hit_columns]))
+    return pairs
+
+
+def approximate_correlations(features, threshold, method, tables=16, bits=12, block_size=2048, top_k=10, seed=0):
+    """
+    Approximate pairwise correlations of the signals (rows of the signals x features matrix `features`):
+    the normalized feature vectors are hashed by `tables` random projections of `bits` hyperplanes each
+    (signed random projections, the probability that two signals share a bucket grows with their correlation),
+    and only the pairs of signals sharing a bucket in some table are verified exactly against `threshold`.
+    More tables raise the recall, more bits per table lower the number of candidate pairs (faster, lower recall).
+    Returns the same results as `blocked_correlations`, for the correlated pairs found:
+    - for each signal, the first signal before it found correlated with it (-1 if none was found);
+    - the sparse edge list of the correlated pairs found (i < j): arrays of i, j and the correlation;
+    - the indexes and values of (up to) the `top_k` most correlated signals found for each signal.
+    """
+    if method not in (api.GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_PEARSON.value,
+                      api.GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_SPEARMAN.value):
+        raise ValueError(f"the {method} similarity method is not supported by the approximate pairwise "
+                         f"correlations, use the pearson or spearman method or the blocked mode")
+    if not 0 < bits < 63:
+        raise ValueError(f"the number of bits per hash table must be between 1 and 62, got {bits}")
+    vectors = normalize_features(np.asarray(features, dtype=np.float64), method)
+    size = len(vectors)
+    # signals with constant features have no correlation, they are not hashed
+    valid = np.flatnonzero(~np.isnan(vectors).any(axis=1))
+    random = np.random.default_rng(seed)
+    weights = np.left_shift(1, np.arange(bits, dtype=np.int64))
+
+    pairs = []
+    for _ in range(tables):
+        hyperplanes = random.normal(size=(vectors.shape[1], bits))
+        codes = ((vectors[valid] @ hyperplanes) > 0) @ weights
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+        for start, end in zip(np.concatenate([[0], boundaries]), np.concatenate([boundaries, [len(order)]])):
+            if end - start > 1:
+                pairs.extend(bucket_pairs(np.sort(valid[order[start:end]]), vectors, threshold, block_size))
+
+    # the pairs found in several tables are kept once, sorted by (i, j)
+    rows, columns, values = (np.concatenate(parts) for parts in zip(*pairs)) if pairs else \
+        (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+    _, unique = np.unique(rows * size + columns, return_index=True)
+    rows, columns, values = rows[unique], columns[unique], values[unique]
+
+    first = np.full(size, -1, dtype=np.int64)
+    # the pairs are sorted by i: the first pair of each column j has the smallest i
+    found_columns, first_pairs = np.unique(columns, return_index=True)
+    first[found_columns] = rows[first_pairs]
+
+    # the neighbors of each signal among the pairs found, most correlated first
+    top_k = min(top_k, size - 1) if size else 0
+    top_indexes = np.full((size, top_k), -1, dtype=np.int64)
+    top_values = np.full((size, top_k), np.nan)
+    signals = np.concatenate([rows, columns])
+    neighbors = np.concatenate([columns, rows])
+    neighbor_values = np.concatenate([values, values])
+    order = np.lexsort((-neighbor_values, signals))
+    signals, neighbors, neighbor_values = signals[order], neighbors[order], neighbor_values[order]
+    rank = np.arange(len(signals)) - np.searchsorted(signals, signals)
+    kept = rank < top_k
+    top_indexes[signals[kept], rank[kept]] = neighbors[kept]
+    top_values[signals[kept], rank[kept]] = neighbor_values[kept]
+    return first, (rows, columns, values), (top_indexes, top_values)
+
+
+def sample_counts(signals):
+    """
+    Number of samples of each of the `signals`: the length of its samples or, for signals whose samples were
+    trimmed by the extract, the number of ingested samples of its `signature_info` (`num_of_items`).
+    """
+    counts = np.array([len(signal.values) for signal in signals], dtype=np.int64)
+    for index, signal in enumerate(signals):
+        if counts[index] == 0:
+            num_of_items = signal.metadata.get("signature_info", {}).get("num_of_items")
+            if num_of_items is None:
+                raise ValueError(f"signal {signal.metadata.get('__name__')} has no samples nor signature_info "
+                                 f"num_of_items: the fewest_samples representative policy needs the number of "
+                                 f"samples of the signals (extract without trim)")
+            counts[index] = num_of_items
+    return counts
+
+
 class PairwiseCorrelationAnalyzer(Analyzer, ABC):
+    # the signals are compared over all their extracted features
+    required_features = None
 
     def analyze(self, *args, **kwargs):
         """
@@ -36,68 +280,53 @@ class PairwiseCorrelationAnalyzer(Analyzer, ABC):
         pairwise_similarity_threshold = kwargs.get("pairwise_similarity_threshold")
         pairwise_similarity_method = kwargs.get("pairwise_similarity_method")
         pairwise_similarity_distance_method = kwargs.get("pairwise_similarity_distance_method")
+        pairwise_correlation_mode = kwargs.get("pairwise_correlation_mode") or \
+            api.PairwiseCorrelationMode.PAIRWISE_CORRELATION_DENSE.value
 
         if not signals.signals:
             return self.get_signals(), "No insights, empty signals"
 
-        # cross-signals features extraction
-        df_features_matrix = pd.DataFrame()
-        for index, signal in enumerate(signals):
-            signal_name = signal.metadata["__name__"]
-            signal_features = signal.metadata["extracted_features"]
-
-            extracted_signal_features_as_column = (
-                pd.DataFrame(signal_features.transpose()).rename(columns={0: signal_name}))
-            df_features_matrix = pd.concat(
-                [df_features_matrix, extracted_signal_features_as_column], axis=1)
+        # cross-signals features matrix (signals x features)
+        features, feature_names = signals.features_matrix()
+        names = [signal.metadata["__name__"] for signal in signals]
 
         # Execute cross signal correlation
-
-        # using pdist distance function
-        if pairwise_similarity_method == api.GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_DISTANCE.value:
-            df_transposed = df_features_matrix.T
-            dist_matrix = pdist(df_transposed, metric=pairwise_similarity_distance_method)
-            dist_matrix_square = squareform(dist_matrix)
-            corr_matrix = pd.DataFrame(dist_matrix_square,
-                                       index=df_transposed.index,
-                                       columns=df_transposed.index)
+        if pairwise_correlation_mode == api.PairwiseCorrelationMode.PAIRWISE_CORRELATION_DENSE.value:
+            first, pairs = self.dense_correlations(signals, features, feature_names, names,
+                                                   pairwise_similarity_threshold, pairwise_similarity_method,
+                                                   pairwise_similarity_distance_method)
+        elif pairwise_correlation_mode == api.PairwiseCorrelationMode.PAIRWISE_CORRELATION_BLOCKED.value:
+            first, pairs = self.blocked_correlations(signals, features, names, pairwise_similarity_threshold,
+                                                     pairwise_similarity_method, pairwise_similarity_distance_method,
+                                                     kwargs.get("pairwise_block_size") or 2048,
+                                                     kwargs.get("pairwise_top_k") or 10)
+        elif pairwise_correlation_mode == api.PairwiseCorrelationMode.PAIRWISE_CORRELATION_APPROXIMATE.value:
+            first, pairs = self.approximate_correlations(signals, features, names, pairwise_similarity_threshold,
+                                                         pairwise_similarity_method,
+                                                         kwargs.get("pairwise_lsh_tables") or 16,
+                                                         kwargs.get("pairwise_lsh_bits") or 12,
+                                                         kwargs.get("pairwise_block_size") or 2048,
+                                                         kwargs.get("pairwise_top_k") or 10)
         else:
-            # using Pandas corr function with method
-            corr_matrix = df_features_matrix.corr(method=pairwise_similarity_method)
-
-        signals.metadata["corr_matrix"] = corr_matrix
-
-        # label each of the signals with the correlation with all other signals
-        for index, extracted_signal in enumerate(signals):
-            extracted_signal_name = extracted_signal.metadata["__name__"]
-            extracted_signal.metadata["corr_signals"] = corr_matrix[extracted_signal_name]
+            raise ValueError(f"unsupported pairwise correlation mode {pairwise_correlation_mode}")
 
         # Analyze the list of signals that can be reduces
 
-        # Select upper triangle of correlation matrix
-        upper = corr_matrix.where(
-            np.triu(np.ones(corr_matrix.shape), k=1).astype(bool))
-
-        # Find index and column name of features with high correlation
-        signals_to_reduce = []
-        signals_to_keep = []
-        for column in upper.columns:
-            keep_metric = True
-            for index in upper.index:
-                if pairwise_similarity_method == api.GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_DISTANCE.value:
-                    if upper.loc[index, column] <= pairwise_similarity_threshold:
-                        signals_to_reduce.append(
-                            {"signal": column, "correlated_signals": index})
-                        keep_metric = False
-                        break
-                else:
-                    if upper.loc[index, column] > pairwise_similarity_threshold:
-                        signals_to_reduce.append(
-                            {"signal": column, "correlated_signals": index})
-                        keep_metric = False
-                        break
-            if keep_metric:
-                signals_to_keep.append(column)
+        if (kwargs.get("pairwise_reduction") or api.PairwiseReduction.PAIRWISE_REDUCTION_FIRST_CORRELATED.value) == \
+                api.PairwiseReduction.PAIRWISE_REDUCTION_CLUSTERS.value:
+            if pairs is None:
+                distance = \
+                    pairwise_similarity_method == api.GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_DISTANCE.value
+                pairs = correlated_pairs(signals.metadata["corr_matrix"].to_numpy(), pairwise_similarity_threshold,
+                                         distance=distance)
+            signals_to_reduce = self.reduce_clusters(signals, names, pairs,
+                                                     kwargs.get("pairwise_representative_policy"),
+                                                     kwargs.get("access_log_file"))
+        else:
+            # a signal is reduced when it is highly correlated with a signal before it (upper triangle of the
+            # correlation matrix), the first such signal is reported
+            signals_to_reduce = [{"signal": names[column], "correlated_signals": names[index]}
+                                 for column, index in enumerate(first.tolist()) if index >= 0]
 
         # Generate the insights
         pairwise_insights = "Based on pairwise correlation analysis we can reduce:\n"
@@ -119,3 +348,107 @@ class PairwiseCorrelationAnalyzer(Analyzer, ABC):
         self.tag_signals_by_names([signal["signal"] for signal in signals_to_reduce],
                                   InsightsAnalysisChainType.INSIGHTS_ANALYSIS_PAIRWISE_CORRELATIONS.value)
         return self.get_signals(), pairwise_insights
+
+    @staticmethod
+    def reduce_clusters(signals, names, pairs, policy, access_log_file=None):
+        # one representative is kept per cluster of correlated signals, the other signals of the cluster are reduced
+        rows, columns = pairs
+        policy = policy or api.PairwiseRepresentativePolicy.PAIRWISE_REPRESENTATIVE_FIRST.value
+        if policy == api.PairwiseRepresentativePolicy.PAIRWISE_REPRESENTATIVE_FIRST.value:
+            priority = None
+        elif policy == api.PairwiseRepresentativePolicy.PAIRWISE_REPRESENTATIVE_FEWEST_SAMPLES.value:
+            priority = sample_counts(signals)
+        elif policy == api.PairwiseRepresentativePolicy.PAIRWISE_REPRESENTATIVE_MOST_CONNECTED.value:
+            priority = -np.bincount(np.concatenate([rows, columns]), minlength=len(names))
+        elif policy == api.PairwiseRepresentativePolicy.PAIRWISE_REPRESENTATIVE_MOST_ACCESSED.value:
+            if not access_log_file:
+                raise ValueError(f"the {policy} representative policy requires an access_log_file")
+            access_counts = AccessLog.from_json_file(access_log_file).name_counts()
+            # only the signals with correlated signals compete for representing a cluster
+            clustered = set(rows.tolist()) | set(columns.tolist())
+            priority = np.array([-access_counts[name] if index in clustered else 0
+                                 for index, name in enumerate(names)])
+        else:
+            raise ValueError(f"unsupported pairwise representative policy {policy}")
+
+        labels, representatives = redundancy_clusters(len(names), rows, columns, priority)
+        reduced = np.flatnonzero(representatives != np.arange(len(names)))
+        clusters = {}
+        for index in reduced.tolist():
+            clusters.setdefault(names[representatives[index]], []).append(names[index])
+        signals.metadata["corr_clusters"] = clusters
+        logger.info(f"pairwise correlations: {len(clusters)} clusters of correlated signals, "
+                    f"{len(reduced)} signals reduced")
+        return [{"signal": names[index], "correlated_signals": names[representatives[index]]}
+                for index in reduced.tolist()]
+
+    @staticmethod
+    def dense_correlations(signals, features, feature_names, names, pairwise_similarity_threshold,
+                           pairwise_similarity_method, pairwise_similarity_distance_method):
+        # the n x n correlation matrix, kept in the metadata with a full column per signal
+        df_features_matrix = pd.DataFrame(features.T, index=feature_names, columns=names)
+
+        # using pdist distance function
+        if pairwise_similarity_method == api.GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_DISTANCE.value:
+            df_transposed = df_features_matrix.T
+            dist_matrix = pdist(df_transposed, metric=pairwise_similarity_distance_method)
+            dist_matrix_square = squareform(dist_matrix)
+            corr_matrix = pd.DataFrame(dist_matrix_square,
+                                       index=df_transposed.index,
+                                       columns=df_transposed.index)
+        else:
+            # using Pandas corr function with method
+            corr_matrix = df_features_matrix.corr(method=pairwise_similarity_method)
+
+        signals.metadata["corr_matrix"] = corr_matrix
+
+        # label each of the signals with the correlation with all other signals
+        for index, extracted_signal in enumerate(signals):
+            extracted_signal_name = extracted_signal.metadata["__name__"]
+            extracted_signal.metadata["corr_signals"] = corr_matrix[extracted_signal_name]
+
+        # the correlated pairs are only listed when needed (see `correlated_pairs`)
+        first = first_correlated(
+            corr_matrix.to_numpy(), pairwise_similarity_threshold,
+            distance=pairwise_similarity_method == api.GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_DISTANCE.value)
+        return first, None
+
+    @staticmethod
+    def blocked_correlations(signals, features, names, pairwise_similarity_threshold, pairwise_similarity_method,
+                             pairwise_similarity_distance_method, block_size, top_k):
+        # the correlated pairs as a sparse edge list and the top-k neighbors of each signal, without the n x n matrix
+        first, (rows, columns, values), (top_indexes, top_values) = blocked_correlations(
+            features, pairwise_similarity_threshold, pairwise_similarity_method, pairwise_similarity_distance_method,
+            block_size, top_k)
+        PairwiseCorrelationAnalyzer.store_correlations(signals, names, (rows, columns, values),
+                                                       (top_indexes, top_values))
+        logger.info(f"blocked pairwise correlations of {len(names)} signals: {len(values)} correlated pairs")
+        return first, (rows, columns)
+
+    @staticmethod
+    def approximate_correlations(signals, features, names, pairwise_similarity_threshold, pairwise_similarity_method,
+                                 tables, bits, block_size, top_k):
+        # the correlated pairs found among the candidates of the hash tables, stored as in the blocked mode
+        first, (rows, columns, values), (top_indexes, top_values) = approximate_correlations(
+            features, pairwise_similarity_threshold, pairwise_similarity_method, tables, bits, block_size, top_k)
+        PairwiseCorrelationAnalyzer.store_correlations(signals, names, (rows, columns, values),
+                                                       (top_indexes, top_values))
+        logger.info(f"approximate pairwise correlations of {len(names)} signals ({tables} tables of {bits} bits): "
+                    f"{len(values)} correlated pairs found")
+        return first, (rows, columns)
+
+    @staticmethod
+    def store_correlations(signals, names, edges, top):
+        # the correlated pairs as a sparse edge list in the metadata, and the top-k neighbors of each signal
+        rows, columns, values = edges
+        top_indexes, top_values = top
+        signal_names = np.array(names, dtype=object)
+        signals.metadata["corr_edges"] = pd.DataFrame({"signal": signal_names[rows],
+                                                       "correlated_signal": signal_names[columns],
+                                                       "value": values})
+
+        # label each of the signals with its top-k most correlated signals: (name, correlation) pairs
+        for extracted_signal, indexes, neighbor_values in zip(signals, top_indexes.tolist(), top_values.tolist()):
+            extracted_signal.metadata["corr_signals"] = [(names[index], value)
+                                                         for index, value in zip(indexes, neighbor_values)
+                                                         if index >= 0]
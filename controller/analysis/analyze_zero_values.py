@@ -13,6 +13,8 @@
 #  limitations under the License.
 
 import logging
+
+import numpy as np
 from abc import ABC
 from analysis.analyzer import Analyzer
 from common.configuration_api import InsightsAnalysisChainType
@@ -21,6 +23,7 @@ logger = logging.getLogger(__name__)
 
 
 class ZeroValuesAnalyzer(Analyzer, ABC):
+    required_features = ["value_Min", "value_Max"]
 
     def analyze(self, *args, **kwargs):
         """
@@ -31,16 +34,19 @@ class ZeroValuesAnalyzer(Analyzer, ABC):
         close_to_zero_threshold = kwargs.get("close_to_zero_threshold")
 
         zero_value_signals = []
+        zero_value_signals_set = set()
         zero_value_insights = (f"Based on analysis, the following signals "
                                f"have close to zero values: ( up-to {close_to_zero_threshold})\n")
         zero_value_insights += "-=-=--=-=-=--=-=-=--=-=-=--=-=-=--=\n"
-        for signal in signals:
-            if signal.metadata["__name__"] in zero_value_signals:
+        features, _ = signals.features_matrix(self.required_features)
+        close_to_zero = (np.abs(features[:, 0]) < close_to_zero_threshold) & (features[:, 1] < close_to_zero_threshold)
+        for signal, is_close_to_zero in zip(signals, close_to_zero.tolist()):
+            if signal.metadata["__name__"] in zero_value_signals_set:
                 continue
-            if abs(signal.metadata["extracted_features"]["value_Min"][0]) < close_to_zero_threshold and \
-                    abs(signal.metadata["extracted_features"]["value_Max"][0] < close_to_zero_threshold):
+            if is_close_to_zero:
                 signal_name = signal.metadata["__name__"]
                 zero_value_signals.append(signal_name)
+                zero_value_signals_set.add(signal_name)
                 zero_value_insights += \
                     (f'<a href="javascript:void(0);" onclick="submitForm(&apos;{signal_name}&apos;);">'
                      f'{signal_name}</a> - Signal is close to zero value\n')
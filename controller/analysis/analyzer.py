@@ -20,6 +20,10 @@ logger = logging.getLogger(__name__)
 
 
 class Analyzer(ABC):
+    # names of the extracted features read by `analyze` (None: all the extracted features), used to extract
+    # only the features needed by the analysis chain
+    required_features = None
+
     def __init__(self, signals):
         self.signals = signals
         self.filtered_signals = signals
@@ -35,17 +39,11 @@ class Analyzer(ABC):
         return self.signals
 
     def filter_signals_by_tags(self, tags, out=False, _any=False):
-        if out:
-            filtered_signals = [signal for signal in self.signals if not signal.is_tagged(tags, _any)]
-            self.filtered_signals = Signals(metadata=self.signals.metadata, signals=filtered_signals)
-        else:
-            filtered_signals = [signal for signal in self.signals if not signal.is_tagged(tags, _any)]
-            self.filtered_signals = Signals(metadata=self.signals.metadata, signals=filtered_signals)
+        filtered_signals = self.signals.filter_by_tags(tags, filter_in=not out, _any=_any)
+        self.filtered_signals = Signals(metadata=self.signals.metadata, signals=filtered_signals)
 
     def tag_signals_by_names(self, names, tag):
-        for signal in self.signals:
-            if signal.metadata["__name__"] in names:
-                signal.tag(tag)
+        self.signals.tag_by_names(names, tag)
 
     def __print__(self):
         self.signals.__print__()
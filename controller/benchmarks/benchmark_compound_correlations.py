@@ -0,0 +1,73 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Benchmark the compound correlations analysis: one statsmodels OLS per signal on all the other signals vs. the
+# batched engine (all the regressions derived from a single factorization), and the batched engine restricted to
+# the top-k most correlated candidates of each signal.
+# The statsmodels fits grow with the number of signals, they are only timed up to STATSMODELS_MAX_SIGNALS signals.
+# usage (from the controller directory):
+#   python -m benchmarks.benchmark_compound_correlations [number_of_signals ...]
+
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from analysis.analyze_compound_correlations import CompoundCorrelationAnalyzer
+from common.feature_store import FeatureStore
+from common.signal import Signals
+from common.signal_store import SignalStore
+
+STATSMODELS_MAX_SIGNALS = 500
+NUMBER_OF_SAMPLES = 60
+TOP_K = 3
+
+
+def build_signals(number_of_signals):
+    # random signals, every 10th signal the sum of the two signals before it
+    random = np.random.default_rng(0)
+    values = random.normal(random.normal(scale=5, size=(number_of_signals, 1)), 1,
+                           size=(number_of_signals, NUMBER_OF_SAMPLES))
+    values[2::10] = values[1::10][:len(values[2::10])] + values[::10][:len(values[2::10])]
+    features = np.column_stack([values.min(axis=1), values.max(axis=1), values.mean(axis=1), values.var(axis=1),
+                                np.ptp(values, axis=1), (values * values).sum(axis=1)])
+    signals = Signals(metadata={}, store=SignalStore())
+    timestamps = np.arange(NUMBER_OF_SAMPLES, dtype=np.float64)
+    for index in range(number_of_signals):
+        signals.append_time_series("metric", {"__name__": f"metric_{index}"}, timestamps, values[index])
+    return signals.with_features(FeatureStore(features, CompoundCorrelationAnalyzer.required_features))
+
+
+def run(number_of_signals):
+    print(f"signals: {number_of_signals}")
+    for engine, top_k in [("statsmodels", None), ("batched", None), ("batched", TOP_K)]:
+        if engine == "statsmodels" and number_of_signals > STATSMODELS_MAX_SIGNALS:
+            print(f"statsmodels: skipped (more than {STATSMODELS_MAX_SIGNALS} signals)")
+            continue
+        signals = build_signals(number_of_signals)
+        start_time = time.time()
+        analyzed_signals, _ = CompoundCorrelationAnalyzer(signals).analyze(compound_similarity_threshold=0.99,
+                                                                           compound_engine=engine,
+                                                                           compound_top_k=top_k)
+        reduced = analyzed_signals.filter_by_tags(["compound_correlations"], filter_in=True)
+        print(f"{engine}{f' (top {top_k} candidates)' if top_k else ''}: {time.time() - start_time:.2f}s "
+              f"({len(reduced)} signals reduced)")
+
+
+if __name__ == '__main__':
+    # the summaries of the statsmodels fits warn about their normality tests on 6 observations
+    warnings.simplefilter("ignore")
+    for number_of_signals in [int(arg) for arg in sys.argv[1:]] or [500, 5000]:
+        run(number_of_signals)
@@ -0,0 +1,64 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Benchmark the insights summary and the processor config generation on a large number of signals.
+# usage (from the controller directory): python -m benchmarks.benchmark_config_generator [number_of_signals]
+
+import sys
+import time
+
+from common.configuration_api import ConfigGeneratorProcessor, FrequencyDef, InsightsAnalysisChainType
+from common.signal import Signal, Signals
+from config_generator.config_generator_common import generate_adjust, generate_reduce
+
+
+def build_signals(number_of_signals):
+    signals = Signals(metadata={"ingest_source": "benchmark"}, signals=[])
+    for index in range(number_of_signals):
+        signals.append(Signal("metric", {"__name__": f"metric_{index}",
+                                         "processor": f"processor_{index % 4}",
+                                         "instance": f"instance_{index % 100}"}))
+    return signals
+
+
+def run(number_of_signals):
+    signals = build_signals(number_of_signals)
+    names = [signal.metadata["__name__"] for signal in signals]
+    reduce_tag = InsightsAnalysisChainType.INSIGHTS_ANALYSIS_ZERO_VALUES.value
+    monotonic_tag = InsightsAnalysisChainType.INSIGHTS_ANALYSIS_MONOTONIC.value
+
+    start_time = time.time()
+    signals.tag_by_names(names[::2], reduce_tag)
+    signals.tag_by_names(names[1::4], monotonic_tag)
+    signals_to_reduce = [signal.metadata["__name__"] for signal in signals.filter_by_tags([reduce_tag])]
+    signals_to_keep = [signal.metadata["__name__"] for signal in signals.filter_by_tags([reduce_tag], filter_in=False)]
+    tagging_time = time.time() - start_time
+
+    config = ConfigGeneratorProcessor(processor_id_template="$processor",
+                                      signal_name_template="$__name__",
+                                      signal_condition_template="instance=$instance",
+                                      metrics_adjustment=[FrequencyDef(name_template=".*",
+                                                                       tag_filter=[monotonic_tag],
+                                                                       interval="30s")])
+    start_time = time.time()
+    generate_reduce(config, signals, signals_to_reduce)
+    generate_adjust(config, signals, signals_to_keep)
+    generate_time = time.time() - start_time
+
+    print(f"signals: {number_of_signals}, tag and filter: {tagging_time:.3f}s, "
+          f"generate_reduce + generate_adjust: {generate_time:.3f}s")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,69 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Benchmark the prometheus file ingest: loading the whole dump vs. streaming `data.result` item by item.
+# usage (from the controller directory):
+#   python -m benchmarks.benchmark_file_ingest [number_of_signals] [number_of_samples]
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common.configuration_api import IngestFile
+from ingest.file_ingest import ingest
+
+
+def write_dump(file_name, number_of_signals, number_of_samples):
+    with open(file_name, 'w') as file:
+        file.write('{"status": "success", "data": {"resultType": "matrix", "result": [')
+        for index in range(number_of_signals):
+            if index > 0:
+                file.write(",")
+            json_signal = {"metric": {"__name__": f"metric_{index % 1000}", "instance": f"instance_{index}",
+                                      "job": "benchmark"},
+                           "values": [[1700000000 + 30 * sample, str(float(index * sample % 97))]
+                                      for sample in range(number_of_samples)]}
+            file.write(json.dumps(json_signal))
+        file.write("]}}")
+
+
+def measure(file_name, streaming):
+    tracemalloc.start()
+    start_time = time.time()
+    signals = ingest(IngestFile(file_name=file_name, streaming=streaming,
+                                ingest_name_template="$__name__-$instance"))
+    elapsed_time = time.time() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(signals), elapsed_time, peak
+
+
+def run(number_of_signals, number_of_samples):
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "dump.json")
+        write_dump(file_name, number_of_signals, number_of_samples)
+        size = os.path.getsize(file_name)
+        print(f"signals: {number_of_signals}, samples per signal: {number_of_samples}, file size: {size >> 20}MB")
+        for streaming in [False, True]:
+            count, elapsed_time, peak = measure(file_name, streaming)
+            print(f"streaming: {streaming}, ingested signals: {count}, time: {elapsed_time:.2f}s, "
+                  f"peak traced memory: {peak >> 20}MB")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200)
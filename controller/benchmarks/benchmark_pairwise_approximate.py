@@ -0,0 +1,57 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Benchmark the approximate pairwise correlations (random projection hash tables) against the exact blocked
+# pairwise correlations: time, and recall of the correlated pairs and of the reduced signals, for several numbers
+# of hash tables and bits per table.
+# usage (from the controller directory):
+#   python -m benchmarks.benchmark_pairwise_approximate [number_of_signals ...]
+
+import sys
+import time
+
+import numpy as np
+
+from analysis.analyze_pairwise_correlations import approximate_correlations, blocked_correlations
+from benchmarks.benchmark_pairwise_correlations import NUMBER_OF_FEATURES, THRESHOLD, build_signals
+
+# features noisy enough for many correlations to be close to the threshold
+NOISE = 0.15
+SETTINGS = [(4, 12), (8, 12), (16, 12), (16, 8), (32, 16)]
+
+
+def run(number_of_signals):
+    print(f"signals: {number_of_signals}, features: {NUMBER_OF_FEATURES}")
+    features, _ = build_signals(number_of_signals, NOISE).features_matrix()
+    start_time = time.time()
+    first, (rows, columns, _), _ = blocked_correlations(features, THRESHOLD, "pearson")
+    print(f"exact (blocked): {time.time() - start_time:.2f}s, {len(rows)} correlated pairs, "
+          f"{int((first >= 0).sum())} signals reduced")
+    exact_pairs = rows * number_of_signals + columns
+
+    for tables, bits in SETTINGS:
+        start_time = time.time()
+        approximate_first, (rows, columns, _), _ = approximate_correlations(features, THRESHOLD, "pearson",
+                                                                            tables=tables, bits=bits)
+        elapsed = time.time() - start_time
+        # the pairs found are verified exactly: the reduced signals are a subset of the exact ones
+        pairs_recall = np.isin(exact_pairs, rows * number_of_signals + columns).mean() if len(exact_pairs) else 1.0
+        reduced_recall = (approximate_first >= 0).sum() / max(1, (first >= 0).sum())
+        print(f"approximate ({tables} tables of {bits} bits): {elapsed:.2f}s, "
+              f"pairs recall {pairs_recall:.3f}, reduced signals recall {reduced_recall:.3f}")
+
+
+if __name__ == '__main__':
+    for number_of_signals in [int(arg) for arg in sys.argv[1:]] or [20000, 100000]:
+        run(number_of_signals)
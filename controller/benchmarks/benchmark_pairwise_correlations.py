@@ -0,0 +1,101 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Benchmark the pairwise correlations analysis: the whole analysis and its reduction pass (which signals are
+# highly correlated with a signal before them) vectorized vs. the upper triangle scanned with `upper.loc`,
+# and the blocked mode (correlations computed tile by tile, without the n x n matrix).
+# The legacy scan is O(n^2) pandas indexing, it is only timed up to LEGACY_MAX_SIGNALS signals;
+# the dense mode holds n x n matrices, it is only timed up to DENSE_MAX_SIGNALS signals.
+# usage (from the controller directory):
+#   python -m benchmarks.benchmark_pairwise_correlations [number_of_signals ...]
+
+import sys
+import time
+
+import numpy as np
+
+from analysis.analyze_pairwise_correlations import PairwiseCorrelationAnalyzer, first_correlated
+from common.feature_store import FeatureStore
+from common.signal import Signals
+from common.signal_store import SignalStore
+
+LEGACY_MAX_SIGNALS = 5000
+DENSE_MAX_SIGNALS = 20000
+NUMBER_OF_FEATURES = 17
+THRESHOLD = 0.95
+
+
+def build_signals(number_of_signals, noise=0.05):
+    # clusters of about 10 signals with almost the same features (up to `noise`)
+    random = np.random.default_rng(0)
+    centers = random.normal(size=(max(1, number_of_signals // 10), NUMBER_OF_FEATURES))
+    features = centers[random.integers(len(centers), size=number_of_signals)]
+    features += random.normal(scale=noise, size=features.shape)
+    signals = Signals(metadata={}, store=SignalStore())
+    timestamps = np.arange(2, dtype=np.float64)
+    for index in range(number_of_signals):
+        signals.append_time_series("metric", {"__name__": f"metric_{index}"}, timestamps, np.zeros(2))
+    return signals.with_features(FeatureStore(features,
+                                              [f"value_feature_{index}" for index in range(NUMBER_OF_FEATURES)]))
+
+
+def legacy_reduction(corr_matrix):
+    # the reduction pass before it was vectorized
+    upper = corr_matrix.where(np.triu(np.ones(corr_matrix.shape), k=1).astype(bool))
+    signals_to_reduce = []
+    for column in upper.columns:
+        for index in upper.index:
+            if upper.loc[index, column] > THRESHOLD:
+                signals_to_reduce.append({"signal": column, "correlated_signals": index})
+                break
+    return signals_to_reduce
+
+
+def run(number_of_signals):
+    print(f"signals: {number_of_signals}, features: {NUMBER_OF_FEATURES}")
+    signals = build_signals(number_of_signals)
+    start_time = time.time()
+    PairwiseCorrelationAnalyzer(signals).analyze(pairwise_similarity_threshold=THRESHOLD,
+                                                 pairwise_similarity_method="pearson",
+                                                 pairwise_similarity_distance_method="",
+                                                 pairwise_correlation_mode="blocked")
+    print(f"pairwise correlations analysis, blocked: {time.time() - start_time:.2f}s "
+          f"({len(signals.metadata['corr_edges'])} correlated pairs)")
+
+    if number_of_signals > DENSE_MAX_SIGNALS:
+        print(f"pairwise correlations analysis, dense: skipped (more than {DENSE_MAX_SIGNALS} signals)")
+        return
+    signals = build_signals(number_of_signals)
+    start_time = time.time()
+    PairwiseCorrelationAnalyzer(signals).analyze(pairwise_similarity_threshold=THRESHOLD,
+                                                 pairwise_similarity_method="pearson",
+                                                 pairwise_similarity_distance_method="")
+    print(f"pairwise correlations analysis, dense: {time.time() - start_time:.2f}s")
+
+    corr_matrix = signals.metadata["corr_matrix"]
+    start_time = time.time()
+    first = first_correlated(corr_matrix.to_numpy(), THRESHOLD)
+    print(f"reduction pass: {time.time() - start_time:.3f}s ({int((first >= 0).sum())} signals reduced)")
+
+    if number_of_signals <= LEGACY_MAX_SIGNALS:
+        start_time = time.time()
+        legacy_reduction(corr_matrix)
+        print(f"legacy reduction pass: {time.time() - start_time:.2f}s")
+    else:
+        print(f"legacy reduction pass: skipped (more than {LEGACY_MAX_SIGNALS} signals)")
+
+
+if __name__ == '__main__':
+    for number_of_signals in [int(arg) for arg in sys.argv[1:]] or [5000, 20000]:
+        run(number_of_signals)
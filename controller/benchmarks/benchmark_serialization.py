@@ -0,0 +1,108 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Benchmark the serialized (pickle) and columnar encode/ingest of extracted signals: size, write and load times.
+# usage (from the controller directory):
+#   python -m benchmarks.benchmark_serialization [number_of_signals] [number_of_samples] [number_of_features]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from common.configuration_api import EncodeColumnar, EncodeSerialized, IngestColumnar, IngestSerialized
+from common.signal import Signals
+from common.signal_store import SignalStore
+from encode.columnar_encode import encode as columnar_encode
+from encode.pickle_encode import encode as pickle_encode
+from ingest.columnar_ingest import ingest as columnar_ingest
+from ingest.pickle_ingest import ingest as pickle_ingest
+
+
+def build_signals(number_of_signals, number_of_samples, number_of_features):
+    # extracted signals as produced by the tsfel extract: samples plus a one row DataFrame of features
+    random = np.random.default_rng(0)
+    signals = Signals(metadata={"ingest_type": "file"}, store=SignalStore(string_values=True))
+    timestamps = 1700000000 + 30 * np.arange(number_of_samples, dtype=np.float64)
+    feature_names = [f"value_Feature_{index}" for index in range(number_of_features)]
+    for index in range(number_of_signals):
+        signal = signals.append_time_series(
+            "metric", {"__name__": f"metric_{index % 1000}", "instance": f"instance_{index}", "job": "benchmark"},
+            timestamps, np.round(random.normal(size=number_of_samples), 2))
+        signal.metadata["extracted_features"] = pd.DataFrame(random.normal(size=(1, number_of_features)),
+                                                             columns=feature_names)
+    return signals
+
+
+def directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, file_name)) for file_name in os.listdir(path))
+
+
+def measure(name, encode, ingest, signals):
+    start_time = time.time()
+    encode(signals)
+    write_time = time.time() - start_time
+    start_time = time.time()
+    restored = ingest()
+    load_time = time.time() - start_time
+    assert len(restored) == len(signals)
+    del restored
+    # tracing slows the allocations down, measure the memory on a separate load
+    tracemalloc.start()
+    ingest()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return name, write_time, load_time, peak
+
+
+def run(number_of_signals, number_of_samples, number_of_features):
+    signals = build_signals(number_of_signals, number_of_samples, number_of_features)
+    print(f"signals: {number_of_signals}, samples per signal: {number_of_samples}, features: {number_of_features}")
+    with tempfile.TemporaryDirectory() as directory:
+        pickle_file = os.path.join(directory, "signals.pickle")
+        compressed = os.path.join(directory, "columnar")
+        uncompressed = os.path.join(directory, "columnar_uncompressed")
+        cases = [
+            ("pickle", pickle_file,
+             lambda data: pickle_encode(EncodeSerialized(file_name=pickle_file), data),
+             lambda: pickle_ingest(IngestSerialized(file_name=pickle_file))),
+            ("columnar", compressed,
+             lambda data: columnar_encode(EncodeColumnar(file_name=compressed), data),
+             lambda: columnar_ingest(IngestColumnar(file_name=compressed))),
+            ("columnar, features only", compressed,
+             lambda data: None,
+             lambda: columnar_ingest(IngestColumnar(file_name=compressed, columns=["features"]))),
+            ("columnar uncompressed", uncompressed,
+             lambda data: columnar_encode(EncodeColumnar(file_name=uncompressed, compression=False), data),
+             lambda: columnar_ingest(IngestColumnar(file_name=uncompressed))),
+            ("columnar uncompressed, memory mapped", uncompressed,
+             lambda data: None,
+             lambda: columnar_ingest(IngestColumnar(file_name=uncompressed, memory_map=True))),
+        ]
+        for name, path, encode, ingest in cases:
+            name, write_time, load_time, peak = measure(name, encode, ingest, signals)
+            print(f"{name}: size: {directory_size(path) >> 20}MB, write time: {write_time:.2f}s, "
+                  f"load time: {load_time:.2f}s, peak traced memory while loading: {peak >> 20}MB")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 30)
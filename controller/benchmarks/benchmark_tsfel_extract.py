@@ -0,0 +1,97 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Benchmark the per-signal overhead of the tsfel extract: parsing the features configuration and calling
+# tsfel.time_series_features_extractor for each signal vs. a feature plan prepared once per run,
+# and the statistical extract (same features, computed for all signals at once).
+# With number_of_workers, the feature plan extract also runs on a pool of that many processes.
+# usage (from the controller directory):
+#   python -m benchmarks.benchmark_tsfel_extract [number_of_signals] [number_of_samples] [number_of_workers]
+
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import tsfel
+
+from common.configuration_api import FeatureExtractionStatistical, FeatureExtractionTsfel
+from common.process_pool import get_process_pool
+from common.signal import Signals
+from common.signal_store import SignalStore
+from extract.feature_extraction_statistical import extract as extract_statistical
+from extract.feature_extraction_tsfel import extract
+
+
+def build_signals(number_of_signals, number_of_samples):
+    random = np.random.default_rng(0)
+    signals = Signals(metadata={}, store=SignalStore())
+    timestamps = 1700000000 + 30 * np.arange(number_of_samples, dtype=np.float64)
+    for index in range(number_of_signals):
+        signals.append_time_series("metric", {"__name__": f"metric_{index}"}, timestamps,
+                                   random.normal(size=number_of_samples))
+    return signals
+
+
+def extract_per_signal(tsfel_config, signals):
+    # the extract before feature plans: configuration parsed and tsfel called for each signal
+    for signal in signals:
+        df_signal = pd.DataFrame({'value': signal.values},
+                                 index=pd.to_datetime(signal.timestamps, unit='s').rename("Time"))
+        df_signal = df_signal.resample(tsfel_config.resample_rate).mean().interpolate('linear')
+        with open(tsfel_config.features_json_file, 'r') as file:
+            cfg_file = json.load(file)
+        signal.metadata["extracted_features"] = tsfel.time_series_features_extractor(
+            dict_features=cfg_file, signal_windows=df_signal, fs=tsfel_config.sampling_frequency, verbose=0)
+
+
+def run(number_of_signals, number_of_samples, number_of_workers=0):
+    tsfel_config = FeatureExtractionTsfel()
+    print(f"signals: {number_of_signals}, samples per signal: {number_of_samples}, "
+          f"features: {tsfel_config.features_json_file}")
+    signals = build_signals(number_of_signals, number_of_samples)
+    start_time = time.time()
+    extract_per_signal(tsfel_config, signals)
+    elapsed_time = time.time() - start_time
+    print(f"per signal configuration: {elapsed_time:.2f}s ({1e6 * elapsed_time / number_of_signals:.0f}us per signal)")
+
+    signals = build_signals(number_of_signals, number_of_samples)
+    start_time = time.time()
+    extract(tsfel_config, signals)
+    elapsed_time = time.time() - start_time
+    print(f"feature plan: {elapsed_time:.2f}s ({1e6 * elapsed_time / number_of_signals:.0f}us per signal)")
+
+    if number_of_workers > 0:
+        signals = build_signals(number_of_signals, number_of_samples)
+        workers_config = FeatureExtractionTsfel(number_of_workers=number_of_workers)
+        # the pool of processes is persistent, start it before timing
+        get_process_pool(number_of_workers)
+        start_time = time.time()
+        extract(workers_config, signals)
+        elapsed_time = time.time() - start_time
+        print(f"feature plan, {number_of_workers} processes: {elapsed_time:.2f}s "
+              f"({1e6 * elapsed_time / number_of_signals:.0f}us per signal)")
+
+    signals = build_signals(number_of_signals, number_of_samples)
+    start_time = time.time()
+    extract_statistical(FeatureExtractionStatistical(features_json_file=tsfel_config.features_json_file), signals)
+    elapsed_time = time.time() - start_time
+    print(f"statistical: {elapsed_time:.2f}s ({1e6 * elapsed_time / number_of_signals:.0f}us per signal)")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 0)
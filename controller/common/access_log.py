@@ -13,6 +13,11 @@
 #  limitations under the License.
 
 import json
+import re
+from collections import Counter
+
+# identifiers of a query (metric and label names, functions), see `AccessLog.name_counts`
+METRIC_NAME_PATTERN = re.compile(r"[a-zA-Z_:][a-zA-Z0-9_:]*")
 
 
 class AccessLogEntry:
@@ -42,6 +47,13 @@ class AccessLog:
     def __contains__(self, substring):
         return any(substring in entry for entry in self.entries)
 
+    def name_counts(self):
+        # metric name -> number of entries (queries) accessing it, the names being the identifiers of the entries
+        counts = Counter()
+        for entry in self.entries:
+            counts.update(set(METRIC_NAME_PATTERN.findall(str(entry))))
+        return counts
+
     def __getitem__(self, index):
         if isinstance(index, int):
             if 0 <= index < len(self.signals):
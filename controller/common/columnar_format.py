@@ -0,0 +1,237 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Columnar on-disk layout of `Signals`, a directory holding:
+#   manifest.json   format version, number of signals, `Signals.metadata`, feature and tag names
+#   labels.json.gz  type and metadata (without features and tags) of each signal
+#   samples         timestamps, values and offsets of the samples of all signals (as in `SignalStore`)
+#   features        extracted features of all signals as a single float64 matrix (one row per feature row),
+#                   read back as a `FeatureStore` per distinct list of feature names
+#   tags            tags of the signals as a boolean (signal x tag) matrix
+# Each of samples, features and tags is a compressed `<column>.npz` file, or one `<column>.<array>.npy` file
+# per array when written without compression. Labels are always loaded, the other columns only on demand.
+
+import gzip
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from common.feature_store import FeatureStore
+from common.signal import Signal, Signals
+from common.signal_store import SignalStore
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+LABELS_FILE = "labels.json.gz"
+COLUMNS = ("samples", "features", "tags")
+# metadata kept in their own columns
+COLUMN_METADATA = ("extracted_features", "tags")
+# metadata set by the insights analyses (pandas objects recomputed by the analyses), not encoded
+ANALYSIS_METADATA = ("corr_signals", "corr_matrix", "corr_edges")
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"metadata value of type {type(value).__name__} can not be encoded: {value!r}")
+
+
+def _labels(metadata):
+    return {key: value for key, value in metadata.items()
+            if key not in COLUMN_METADATA and key not in ANALYSIS_METADATA}
+
+
+def _write_column(directory, column, arrays, compression):
+    if compression:
+        np.savez_compressed(os.path.join(directory, f"{column}.npz"), **arrays)
+    else:
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, f"{column}.{name}.npy"), array)
+
+
+def _read_column(directory, column, compression, memory_map=False):
+    # memory mapped arrays are copy-on-write: pages are read from the file on first access,
+    # and changes (if any) stay in memory
+    if compression:
+        with np.load(os.path.join(directory, f"{column}.npz")) as arrays:
+            return {name: arrays[name] for name in arrays.files}
+    arrays = {}
+    prefix = f"{column}."
+    for file_name in os.listdir(directory):
+        if file_name.startswith(prefix) and file_name.endswith(".npy"):
+            arrays[file_name[len(prefix):-len(".npy")]] = np.load(os.path.join(directory, file_name),
+                                                                  mmap_mode='c' if memory_map else None)
+    return arrays
+
+
+def _columns_selector(columns):
+    # a slice (view, no copy of a memory mapped matrix) for contiguous columns, typically all the features
+    if columns and columns == list(range(columns[0], columns[0] + len(columns))):
+        return slice(columns[0], columns[0] + len(columns))
+    return columns
+
+
+def _features_columns(signals):
+    feature_stores = {id(signal.feature_store) for signal in signals}
+    if len(feature_stores) == 1 and signals[0].feature_store is not None:
+        # the features of an extract stage, already a single matrix
+        matrix, names = Signals(signals=signals).features_matrix()
+        return list(names), [list(names)], \
+            {"matrix": matrix, "offsets": np.arange(len(signals) + 1, dtype=np.int64),
+             "feature_set": np.zeros(len(signals), dtype=np.int32)}
+
+    feature_names = {}
+    feature_sets = {}
+    frames = [signal.extracted_features for signal in signals]
+    # signals usually share the same feature names, store each distinct list of names once
+    feature_set = np.full(len(signals), -1, dtype=np.int32)
+    row_counts = np.zeros(len(signals), dtype=np.int64)
+    for index, frame in enumerate(frames):
+        if frame is None:
+            continue
+        names = tuple(frame.columns)
+        if names not in feature_sets:
+            feature_sets[names] = len(feature_sets)
+            for name in names:
+                feature_names.setdefault(name, len(feature_names))
+        feature_set[index] = feature_sets[names]
+        row_counts[index] = len(frame)
+
+    offsets = np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(row_counts)])
+    matrix = np.full((int(offsets[-1]), len(feature_names)), np.nan)
+    set_columns = [[feature_names[name] for name in names] for names in feature_sets]
+    for index, frame in enumerate(frames):
+        if frame is not None:
+            matrix[offsets[index]:offsets[index + 1], set_columns[feature_set[index]]] = \
+                frame.to_numpy(dtype=np.float64)
+    return list(feature_names), [list(names) for names in feature_sets], \
+        {"matrix": matrix, "offsets": offsets, "feature_set": feature_set}
+
+
+def _tags_column(signals):
+    tag_names = {}
+    for signal in signals:
+        for tag in signal.metadata.get("tags", []):
+            tag_names.setdefault(tag, len(tag_names))
+    mask = np.zeros((len(signals), len(tag_names)), dtype=bool)
+    for index, signal in enumerate(signals):
+        for tag in signal.metadata.get("tags", []):
+            mask[index, tag_names[tag]] = True
+    return list(tag_names), {"mask": mask}
+
+
+def write_signals(directory, signals, compression=True):
+    signals_list = signals.signals
+    os.makedirs(directory, exist_ok=True)
+
+    store = signals.samples_store()
+    has_samples = np.array([signal.store is not None or signal.time_series is not None
+                            for signal in signals_list], dtype=bool)
+    _write_column(directory, "samples", {"timestamps": store.timestamps, "values": store.values,
+                                         "offsets": store.offsets, "has_samples": has_samples}, compression)
+    feature_names, feature_sets, features = _features_columns(signals_list)
+    _write_column(directory, "features", features, compression)
+    tag_names, tags = _tags_column(signals_list)
+    _write_column(directory, "tags", tags, compression)
+
+    metadata = {key: value for key, value in signals.metadata.items() if key not in ANALYSIS_METADATA}
+    if "metrics_metadata" in metadata:
+        metadata["metrics_metadata"] = [_labels(item) for item in metadata["metrics_metadata"]]
+    with gzip.open(os.path.join(directory, LABELS_FILE), 'wt') as file:
+        json.dump({"types": [signal.type for signal in signals_list],
+                   "labels": [_labels(signal.metadata) for signal in signals_list]}, file, default=_json_default)
+    manifest = {"format_version": FORMAT_VERSION,
+                "signals": len(signals_list),
+                "compression": compression,
+                "string_values": store.string_values,
+                "metadata": metadata,
+                "feature_names": feature_names,
+                "feature_sets": feature_sets,
+                "tag_names": tag_names}
+    with open(os.path.join(directory, MANIFEST_FILE), 'w') as file:
+        json.dump(manifest, file, default=_json_default)
+
+
+def read_signals(directory, columns=None, memory_map=False):
+    # `columns` selects which of COLUMNS to load (all by default), labels are always loaded;
+    # with `memory_map`, samples and features of uncompressed directories are memory mapped rather than read,
+    # signals and their features are views onto the mapped arrays
+    columns = COLUMNS if columns is None else columns
+    unknown_columns = set(columns) - set(COLUMNS)
+    if unknown_columns:
+        raise ValueError(f"unknown columns {sorted(unknown_columns)}, expected some of {list(COLUMNS)}")
+
+    with open(os.path.join(directory, MANIFEST_FILE), 'r') as file:
+        manifest = json.load(file)
+    if manifest["format_version"] > FORMAT_VERSION:
+        raise ValueError(f"unsupported columnar format version {manifest['format_version']}")
+    with gzip.open(os.path.join(directory, LABELS_FILE), 'rt') as file:
+        labels = json.load(file)
+    compression = manifest["compression"]
+    if memory_map and compression:
+        logger.warning(f"{directory} is compressed and can not be memory mapped, reading it")
+        memory_map = False
+
+    signals = Signals(metadata=manifest["metadata"])
+    if "samples" in columns:
+        samples = _read_column(directory, "samples", compression, memory_map)
+        signals.store = SignalStore.from_arrays(samples["timestamps"], samples["values"],
+                                                np.diff(samples["offsets"]), string_values=manifest["string_values"])
+        for index, (_type, metadata) in enumerate(zip(labels["types"], labels["labels"])):
+            if samples["has_samples"][index]:
+                signals.append(Signal(_type, metadata, store=signals.store, index=index))
+            else:
+                signals.append(Signal(_type, metadata))
+    else:
+        for _type, metadata in zip(labels["types"], labels["labels"]):
+            signals.append(Signal(_type, metadata))
+
+    if "features" in columns and manifest["feature_names"]:
+        features = _read_column(directory, "features", compression, memory_map)
+        # plain ndarray view of a memory mapped matrix, slicing np.memmap objects is much slower
+        matrix, offsets = np.asarray(features["matrix"]), features["offsets"].tolist()
+        name_index = {name: index for index, name in enumerate(manifest["feature_names"])}
+        # one sub matrix (feature store) per feature set, the features of each signal are a view onto its row;
+        # signals with several rows of features get them as a DataFrame (a view onto the rows) in their metadata
+        feature_stores = [FeatureStore(matrix[:, _columns_selector([name_index[name] for name in names])], names)
+                          for names in manifest["feature_sets"]]
+        set_columns = [pd.Index(names) for names in manifest["feature_sets"]]
+        for index, feature_set in enumerate(features["feature_set"].tolist()):
+            if feature_set < 0:
+                continue
+            start, end = offsets[index], offsets[index + 1]
+            if end - start == 1:
+                signals.signals[index].attach_features(feature_stores[feature_set], start)
+            else:
+                signals.signals[index].metadata["extracted_features"] = pd.DataFrame(
+                    feature_stores[feature_set].matrix[start:end], columns=set_columns[feature_set],
+                    index=pd.RangeIndex(end - start), copy=False)
+        if len(feature_stores) == 1:
+            signals.feature_store = feature_stores[0]
+
+    if "tags" in columns and manifest["tag_names"]:
+        mask = _read_column(directory, "tags", compression)["mask"]
+        tag_names = manifest["tag_names"]
+        for signal, row in zip(signals.signals, mask):
+            tag_indices = np.flatnonzero(row)
+            if len(tag_indices):
+                signal.metadata["tags"] = [tag_names[tag_index] for tag_index in tag_indices]
+
+    logger.debug(f"read {len(signals)} signals ({', '.join(columns)}) from {directory}")
+    return signals
@@ -15,6 +15,8 @@
 import configargparse
 import yaml
 
+from common.configuration_api import GlobalSettings
+
 args = None
 configuration = None
 
@@ -27,6 +29,14 @@ def get_configuration():
     return configuration
 
 
+def get_number_of_workers():
+    # `global_settings.number_of_workers` of the loaded configuration (0 when no configuration is loaded)
+    if not configuration:
+        return 0
+    global_settings = configuration.get("global_settings") or {}
+    return GlobalSettings(**global_settings).number_of_workers
+
+
 def set_configuration(config):
     global configuration
     configuration = config
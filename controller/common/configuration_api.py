@@ -117,7 +117,9 @@ class IngestSubType(Enum):
     PIPELINE_INGEST_DUMMY = "dummy"
     PIPELINE_INGEST_FILE = "file"
     PIPELINE_INGEST_PROMQL = "promql"
+    PIPELINE_INGEST_PROMQL_SERIES = "promql_series"
     PIPELINE_INGEST_SERIALIZED = "serialized"
+    PIPELINE_INGEST_COLUMNAR = "columnar"
 
 
 class IngestFormat(Enum):
@@ -134,6 +136,7 @@ class EncodeSubType(Enum):
     Enumerates different subtypes for encoding.
     """
     PIPELINE_ENCODE_SERIALIZED = "serialized"
+    PIPELINE_ENCODE_COLUMNAR = "columnar"
 
 
 class ExtractSubType(Enum):
@@ -142,6 +145,8 @@ class ExtractSubType(Enum):
     """
     PIPELINE_EXTRACT_TSFEL = "tsfel"
     PIPELINE_EXTRACT_TRIM = "trim"  # trim time series
+    PIPELINE_EXTRACT_STATISTICAL = "statistical"  # statistical features of all signals at once
+    PIPELINE_EXTRACT_ONLINE = "online"  # statistical features from running accumulators updated with new samples
 
 
 class ConfigGeneratorSubType(Enum):
@@ -164,6 +169,41 @@ class GenerateInsightsType(Enum):
     INSIGHTS_SIMILARITY_METHOD_DISTANCE = "distance"
 
 
+class PairwiseCorrelationMode(Enum):
+    """
+    Enumerates the ways pairwise correlations are computed.
+    """
+    PAIRWISE_CORRELATION_DENSE = "dense"  # full n x n correlation matrix
+    PAIRWISE_CORRELATION_BLOCKED = "blocked"  # tile by tile, only the correlated pairs and top-k neighbors are kept
+    PAIRWISE_CORRELATION_APPROXIMATE = "approximate"  # only the candidate pairs of random projection hash tables
+
+
+class PairwiseReduction(Enum):
+    """
+    Enumerates the ways correlated signals are reduced.
+    """
+    PAIRWISE_REDUCTION_FIRST_CORRELATED = "first_correlated"  # reduced if correlated with a signal before it
+    PAIRWISE_REDUCTION_CLUSTERS = "clusters"  # one representative kept per cluster of correlated signals
+
+
+class PairwiseRepresentativePolicy(Enum):
+    """
+    Enumerates the ways the representative of a cluster of correlated signals is chosen.
+    """
+    PAIRWISE_REPRESENTATIVE_FIRST = "first"  # the first signal of the cluster
+    PAIRWISE_REPRESENTATIVE_FEWEST_SAMPLES = "fewest_samples"  # the signal with the fewest samples
+    PAIRWISE_REPRESENTATIVE_MOST_CONNECTED = "most_connected"  # the signal correlated with the most signals
+    PAIRWISE_REPRESENTATIVE_MOST_ACCESSED = "most_accessed"  # the signal with the most entries in the access log
+
+
+class CompoundCorrelationEngine(Enum):
+    """
+    Enumerates the ways the compound correlations regressions are computed.
+    """
+    COMPOUND_CORRELATION_STATSMODELS = "statsmodels"  # one statsmodels OLS per signal
+    COMPOUND_CORRELATION_BATCHED = "batched"  # all the regressions derived from a shared factorization
+
+
 class MapSubType(Enum):
     """
     Enumerates different subtypes for map operations.
@@ -201,6 +241,12 @@ class IngestFile(BaseModel):
     ingest_name_template: Optional[str] = ""  # Template for ingest names
     format: Optional[str] = IngestFormat.PIPELINE_INGEST_FORMAT_PROM.value
     time_unit: Optional[str] = IngestTimeUnit.PIPELINE_TIME_UNIT_SECOND.value
+    # parse the file incrementally (prometheus format), memory is proportional to a single signal
+    streaming: Optional[bool] = False
+    # incremental ingest: directory where the ingested signals and the last ingested timestamp of each series
+    # are kept between runs, only newer samples are then added to them
+    state_directory: Optional[str] = None
+    retention: Optional[str] = ""  # Incremental ingest: drop samples older than this (e.g. 7d) before the newest one
 
 
 class IngestSerialized(BaseModel):
@@ -214,15 +260,61 @@ class IngestSerialized(BaseModel):
     file_name: str  # Name of the file to ingest
 
 
+class IngestColumnar(BaseModel):
+    """
+    ### Configuration for columnar directory ingestion.
+    This configuration is applied when `stage`:
+      type: ingest
+      subtype: columnar
+    """
+    model_config = ConfigDict(extra='forbid')
+    file_name: str  # Name of the directory to ingest
+    # Columns to load (some of samples, features and tags), all by default; labels are always loaded
+    columns: Optional[List[str]] = None
+    # Memory map the samples and features (directories written with `compression: false`) instead of reading them
+    memory_map: Optional[bool] = False
+
+
 class IngestPromql(BaseModel):
     """
     Configuration for PromQL ingestion.
+    `state_directory` and `retention` make the ingest incremental, as for IngestFile.
     """
     model_config = ConfigDict(extra='forbid')  # Configuration for the model
     url: str  # URL to fetch data from
     ingest_window: str  # Time interval for ingestion
     filter_metadata: Optional[str] = ""  # Metadata filter
     ingest_name_template: Optional[str] = ""  # Template for ingest names
+    step: Optional[str] = ""  # Resolution of the ingested samples (e.g. 5m), empty for raw samples
+    chunk_size: Optional[str] = ""  # Length of the time chunks the window is queried in (e.g. 1d), empty for one query
+    concurrency: Optional[int] = 1  # Number of range queries sent to Prometheus in parallel
+    request_timeout: Optional[float] = 60  # Timeout (in seconds) of each request to Prometheus
+    retries: Optional[int] = 3  # Number of retries of a failed request (connection errors, timeouts, 429 and 5xx)
+    retry_backoff: Optional[float] = 0.5  # Delay (in seconds) before the first retry, doubled on each retry
+    state_directory: Optional[str] = None
+    retention: Optional[str] = ""
+
+
+class IngestPromqlSeries(BaseModel):
+    """
+    ### Configuration for label-only PromQL ingestion.
+    This configuration is applied when `stage`:
+      type: ingest
+      subtype: promql_series
+    The samples are fetched only when a later stage needs them, for the signals left at that point.
+    """
+    model_config = ConfigDict(extra='forbid')
+    url: str  # URL to fetch data from
+    ingest_window: str  # Time interval for ingestion
+    match: Optional[str] = '{__name__=~".+"}'  # Series selector of the series to ingest
+    filter_metadata: Optional[str] = ""  # Metadata filter
+    ingest_name_template: Optional[str] = ""  # Template for ingest names
+    step: Optional[str] = ""  # Resolution of the loaded samples (e.g. 5m), empty for raw samples
+    chunk_size: Optional[str] = ""  # Length of the time chunks the window is queried in (e.g. 1d), empty for one query
+    concurrency: Optional[int] = 1  # Number of range queries sent to Prometheus in parallel
+    request_timeout: Optional[float] = 60  # Timeout (in seconds) of each request to Prometheus
+    retries: Optional[int] = 3  # Number of retries of a failed request (connection errors, timeouts, 429 and 5xx)
+    retry_backoff: Optional[float] = 0.5  # Delay (in seconds) before the first retry, doubled on each retry
 
 
 class IngestDummy(BaseModel):
@@ -243,6 +335,18 @@ class EncodeSerialized(BaseModel):
     file_name: str  # Name of the file to ingest
 
 
+class EncodeColumnar(BaseModel):
+    """
+    ### Configuration for columnar directory encoding.
+    This configuration is applied when `stage`:
+      type: encode
+      subtype: columnar
+    """
+    model_config = ConfigDict(extra='forbid')
+    file_name: str  # Name of the directory to write
+    compression: Optional[bool] = True  # Compress the columns (uncompressed columns are faster to write and read)
+
+
 class FeatureExtractionTsfel(BaseModel):
     """
     Configuration for feature extraction using TSFEL.
@@ -253,6 +357,41 @@ class FeatureExtractionTsfel(BaseModel):
     resample_rate: Optional[str] = "30s"  # Resampling rate
     sampling_frequency: Optional[float] = (1 / 30)  # Sampling frequency
     trim: Optional[bool] = False
+    number_of_workers: Optional[int] = 0  # Number of processes extracting features in parallel (0: in process)
+    chunk_size: Optional[int] = 500  # Number of signals per task sent to the worker processes
+    cache_directory: Optional[str] = None  # Directory of the features cache kept between runs (none: no cache)
+    cache_max_entries: Optional[int] = 100000  # Maximal number of signals in the features cache
+    features: Optional[List[str]] = None  # Names of the features to extract (none: all the features of the file)
+    prune_features: Optional[bool] = True  # Extract only the features read by the insights stages (see pipeline)
+
+
+class FeatureExtractionStatistical(BaseModel):
+    """
+    Configuration for the vectorized extraction of statistical features (tsfel compatible).
+    """
+    model_config = ConfigDict(extra='forbid')  # Configuration for the model
+    features_json_file: Optional[str] = \
+        "extract/tsfel_conf/limited_statistical.json"  # tsfel JSON file, statistical features only
+    resample_rate: Optional[str] = "30s"  # Resampling rate (as tsfel), none to use the samples as is
+    trim: Optional[bool] = False
+    cache_directory: Optional[str] = None  # Directory of the features cache kept between runs (none: no cache)
+    cache_max_entries: Optional[int] = 100000  # Maximal number of signals in the features cache
+    features: Optional[List[str]] = None  # Names of the features to extract (none: all the features of the file)
+    prune_features: Optional[bool] = True  # Extract only the features read by the insights stages (see pipeline)
+
+
+class FeatureExtractionOnline(BaseModel):
+    """
+    Configuration for the extraction of statistical features from running accumulators (tsfel compatible).
+    """
+    model_config = ConfigDict(extra='forbid')  # Configuration for the model
+    features_json_file: Optional[str] = \
+        "extract/tsfel_conf/online_statistical.json"  # tsfel JSON file, features computable from accumulators only
+    state_directory: Optional[str] = None  # Directory of the accumulators kept between runs (none: input samples only)
+    retention_runs: Optional[int] = 0  # Drop the accumulators of series not seen for this many runs (0 keeps them)
+    trim: Optional[bool] = False
+    features: Optional[List[str]] = None  # Names of the features to extract (none: all the features of the file)
+    prune_features: Optional[bool] = True  # Extract only the features read by the insights stages (see pipeline)
 
 
 class InsightsAnalysisChainType(Enum):
@@ -277,13 +416,29 @@ class AnalysisChainProcess(BaseModel):
     type: InsightsAnalysisChainType  # The type of analysis process
     filter_signals_by_tags: Optional[List[str]] = []  # Filter signals to analyze by list of tags
     close_to_zero_threshold: Optional[float] = 0  # Threshold for close to zero analysis
+    # Number of counter resets (decreases towards 0) tolerated in increasing signals
+    monotonic_counter_resets: Optional[int] = 0
     pairwise_similarity_threshold: Optional[float] = 0.95  # Threshold for pairwise similarity
     pairwise_similarity_method: Optional[str] = (
         GenerateInsightsType.INSIGHTS_SIMILARITY_METHOD_PEARSON.value)  # Method for pairwise similarity
     # The distance algorithm to use (scipy.spacial.distance) when using distance method
     pairwise_similarity_distance_method: Optional[str] = ""
+    pairwise_correlation_mode: Optional[str] = (
+        PairwiseCorrelationMode.PAIRWISE_CORRELATION_DENSE.value)  # How the pairwise correlations are computed
+    pairwise_block_size: Optional[int] = 2048  # Number of signals per tile of the blocked pairwise correlations
+    pairwise_top_k: Optional[int] = 10  # Number of most correlated signals kept per signal (blocked mode)
+    pairwise_lsh_tables: Optional[int] = 16  # Number of hash tables (approximate mode), more for a higher recall
+    pairwise_lsh_bits: Optional[int] = 12  # Number of bits per hash table (approximate mode), more for less candidates
+    pairwise_reduction: Optional[str] = (
+        PairwiseReduction.PAIRWISE_REDUCTION_FIRST_CORRELATED.value)  # How the correlated signals are reduced
+    pairwise_representative_policy: Optional[str] = (
+        PairwiseRepresentativePolicy.PAIRWISE_REPRESENTATIVE_FIRST.value)  # Representative kept per cluster
     compound_similarity_threshold: Optional[float] = 0.99  # Threshold for compound similarity
-    access_log_file: Optional[str] = None  # Access_log file
+    compound_engine: Optional[str] = (
+        CompoundCorrelationEngine.COMPOUND_CORRELATION_STATSMODELS.value)  # How the compound regressions are computed
+    # Predictors restricted to the most correlated signals (None: all signals), batched engine only
+    compound_top_k: Optional[int] = None
+    access_log_file: Optional[str] = None  # Access_log file (also for the most_accessed representative policy)
 
 
 class GenerateInsights(BaseModel):
@@ -0,0 +1,63 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureStore:
+    """
+    Extracted features of many signals as a single dense float64 matrix, one row per signal,
+    with the names of the features (columns). A signal refers to its row, see `Signal.attach_features`.
+    """
+
+    def __init__(self, matrix, names):
+        # np.asarray keeps views (e.g. onto a memory mapped matrix) as they are
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.names = list(names)
+        if self.matrix.ndim != 2 or self.matrix.shape[1] != len(self.names):
+            raise ValueError(f"features matrix of shape {self.matrix.shape} does not match "
+                             f"{len(self.names)} feature names")
+        self._name_index = {name: index for index, name in enumerate(self.names)}
+        # columns and row index shared by the legacy DataFrame views
+        self._columns = None
+        self._row_index = None
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def columns(self, names):
+        # matrix columns of the features `names`
+        missing = [name for name in names if name not in self._name_index]
+        if missing:
+            raise KeyError(f"features {missing} were not extracted (extracted features: {self.names})")
+        return [self._name_index[name] for name in names]
+
+    def take(self, indices):
+        # new store holding copies of the rows at `indices` (in the given order)
+        return FeatureStore(self.matrix[np.asarray(indices, dtype=np.int64)], self.names)
+
+    def legacy_features(self, index):
+        # the features of the signal at row `index` as a one row DataFrame (as extracted per signal by tsfel),
+        # a view onto the matrix
+        if self._columns is None:
+            self._columns = pd.Index(self.names)
+            self._row_index = pd.RangeIndex(1)
+        return pd.DataFrame(self.matrix[index:index + 1], columns=self._columns, index=self._row_index, copy=False)
+
+    def __getstate__(self):
+        return {"matrix": self.matrix, "names": self.names}
+
+    def __setstate__(self, state):
+        self.__init__(state["matrix"], state["names"])
@@ -0,0 +1,44 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import atexit
+import logging
+from multiprocessing import Pool, current_process
+
+logger = logging.getLogger(__name__)
+
+# number of workers -> pool, kept between the runs of the pipeline (e.g. /api/v1/rerun)
+process_pools = {}
+
+
+def can_use_process_pool():
+    # worker processes can't create a pool of their own (e.g. when running inside map_reduce)
+    return not current_process().daemon
+
+
+def get_process_pool(number_of_workers):
+    # persistent pool of `number_of_workers` processes, created on first use; the workers keep their
+    # caches (e.g. feature plans) from one task and one run to the next
+    pool = process_pools.get(number_of_workers)
+    if pool is None:
+        logger.info(f"starting a pool of {number_of_workers} processes")
+        pool = process_pools[number_of_workers] = Pool(processes=number_of_workers)
+    return pool
+
+
+@atexit.register
+def close_process_pools():
+    for pool in process_pools.values():
+        pool.terminate()
+    process_pools.clear()
@@ -12,14 +12,92 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import numpy as np
+
 from . import utils
+from .feature_store import FeatureStore
+from .signal_store import SignalStore
 
 
 class Signal:
-    def __init__(self, type, metadata={}, time_series=None):
+    # a Signal is a lightweight view; when `store` is set, its samples live in the store at `index`,
+    # when `feature_store` is set, its extracted features are the row `feature_index` of the feature store
+    __slots__ = ("type", "metadata", "_time_series", "_store", "_index", "_feature_store", "_feature_index")
+
+    def __init__(self, type, metadata={}, time_series=None, store=None, index=None):
         self.type = type
         self.metadata = metadata
-        self.time_series = time_series
+        self._time_series = time_series
+        self._store = store
+        self._index = index
+        self._feature_store = None
+        self._feature_index = None
+
+    @property
+    def store(self):
+        return self._store
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def feature_store(self):
+        return self._feature_store
+
+    @property
+    def feature_index(self):
+        return self._feature_index
+
+    @property
+    def time_series(self):
+        # legacy list of [timestamp, value] pairs, materialized on demand for store backed signals
+        if self._store is not None:
+            return self._store.legacy_time_series(self._index)
+        return self._time_series
+
+    @time_series.setter
+    def time_series(self, time_series):
+        self._store = None
+        self._index = None
+        self._time_series = time_series
+
+    @property
+    def timestamps(self):
+        if self._store is not None:
+            return self._store.segment(self._index)[0]
+        return self._time_series_column(0)
+
+    @property
+    def values(self):
+        if self._store is not None:
+            return self._store.segment(self._index)[1]
+        return self._time_series_column(1)
+
+    def _time_series_column(self, column):
+        if self._time_series is None:
+            return np.empty(0, dtype=np.float64)
+        return np.asarray(self._time_series, dtype=np.float64).reshape(-1, 2)[:, column]
+
+    def attach(self, store, index):
+        # make the signal a view onto the samples at `index` in `store`
+        self._time_series = None
+        self._store = store
+        self._index = index
+
+    def attach_features(self, feature_store, index):
+        # make the extracted features of the signal a view onto the row `index` of `feature_store`
+        self.metadata.pop("extracted_features", None)
+        self._feature_store = feature_store
+        self._feature_index = index
+
+    @property
+    def extracted_features(self):
+        # features as a one row DataFrame, materialized on demand for signals attached to a feature store;
+        # signals extracted (or pickled) before the feature store keep theirs in the metadata
+        if self._feature_store is not None:
+            return self._feature_store.legacy_features(self._feature_index)
+        return self.metadata.get("extracted_features")
 
     def set_time_series(self, time_series):
         if not utils.is_dataframe(time_series):
@@ -41,6 +119,24 @@ class Signal:
         else:
             return all(tag in self.metadata["tags"] for tag in tags)
 
+    def __getstate__(self):
+        # a signal pickled on its own carries only its own samples and features, not the whole stores
+        store, index = None, None
+        if self._store is not None:
+            store, index = self._store.take([self._index]), 0
+        feature_store = None
+        if self._feature_store is not None:
+            feature_store = self._feature_store.take([self._feature_index])
+        return {"type": self.type, "metadata": self.metadata, "time_series": self._time_series,
+                "store": store, "index": index, "feature_store": feature_store}
+
+    def __setstate__(self, state):
+        # pickles of signals created before the columnar store only hold `type`, `metadata` and `time_series`
+        self.__init__(state["type"], state["metadata"], state.get("time_series"),
+                      state.get("store"), state.get("index"))
+        if state.get("feature_store") is not None:
+            self.attach_features(state["feature_store"], 0)
+
     def __str__(self):
         return f"Signal: type: {self.type}, metadata: {self.metadata}, time_series:{self.time_series}"
 
@@ -49,44 +145,175 @@ class Signal:
 
 
 class Signals:
-    def __init__(self, metadata={}, signals=None):
+    def __init__(self, metadata={}, signals=None, store=None, feature_store=None):
         if signals is None:
             signals = []
         self.metadata = metadata
         self.signals = signals
+        # columnar samples store shared by (most of) the signals, see `append_time_series`
+        self.store = store
+        # extracted features of the signals (one row per signal), set by the extract stages, see `features_matrix`
+        self.feature_store = feature_store
+        # name lookup index, built on first use and rebuilt when signals are appended (tags are not indexed: they
+        # may be changed on the metadata of signals shared with other Signals)
+        self._name_index = None
+        self._indexed_signals = 0
 
     def append(self, signal):
         self.signals.append(signal)
 
+    def append_time_series(self, type, metadata, timestamps, values):
+        # add a new signal whose samples are kept in the columnar store
+        if self.store is None:
+            self.store = SignalStore()
+        index = self.store.append(timestamps, values)
+        signal = Signal(type, metadata, store=self.store, index=index)
+        self.append(signal)
+        return signal
+
+    def __len__(self):
+        return len(self.signals)
+
+    def load_samples(self):
+        # signals ingested without their samples (e.g. `promql_series` ingest) fetch them here,
+        # only for the signals of this Signals (typically the ones left after filtering)
+        lazy_signals = {}
+        for signal in self.signals:
+            if signal.store is not None and signal.store.sample_loader is not None:
+                lazy_signals.setdefault(id(signal.store.sample_loader), []).append(signal)
+        for signals in lazy_signals.values():
+            loader = signals[0].store.sample_loader
+            store = loader.load(signals)
+            for index, signal in enumerate(signals):
+                signal.attach(store, index)
+            if self.store is not None and self.store.sample_loader is loader:
+                self.store = store
+
+    def samples_store(self):
+        # a store holding the samples of the signals, in order (a copy, the signals are not re-attached)
+        if not self.signals:
+            return SignalStore()
+        stores = {id(signal.store) for signal in self.signals}
+        if len(stores) == 1 and self.signals[0].store is not None:
+            return self.signals[0].store.take([signal.index for signal in self.signals])
+        string_values = next((signal.store.string_values for signal in self.signals if signal.store is not None),
+                             False)
+        store = SignalStore(string_values=string_values)
+        for signal in self.signals:
+            store.append(signal.timestamps, signal.values)
+        return store
+
+    def with_features(self, feature_store):
+        """
+        Signals of the same signals, sharing the metadata and the samples store, with the extracted features of
+        `feature_store`: the features of the signal `i` become a view onto the row `i` of its matrix.
+        """
+        if len(feature_store) != len(self.signals):
+            raise ValueError(f"the feature store has {len(feature_store)} rows for {len(self.signals)} signals")
+        signals = Signals(metadata=self.metadata, store=self.store, feature_store=feature_store)
+        for index, signal in enumerate(self.signals):
+            signal.attach_features(feature_store, index)
+            signals.append(signal)
+        return signals
+
+    def features_matrix(self, names=None):
+        """
+        Extracted features of the signals as a (signals x features) float64 matrix, rows in the order of the
+        signals, and the feature names of its columns. `names` selects the features (by default all the
+        features extracted for the signals). Features missing for some of the signals are NaN.
+        """
+        feature_stores = {id(signal.feature_store): signal.feature_store for signal in self.signals}
+        if len(feature_stores) == 1 and self.signals and self.signals[0].feature_store is not None:
+            # typically the signals of an extract stage or a subset of them: a single take from the matrix
+            feature_store = self.signals[0].feature_store
+            names = feature_store.names if names is None else list(names)
+            rows = np.fromiter((signal.feature_index for signal in self.signals), dtype=np.int64,
+                               count=len(self.signals))
+            if names == feature_store.names and np.array_equal(rows, np.arange(len(feature_store))):
+                return feature_store.matrix, names
+            return feature_store.matrix[np.ix_(rows, feature_store.columns(names))], names
+
+        # signals extracted by different stages (e.g. map_reduce partitions) or extracted before the feature store
+        frames = []
+        for signal in self.signals:
+            if signal.feature_store is None and signal.metadata.get("extracted_features") is None:
+                raise ValueError(f"signal {signal.metadata.get('__name__')} has no extracted features")
+            if signal.feature_store is not None:
+                frames.append((signal.feature_store.names, signal.feature_store.matrix[signal.feature_index]))
+            else:
+                features = signal.metadata["extracted_features"]
+                frames.append((list(features.columns), features.to_numpy(dtype=np.float64)[0]))
+        if names is None:
+            names = list(dict.fromkeys(name for feature_names, _ in frames for name in feature_names))
+        else:
+            names = list(names)
+        name_index = {name: index for index, name in enumerate(names)}
+        matrix = np.full((len(frames), len(names)), np.nan)
+        for position, (feature_names, row) in enumerate(frames):
+            columns = [(name_index[name], index) for index, name in enumerate(feature_names) if name in name_index]
+            if columns:
+                targets, sources = zip(*columns)
+                matrix[position, list(targets)] = row[list(sources)]
+        return matrix, names
+
     def filter_by_type(self, _type):
         return [signal for signal in self.signals if signal.type == _type]
 
+    def _check_indexes(self):
+        # signals may also be appended directly to `self.signals`: drop the index when it is out of date
+        if self._indexed_signals != len(self.signals):
+            self._name_index = None
+            self._indexed_signals = len(self.signals)
+
+    def _get_name_index(self):
+        # name -> positions of the signals with that name (names are not necessarily unique)
+        self._check_indexes()
+        if self._name_index is None:
+            self._name_index = {}
+            for position, signal in enumerate(self.signals):
+                self._name_index.setdefault(signal.metadata["__name__"], []).append(position)
+        return self._name_index
+
+    def _get_positions_by_names(self, names):
+        if isinstance(names, str):
+            names = [names]
+        name_index = self._get_name_index()
+        positions = []
+        for name in names:
+            positions.extend(name_index.get(name, []))
+        return np.unique(np.asarray(positions, dtype=np.int64))
+
+    def _get_tags_mask(self, tags, _any):
+        # boolean mask over the signal positions, read from the current tags of the signals (same as `is_tagged`)
+        tags = set(tags)
+        if _any:
+            matches = (not tags.isdisjoint(signal.metadata.get("tags", ())) for signal in self.signals)
+        else:
+            matches = ("tags" in signal.metadata and tags.issubset(signal.metadata["tags"]) for signal in self.signals)
+        return np.fromiter(matches, dtype=bool, count=len(self.signals))
+
     def tag_by_names(self, names, tag, filter_in=True):
-        for signal in self.signals:
-            if signal.metadata["__name__"] in names:
-                if filter_in:
-                    signal.tag(tag)
-            else:
-                if not filter_in:
-                    signal.tag(tag)
+        positions = self._get_positions_by_names(names)
+        if not filter_in:
+            mask = np.ones(len(self.signals), dtype=bool)
+            mask[positions] = False
+            positions = np.flatnonzero(mask)
+        for position in positions.tolist():
+            self.signals[position].tag(tag)
 
     def filter_by_tags(self, tags, filter_in=True, _any=True):
-        if filter_in:
-            return [signal for signal in self.signals if signal.is_tagged(tags, _any)]
-        else:
-            return [signal for signal in self.signals if not signal.is_tagged(tags, _any)]
+        mask = self._get_tags_mask(tags, _any)
+        if not filter_in:
+            mask = ~mask
+        return [self.signals[position] for position in np.flatnonzero(mask).tolist()]
 
     def filter_by_names(self, names, filter_in=True):
-        filtered_signals = []
-        for signal in self.signals:
-            if signal.metadata["__name__"] in names:
-                if filter_in:
-                    filtered_signals.append(signal)
-            else:
-                if not filter_in:
-                    filtered_signals.append(signal)
-
-        return Signals({}, filtered_signals)
+        positions = self._get_positions_by_names(names)
+        if not filter_in:
+            mask = np.ones(len(self.signals), dtype=bool)
+            mask[positions] = False
+            positions = np.flatnonzero(mask)
+        return Signals({}, [self.signals[position] for position in positions.tolist()])
 
     def __iter__(self):
         return iter(self.signals)
@@ -102,6 +329,75 @@ class Signals:
         else:
             raise TypeError("Indices must be integers or slices")
 
+    def __getstate__(self):
+        # store backed signals are pickled as (type, metadata, index) records over a single compact store
+        store_signals = [signal for signal in self.signals if signal.store is not None]
+        store_indices = [signal.index for signal in store_signals]
+        stores = {id(signal.store): signal.store for signal in store_signals}
+        store = self.store
+        if len(stores) == 1:
+            # typically a subset (e.g. a map partition) of a larger store, keep only its own samples
+            shared_store = store_signals[0].store
+            if shared_store is not store or store_indices != list(range(len(store))):
+                store = shared_store.take(store_indices)
+        elif len(stores) > 1:
+            store = SignalStore(string_values=store_signals[0].store.string_values)
+            for signal in store_signals:
+                store.append(signal.timestamps, signal.values)
+        records = []
+        position = 0
+        for signal in self.signals:
+            if signal.store is not None:
+                records.append((signal.type, signal.metadata, None, position))
+                position += 1
+            else:
+                records.append((signal.type, signal.metadata, signal.time_series, None))
+        feature_store, feature_indexes = self._features_state()
+        return {"metadata": self.metadata, "store": store, "signals": records,
+                "feature_store": feature_store, "feature_indexes": feature_indexes}
+
+    def _features_state(self):
+        # features of the signals attached to feature stores, as a single compact feature store
+        # and the row of each signal in it (None for signals without)
+        feature_signals = [signal for signal in self.signals if signal.feature_store is not None]
+        if not feature_signals:
+            return None, None
+        feature_stores = {id(signal.feature_store) for signal in feature_signals}
+        feature_store = feature_signals[0].feature_store
+        rows = [signal.feature_index for signal in feature_signals]
+        if len(feature_stores) == 1:
+            if rows != list(range(len(feature_store))):
+                feature_store = feature_store.take(rows)
+        else:
+            matrix, names = Signals(signals=feature_signals).features_matrix()
+            feature_store = FeatureStore(matrix, names)
+        feature_indexes = []
+        position = 0
+        for signal in self.signals:
+            if signal.feature_store is not None:
+                feature_indexes.append(position)
+                position += 1
+            else:
+                feature_indexes.append(None)
+        return feature_store, feature_indexes
+
+    def __setstate__(self, state):
+        self.__init__(state["metadata"], store=state.get("store"), feature_store=state.get("feature_store"))
+        for signal in state["signals"]:
+            if isinstance(signal, Signal):
+                # pickles of signals created before the columnar store
+                self.signals.append(signal)
+                continue
+            _type, metadata, time_series, index = signal
+            if index is None:
+                self.signals.append(Signal(_type, metadata, time_series))
+            else:
+                self.signals.append(Signal(_type, metadata, store=self.store, index=index))
+        if state.get("feature_indexes") is not None:
+            for signal, feature_index in zip(self.signals, state["feature_indexes"]):
+                if feature_index is not None:
+                    signal.attach_features(self.feature_store, feature_index)
+
     def __str__(self):
         return f"Signal: metadata: {self.metadata}, signals:{self.signals}"
 
@@ -0,0 +1,190 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import math
+
+import numpy as np
+
+
+def legacy_timestamp(timestamp):
+    # JSON sources provide integral timestamps as ints, keep them that way in the legacy view
+    return int(timestamp) if timestamp.is_integer() else timestamp
+
+
+def legacy_string_value(value):
+    # Prometheus renders sample values as strings (Go 'f' formatting, shortest representation)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return np.format_float_positional(value, trim='-')
+
+
+def pairs_to_columns(time_series):
+    # time_series is a list of [timestamp, value] pairs (values may be numeric strings)
+    pairs = np.asarray(time_series, dtype=np.float64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def segment_indices(offsets, indices):
+    # positions (in the samples arrays) of all the samples of the signals at `indices`, in order
+    indices = np.asarray(indices, dtype=np.int64)
+    starts = offsets[indices]
+    lengths = offsets[indices + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), lengths
+    # each sample position is its segment start plus its rank within the segment
+    segment_starts_in_output = np.cumsum(lengths) - lengths
+    positions = np.arange(total, dtype=np.int64) - np.repeat(segment_starts_in_output - starts, lengths)
+    return positions, lengths
+
+
+def segment_changes(values, offsets):
+    """
+    Number of increases, of decreases and of counter resets (decreases to a value smaller than the decrease, i.e.
+    closer to zero than to the previous value) between the consecutive values of each segment (the samples of
+    signal `i` are at `offsets[i]:offsets[i + 1]`), for all the segments at once; NaN values are skipped.
+    """
+    lengths = np.diff(offsets)
+    segment_ids = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+    keep = ~np.isnan(values)
+    values, segment_ids = values[keep], segment_ids[keep]
+    differences = np.diff(values)
+    # the differences between the last value of a segment and the first value of the next one are dropped
+    next_ids = segment_ids[1:]
+    same_segment = next_ids == segment_ids[:-1]
+    increases = np.bincount(next_ids[same_segment & (differences > 0)], minlength=len(lengths))
+    decreases = np.bincount(next_ids[same_segment & (differences < 0)], minlength=len(lengths))
+    reset = same_segment & (differences < 0) & (values[1:] < -differences)
+    resets = np.bincount(next_ids[reset], minlength=len(lengths))
+    return increases, decreases, resets
+
+
+class SignalStore:
+    """
+    Columnar storage for the samples of many signals.
+
+    The samples of all signals are kept in two contiguous float64 arrays (`timestamps` and `values`),
+    samples of signal `i` are at `offsets[i]:offsets[i + 1]`.
+    Appended samples are buffered and concatenated into the arrays on first read.
+    """
+
+    def __init__(self, string_values=False):
+        # when True, the legacy `time_series` view renders values as strings (as in Prometheus JSON)
+        self.string_values = string_values
+        self._timestamps = np.empty(0, dtype=np.float64)
+        self._values = np.empty(0, dtype=np.float64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._pending_timestamps = []
+        self._pending_values = []
+        self._pending_lengths = []
+        self._strings = {}
+        # signals ingested without their samples (labels only) get them on demand from the loader,
+        # see `Signals.load_samples`
+        self.sample_loader = None
+
+    def __len__(self):
+        return len(self._offsets) - 1 + len(self._pending_lengths)
+
+    def append(self, timestamps, values):
+        timestamps = np.asarray(timestamps, dtype=np.float64).ravel()
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(timestamps) != len(values):
+            raise ValueError(f"timestamps and values lengths differ: {len(timestamps)} != {len(values)}")
+        index = len(self)
+        self._pending_timestamps.append(timestamps)
+        self._pending_values.append(values)
+        self._pending_lengths.append(len(timestamps))
+        return index
+
+    def intern_labels(self, labels):
+        # label names and values repeat across signals, keep a single copy of each string
+        strings = self._strings
+        return {strings.setdefault(key, key): strings.setdefault(value, value) if isinstance(value, str) else value
+                for key, value in labels.items()}
+
+    def _compact(self):
+        if not self._pending_lengths:
+            return
+        self._timestamps = np.concatenate([self._timestamps] + self._pending_timestamps)
+        self._values = np.concatenate([self._values] + self._pending_values)
+        self._offsets = np.concatenate(
+            [self._offsets, self._offsets[-1] + np.cumsum(self._pending_lengths, dtype=np.int64)])
+        self._pending_timestamps = []
+        self._pending_values = []
+        self._pending_lengths = []
+
+    @property
+    def timestamps(self):
+        self._compact()
+        return self._timestamps
+
+    @property
+    def values(self):
+        self._compact()
+        return self._values
+
+    @property
+    def offsets(self):
+        self._compact()
+        return self._offsets
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def segment(self, index):
+        offsets = self.offsets
+        start, end = offsets[index], offsets[index + 1]
+        return self._timestamps[start:end], self._values[start:end]
+
+    def legacy_time_series(self, index):
+        timestamps, values = self.segment(index)
+        if self.string_values:
+            return [[legacy_timestamp(timestamp), legacy_string_value(value)]
+                    for timestamp, value in zip(timestamps.tolist(), values.tolist())]
+        return [[legacy_timestamp(timestamp), value] for timestamp, value in zip(timestamps.tolist(), values.tolist())]
+
+    @classmethod
+    def from_arrays(cls, timestamps, values, lengths, string_values=False):
+        # store over already concatenated samples, `lengths` is the number of samples of each signal
+        store = cls(string_values=string_values)
+        store._timestamps = np.asarray(timestamps, dtype=np.float64)
+        store._values = np.asarray(values, dtype=np.float64)
+        store._offsets = np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(lengths, dtype=np.int64)])
+        return store
+
+    def take(self, indices):
+        # new store holding copies of the segments at `indices` (in the given order)
+        positions, lengths = segment_indices(self.offsets, indices)
+        store = SignalStore.from_arrays(self._timestamps[positions], self._values[positions], lengths,
+                                        string_values=self.string_values)
+        store.sample_loader = self.sample_loader
+        return store
+
+    def __getstate__(self):
+        self._compact()
+        return {"string_values": self.string_values,
+                "timestamps": self._timestamps,
+                "values": self._values,
+                "offsets": self._offsets,
+                "sample_loader": self.sample_loader}
+
+    def __setstate__(self, state):
+        self.__init__(string_values=state["string_values"])
+        self._timestamps = state["timestamps"]
+        self._values = state["values"]
+        self._offsets = state["offsets"]
+        self.sample_loader = state.get("sample_loader")
@@ -12,8 +12,12 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import re
+
 import pandas as pd
 
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800, "y": 31536000}
+
 
 def is_dataframe(input_data):
     return isinstance(input_data, pd.DataFrame)
@@ -29,3 +33,16 @@ def add_slash_to_dir(directory):
     if directory and not directory.endswith('/'):
         directory += '/'
     return directory
+
+
+def parse_duration(duration):
+    # Prometheus duration (e.g. `30s`, `5m`, `1h30m`) or plain number of seconds, returned in seconds
+    duration = str(duration).strip()
+    try:
+        return float(duration)
+    except ValueError:
+        pass
+    units = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h|d|w|y)", duration)
+    if not units or "".join(number + unit for number, unit in units) != duration:
+        raise ValueError(f"invalid duration {duration!r}")
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in units)
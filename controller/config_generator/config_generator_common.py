@@ -41,6 +41,8 @@ def generate_reduce(config, extracted_signals, signals_to_reduce):
             signal_filter_template, signal_name)]
 
     context_per_processor = {}
+    # (name, condition) of the signals already added, per processor
+    added_signals = {}
 
     # building context per each of the processors with signals to drop (for the jinja template)
     for _id, signal_name in enumerate(signals_to_reduce):
@@ -54,15 +56,12 @@ def generate_reduce(config, extracted_signals, signals_to_reduce):
 
         if processor_id not in context_per_processor:
             context_per_processor[processor_id] = {"signals_to_drop": []}
+            added_signals[processor_id] = set()
 
         # Adding the signal to the list of signals to drop, only if the signal is not already added to the list
-        found = False
-        for added_signal in context_per_processor[processor_id]['signals_to_drop']:
-            if (added_signal['name'] == signal_to_drop['name'] and
-                    added_signal['condition'] == signal_to_drop['condition']):
-                found = True
-                break
-        if not found:
+        signal_key = (signal_to_drop['name'], signal_to_drop['condition'])
+        if signal_key not in added_signals[processor_id]:
+            added_signals[processor_id].add(signal_key)
             context_per_processor[processor_id]['signals_to_drop'].append(
                 signal_to_drop)
     return context_per_processor
@@ -85,6 +84,8 @@ def generate_adjust(config, extracted_signals, signals_to_keep):
 
     logger.debug(f" ********* signals_to_adjust = {signals_to_adjust}")
     context_per_processor = {}
+    # (name, condition) of the signals already added, per processor
+    added_signals = {}
 
     # building context per each of the processors with signals to adjust (for the jinja template)
     for _id, signal_name in enumerate(signals_to_adjust):
@@ -115,15 +116,12 @@ def generate_adjust(config, extracted_signals, signals_to_keep):
 
         if processor_id not in context_per_processor:
             context_per_processor[processor_id] = {"signals_to_adjust": []}
+            added_signals[processor_id] = set()
 
         # Adding the signal to the list of signals to adjust, only if the signal is not already added to the list
-        found = False
-        for added_signal in context_per_processor[processor_id]['signals_to_adjust']:
-            if (added_signal['name'] == signal_to_adjust['name'] and
-                    added_signal['condition'] == signal_to_adjust['condition']):
-                found = True
-                break
-        if not found:
+        signal_key = (signal_to_adjust['name'], signal_to_adjust['condition'])
+        if signal_key not in added_signals[processor_id]:
+            added_signals[processor_id].add(signal_key)
             context_per_processor[processor_id]['signals_to_adjust'].append(
                 signal_to_adjust)
     return context_per_processor
@@ -0,0 +1,31 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import logging
+
+from common.columnar_format import write_signals
+
+logger = logging.getLogger(__name__)
+
+
+def encode(encode_config, data):
+    encode_directory = encode_config.file_name
+
+    logger.info(f"writing columnar format to {encode_directory}")
+    try:
+        write_signals(encode_directory, data, compression=encode_config.compression)
+    except Exception as e:
+        err = f"Error on directory {encode_directory}: {e}"
+        raise RuntimeError(err) from e
+    return data
@@ -27,6 +27,11 @@ def encode(subtype, config, data):
         typed_config = api.EncodeSerialized(**config)
         from encode.pickle_encode import encode
         encode(typed_config, data[0])
+    elif subtype == api.EncodeSubType.PIPELINE_ENCODE_COLUMNAR.value:
+        # verify config parameters conform to structure
+        typed_config = api.EncodeColumnar(**config)
+        from encode.columnar_encode import encode
+        encode(typed_config, data[0])
     else:
         raise "unsupported encode configuration"
     return data
@@ -29,6 +29,16 @@ def extract(subtype, config, input_data):
         logger.debug("using tsfel feature_extraction")
         from extract.feature_extraction_tsfel import extract
         extracted_signals = extract(tsfel_config, signals_list)
+    elif subtype == api.ExtractSubType.PIPELINE_EXTRACT_STATISTICAL.value:
+        statistical_config = api.FeatureExtractionStatistical(**config)
+        logger.debug("using statistical feature_extraction")
+        from extract.feature_extraction_statistical import extract
+        extracted_signals = extract(statistical_config, signals_list)
+    elif subtype == api.ExtractSubType.PIPELINE_EXTRACT_ONLINE.value:
+        online_config = api.FeatureExtractionOnline(**config)
+        logger.debug("using online feature_extraction")
+        from extract.feature_extraction_online import extract
+        extracted_signals = extract(online_config, signals_list)
     elif subtype == api.ExtractSubType.PIPELINE_EXTRACT_TRIM.value:
         logger.debug("using trim_time_series")
         from extract.trim_time_series import extract
@@ -0,0 +1,196 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Content-addressed cache of extracted features, kept on local disk between runs: the features of a signal are
+# cached under a hash of its series identity (labels), the digest of its samples and the feature plan, so a signal
+# is only extracted again when its samples (or the plan) change.
+# The cache directory holds one `<plan digest>.npz` file per feature plan with the (sorted) keys, the features
+# matrix, the feature names and the last time each entry was used; least recently used entries are evicted
+# when the cache holds more than `max_entries` entries (over all plans).
+
+import copy
+import hashlib
+import logging
+import os
+import time
+
+import numpy as np
+
+from common.signal import Signals
+from ingest.incremental import series_key
+
+logger = logging.getLogger(__name__)
+
+# changes of the cache layout or of the features computation invalidate the cached features
+CACHE_VERSION = 1
+KEY_SIZE = 20
+
+# counters of the cache lookups in this process, see `get_statistics` (/api/v1/feature_cache)
+statistics = {"hits": 0, "misses": 0, "evictions": 0,
+              "last_run": {"directory": None, "hits": 0, "misses": 0, "evictions": 0}}
+
+
+def get_statistics():
+    return copy.deepcopy(statistics)
+
+
+def plan_digest(*parts):
+    # digest of everything the extracted features depend on besides the samples (subtype, configuration, versions)
+    return hashlib.blake2b(repr((CACHE_VERSION,) + parts).encode(), digest_size=KEY_SIZE).hexdigest()
+
+
+def file_digest(file_name):
+    with open(file_name, 'rb') as file:
+        return hashlib.blake2b(file.read(), digest_size=KEY_SIZE).hexdigest()
+
+
+def signal_keys(signals):
+    # cache key of each signal: its series identity and the digest of its samples
+    keys = np.empty(len(signals.signals), dtype=f"S{KEY_SIZE}")
+    for position, signal in enumerate(signals.signals):
+        key = hashlib.blake2b(digest_size=KEY_SIZE)
+        labels = {name: value for name, value in signal.metadata.items() if name != "extracted_features"}
+        key.update(repr(series_key(labels)).encode())
+        key.update(np.ascontiguousarray(signal.timestamps))
+        key.update(np.ascontiguousarray(signal.values))
+        keys[position] = key.digest()
+    return keys
+
+
+class FeatureCache:
+    """
+    The cached features of one feature plan (`plan` digest) in `directory`.
+    """
+
+    def __init__(self, directory, plan, max_entries=100000):
+        self.directory = directory
+        self.plan = plan
+        self.max_entries = max_entries
+        self.file_name = os.path.join(directory, f"{plan}.npz")
+        self.keys = np.empty(0, dtype=f"S{KEY_SIZE}")
+        self.matrix = None
+        self.names = None
+        self.last_used = np.empty(0)
+        if os.path.exists(self.file_name):
+            try:
+                with np.load(self.file_name) as cache:
+                    self.keys, self.matrix, self.last_used = cache["keys"], cache["matrix"], cache["last_used"]
+                    self.names = cache["names"].tolist()
+            except Exception as e:
+                # a damaged cache only costs the extraction of the features again
+                logger.warning(f"ignoring the feature cache {self.file_name}: {e}")
+
+    def lookup(self, keys):
+        # positions (in the cache) of `keys`, -1 for the keys not in the cache
+        if not len(self.keys):
+            return np.full(len(keys), -1)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[positions] == keys, positions, -1)
+
+    def store(self, keys, matrix, names):
+        # add (or touch) the features of `keys` and write the cache; returns the number of evicted entries
+        now = time.time()
+        if self.names != names:
+            self.keys, self.matrix, self.last_used = np.empty(0, dtype=f"S{KEY_SIZE}"), None, np.empty(0)
+        keys, first = np.unique(keys, return_index=True)
+        stale = ~np.isin(self.keys, keys)
+        all_keys = np.concatenate([self.keys[stale], keys])
+        order = np.argsort(all_keys)
+        self.keys = all_keys[order]
+        old_matrix = self.matrix[stale] if self.matrix is not None else np.empty((0, len(names)))
+        self.matrix = np.concatenate([old_matrix, matrix[first]])[order]
+        self.last_used = np.concatenate([self.last_used[stale], np.full(len(keys), now)])[order]
+        self.names = list(names)
+        self._write()
+        return self._evict()
+
+    def _write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # write to a temporary file first so that readers never see a truncated cache
+        temporary_file_name = f"{self.file_name}.{os.getpid()}.tmp.npz"
+        np.savez(temporary_file_name, keys=self.keys, matrix=self.matrix, last_used=self.last_used,
+                 names=np.array(self.names, dtype=str))
+        os.replace(temporary_file_name, self.file_name)
+
+    def _evict(self):
+        # least recently used entries over the caches of all the plans in the directory
+        file_names = [os.path.join(self.directory, file_name) for file_name in sorted(os.listdir(self.directory))
+                      if file_name.endswith(".npz") and ".tmp." not in file_name]
+        last_used = []
+        for file_name in file_names:
+            if file_name == self.file_name:
+                last_used.append(self.last_used)
+            else:
+                with np.load(file_name) as cache:
+                    last_used.append(cache["last_used"])
+        total = sum(len(times) for times in last_used)
+        if not self.max_entries or total <= self.max_entries:
+            return 0
+        keep = np.zeros(total, dtype=bool)
+        keep[np.argsort(-np.concatenate(last_used), kind="stable")[:self.max_entries]] = True
+        start = 0
+        for file_name, times in zip(file_names, last_used):
+            file_keep, start = keep[start:start + len(times)], start + len(times)
+            if file_keep.all():
+                continue
+            if file_name == self.file_name:
+                cache = self
+            else:
+                cache = FeatureCache(self.directory, os.path.basename(file_name)[:-len(".npz")])
+            cache.keys, cache.matrix, cache.last_used = \
+                cache.keys[file_keep], cache.matrix[file_keep], cache.last_used[file_keep]
+            cache._write()
+        return int(total - self.max_entries)
+
+
+def cached_features(signals, directory, plan, compute, max_entries=100000):
+    """
+    (signals x features) matrix and feature names of `signals`: the features of the signals already extracted
+    with the same `plan` (same labels and samples) are taken from the cache in `directory`,
+    `compute(signals)` extracts the features of the others (returning their matrix and feature names).
+    """
+    cache = FeatureCache(directory, plan, max_entries)
+    keys = signal_keys(signals)
+    positions = cache.lookup(keys)
+    hits = positions >= 0
+    missing = np.flatnonzero(~hits)
+
+    names = cache.names
+    if len(missing):
+        computed, computed_names = compute(Signals(signals.metadata,
+                                                   [signals.signals[position] for position in missing.tolist()]))
+        if names is not None and hits.any() and computed_names != names:
+            # cached with other feature names (should not happen for the same plan): extract everything again
+            logger.warning(f"the feature names of the feature cache {cache.file_name} changed, ignoring it")
+            hits[:] = False
+            missing = np.arange(len(signals.signals))
+            computed, computed_names = compute(signals)
+        names = computed_names
+    names = names if names is not None else []
+
+    matrix = np.empty((len(signals.signals), len(names)))
+    if hits.any():
+        matrix[hits] = cache.matrix[positions[hits]]
+    if len(missing):
+        matrix[missing] = computed
+    evictions = cache.store(keys, matrix, names) if len(signals.signals) else 0
+
+    hit_count, miss_count = int(hits.sum()), len(missing)
+    statistics["hits"] += hit_count
+    statistics["misses"] += miss_count
+    statistics["evictions"] += evictions
+    statistics["last_run"] = {"directory": directory, "hits": hit_count, "misses": miss_count,
+                              "evictions": evictions}
+    logger.info(f"feature cache {directory}: {hit_count} hits, {miss_count} misses, {evictions} evictions")
+    return matrix, names
@@ -0,0 +1,283 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Statistical features from running accumulators: for each series, the number of samples, the mean and the sum of
+# squared deviations from the mean (Welford), the min, max, sum of squares and histograms of all the samples seen
+# so far. New samples (newer than the last accumulated sample of their series) are folded into the accumulators
+# chunk by chunk (Chan et al. merge of the statistics of a chunk), so the features of a long window are computed
+# without holding its samples, and repeated runs only process the samples ingested since the previous run.
+
+import logging
+import os
+import pickle
+
+import numpy as np
+
+from common.feature_store import FeatureStore
+from extract.feature_extraction_statistical import SegmentStatistics, extract_features, load_features
+from ingest.incremental import series_key
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "online_features_state"
+
+# tsfel function -> statistic computable from the accumulators (method of FeatureAccumulators.statistics)
+ONLINE_STATISTICS = {
+    "calc_max": "max",
+    "calc_min": "min",
+    "calc_mean": "mean",
+    "calc_var": "var",
+    "calc_std": "std",
+    "abs_energy": "abs_energy",
+    "pk_pk_distance": "pk_pk_distance",
+    "hist": "histogram",
+}
+
+
+class AccumulatedStatistics:
+    """
+    The statistics of the series at `positions` of `accumulators`, with the methods of SegmentStatistics
+    used by the features in ONLINE_STATISTICS.
+    """
+
+    def __init__(self, accumulators, positions):
+        self.accumulators = accumulators
+        self.positions = positions
+        self.count = len(positions)
+
+    def _take(self, values):
+        return values[self.positions]
+
+    def max(self):
+        return self._take(self.accumulators.max)
+
+    def min(self):
+        return self._take(self.accumulators.min)
+
+    def mean(self):
+        return np.where(self._take(self.accumulators.count) > 0, self._take(self.accumulators.mean), np.nan)
+
+    def var(self):
+        count = self._take(self.accumulators.count)
+        return np.where(count > 0, self._take(self.accumulators.m2) / np.maximum(count, 1), np.nan)
+
+    def std(self):
+        return np.sqrt(self.var())
+
+    def abs_energy(self):
+        return self._take(self.accumulators.energy)
+
+    def pk_pk_distance(self):
+        return np.abs(self.max() - self.min())
+
+    def histogram(self, nbins=10, r=1):
+        return self._take(self.accumulators.histograms[(nbins, r)])
+
+
+class FeatureAccumulators:
+    """
+    Running accumulators of the samples of each series (identified by `series_key`), with the timestamp of the
+    last accumulated sample of the series (high-water mark) and the last run (see `evict`) the series was
+    updated in. `histograms` are the (nbins, r) parameters of the accumulated histograms.
+    """
+
+    def __init__(self, histograms=()):
+        self.key_index = {}
+        self.runs = 0
+        self.last_seen = np.zeros(0, dtype=np.int64)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+        self.energy = np.zeros(0)
+        self.high_water_marks = np.zeros(0)
+        self.histograms = {histogram: np.zeros((0, histogram[0])) for histogram in histograms}
+
+    def __len__(self):
+        return len(self.key_index)
+
+    def positions(self, keys):
+        # positions of the accumulators of the series `keys`, new series get empty accumulators
+        positions = np.empty(len(keys), dtype=np.int64)
+        for position, key in enumerate(keys):
+            positions[position] = self.key_index.setdefault(key, len(self.key_index))
+        added = len(self.key_index) - len(self.count)
+        if added:
+            self.count = np.concatenate([self.count, np.zeros(added, dtype=np.int64)])
+            self.mean, self.m2, self.energy = (np.concatenate([values, np.zeros(added)])
+                                               for values in (self.mean, self.m2, self.energy))
+            self.min, self.max = (np.concatenate([values, np.full(added, np.nan)]) for values in (self.min, self.max))
+            self.high_water_marks = np.concatenate([self.high_water_marks, np.full(added, -np.inf)])
+            self.last_seen = np.concatenate([self.last_seen, np.zeros(added, dtype=np.int64)])
+            self.histograms = {histogram: np.concatenate([counts, np.zeros((added, histogram[0]))])
+                               for histogram, counts in self.histograms.items()}
+        return positions
+
+    def update(self, keys, timestamps, values, lengths):
+        """
+        Fold the samples of the series `keys` (series `i` has the next `lengths[i]` samples, in time order)
+        newer than the high-water marks into the accumulators. Returns the number of folded samples.
+        """
+        positions = self.positions(keys)
+        self.last_seen[positions] = self.runs
+        timestamps = np.asarray(timestamps)
+        values = np.asarray(values, dtype=np.float64)
+        segment_ids = np.repeat(np.arange(len(keys), dtype=np.int64), np.asarray(lengths, dtype=np.int64))
+        # a series found several times is folded once per occurrence, in order (one round per occurrence)
+        occurrences = {}
+        rounds = np.empty(len(keys), dtype=np.int64)
+        for index, position in enumerate(positions.tolist()):
+            rounds[index] = occurrences.get(position, 0)
+            occurrences[position] = rounds[index] + 1
+        folded = 0
+        for round_index in range(max(occurrences.values(), default=0)):
+            in_round = rounds == round_index
+            # missing (NaN) samples are not accumulated
+            new = in_round[segment_ids] & (timestamps > self.high_water_marks[positions][segment_ids]) & \
+                ~np.isnan(values)
+            new_lengths = np.bincount(segment_ids[new], minlength=len(keys))[in_round]
+            folded += self._fold(positions[in_round], timestamps[new], values[new], new_lengths)
+        return folded
+
+    def _fold(self, positions, timestamps, values, lengths):
+        # merge the statistics of the chunk (segments of `values`) into the accumulators of distinct `positions`
+        chunk = SegmentStatistics(values, lengths)
+        has_samples = lengths > 0
+        positions, new_count = positions[has_samples], lengths[has_samples]
+        count = self.count[positions]
+        total = count + new_count
+        first = count == 0
+
+        mean, m2 = self.mean[positions], self.m2[positions]
+        chunk_mean = chunk.mean()[has_samples]
+        chunk_m2 = chunk.var()[has_samples] * new_count
+        delta = chunk_mean - mean
+        self.mean[positions] = np.where(first, chunk_mean, mean + delta * new_count / total)
+        self.m2[positions] = np.where(first, chunk_m2, m2 + chunk_m2 + delta * delta * count * new_count / total)
+        self.min[positions] = np.where(first, chunk.min()[has_samples],
+                                       np.minimum(self.min[positions], chunk.min()[has_samples]))
+        self.max[positions] = np.where(first, chunk.max()[has_samples],
+                                       np.maximum(self.max[positions], chunk.max()[has_samples]))
+        # constant series have exactly zero variance (as the statistical subtype)
+        self.m2[positions[self.min[positions] == self.max[positions]]] = 0.0
+        self.energy[positions] += chunk.abs_energy()[has_samples]
+        for (nbins, r), counts in self.histograms.items():
+            counts[positions] += chunk.histogram(nbins, r)[has_samples]
+        self.count[positions] = total
+        self.high_water_marks[positions] = SegmentStatistics(timestamps, lengths).max()[has_samples]
+        return int(new_count.sum())
+
+    def evict(self, retention_runs=0):
+        """
+        End the current run: drop the accumulators of the series not updated in the last `retention_runs` runs
+        (this one included), 0 keeps all the series. Returns the number of dropped series.
+        """
+        evicted = 0
+        if retention_runs:
+            keep = self.runs - self.last_seen < retention_runs
+            evicted = int((~keep).sum())
+            if evicted:
+                new_positions = np.cumsum(keep) - 1
+                self.key_index = {key: int(new_positions[position]) for key, position in self.key_index.items()
+                                  if keep[position]}
+                for name in ("count", "mean", "m2", "min", "max", "energy", "high_water_marks", "last_seen"):
+                    setattr(self, name, getattr(self, name)[keep])
+                self.histograms = {histogram: counts[keep] for histogram, counts in self.histograms.items()}
+        self.runs += 1
+        return evicted
+
+    def __setstate__(self, state):
+        # states saved before the eviction of the series: all the series count as updated in the last run
+        self.__dict__.update(state)
+        if "last_seen" not in state:
+            self.runs = 0
+            self.last_seen = np.zeros(len(self.count), dtype=np.int64)
+
+    def statistics(self, keys):
+        # statistics of the (already accumulated) series `keys`
+        return AccumulatedStatistics(self, np.array([self.key_index[key] for key in keys], dtype=np.int64))
+
+
+def histograms_of(features):
+    return tuple(sorted({(parameters.get("nbins", 10), parameters.get("r", 1))
+                         for _, statistic, parameters in features if statistic == "histogram"}))
+
+
+def load_state(state_directory, histograms):
+    state_file = os.path.join(state_directory, STATE_FILE)
+    if not os.path.exists(state_file):
+        logger.info(f"No online features state in {state_directory}, accumulating from scratch")
+        return FeatureAccumulators(histograms)
+    try:
+        with open(state_file, 'rb') as file:
+            accumulators = pickle.load(file)
+    except Exception as e:
+        err = f"Error on file {state_file}: {e}"
+        raise RuntimeError(err) from e
+    if tuple(sorted(accumulators.histograms)) != histograms:
+        # histograms can not be accumulated backwards
+        logger.warning(f"The histograms of the online features state {state_file} changed, accumulating from scratch")
+        return FeatureAccumulators(histograms)
+    logger.info(f"Loaded online features state from {state_file}: {len(accumulators)} series")
+    return accumulators
+
+
+def save_state(state_directory, accumulators):
+    state_file = os.path.join(state_directory, STATE_FILE)
+    try:
+        os.makedirs(state_directory, exist_ok=True)
+        # write to a temporary file first so that a failed run never leaves a truncated state
+        with open(state_file + ".tmp", 'wb') as file:
+            pickle.dump(accumulators, file)
+        os.replace(state_file + ".tmp", state_file)
+    except Exception as e:
+        err = f"Error on file {state_file}: {e}"
+        raise RuntimeError(err) from e
+
+
+def signal_keys(signals):
+    return [series_key({name: value for name, value in signal.metadata.items() if name != "extracted_features"})
+            for signal in signals]
+
+
+def extract(online_config, signals):
+    features = load_features(online_config.features_json_file, ONLINE_STATISTICS, "online", online_config.features)
+    histograms = histograms_of(features)
+    if online_config.state_directory:
+        accumulators = load_state(online_config.state_directory, histograms)
+    else:
+        accumulators = FeatureAccumulators(histograms)
+
+    keys = signal_keys(signals)
+    store = signals.samples_store()
+    folded = accumulators.update(keys, store.timestamps, store.values, store.lengths)
+    matrix, names = extract_features(features, accumulators.statistics(keys))
+    evicted = accumulators.evict(online_config.retention_runs)
+    logger.info(f"online features: {folded} new samples folded into the accumulators of {len(keys)} signals "
+                f"({len(accumulators)} series accumulated)")
+    if evicted:
+        logger.info(f"online features: dropped the accumulators of {evicted} series not seen for "
+                    f"{online_config.retention_runs} runs")
+    if online_config.state_directory:
+        save_state(online_config.state_directory, accumulators)
+
+    feature_store = FeatureStore(matrix, names)
+    extracted_signals = signals.with_features(feature_store)
+
+    if online_config.trim:
+        from extract.trim_time_series import extract as extract_trim
+        extracted_signals = extract_trim(None, extracted_signals)
+
+    return extracted_signals
@@ -0,0 +1,209 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Statistical features of all signals at once: NumPy reductions over the segments (signals) of the columnar
+# samples arrays, instead of one tsfel call per signal. The features configuration is the tsfel one and the
+# features are named and ordered as by the tsfel subtype, for the tsfel functions in STATISTICS, and computed over
+# the samples resampled as by the tsfel subtype.
+
+import logging
+
+import numpy as np
+
+from common.feature_store import FeatureStore
+from extract.feature_cache import cached_features, file_digest, plan_digest
+from extract.features_config import HEADER, load_features_config
+from extract.resample import resample_signals
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentStatistics:
+    """
+    Reductions over the segments of the samples `values` (segment `i` has `lengths[i]` samples),
+    each computed on first use and shared by the features that need it.
+    Empty segments get NaN (zero histogram counts).
+    """
+
+    def __init__(self, values, lengths):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.count = len(self.lengths)
+        self.starts = np.cumsum(self.lengths) - self.lengths
+        self.nonempty = self.lengths > 0
+        self.segment_ids = np.repeat(np.arange(self.count, dtype=np.int64), self.lengths)
+        self._cache = {}
+
+    def _reduce(self, ufunc, values):
+        # segment-wise ufunc reduction, reduceat over the starts of the non empty segments
+        # (empty segments have no samples between them, so the reduced ranges are exactly the segments)
+        result = np.full(self.count, np.nan)
+        if len(values):
+            result[self.nonempty] = ufunc.reduceat(values, self.starts[self.nonempty])
+        return result
+
+    def _cached(self, name, compute):
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+
+    def max(self):
+        return self._cached("max", lambda: self._reduce(np.maximum, self.values))
+
+    def min(self):
+        return self._cached("min", lambda: self._reduce(np.minimum, self.values))
+
+    def sum(self):
+        return self._cached("sum", lambda: self._reduce(np.add, self.values))
+
+    def mean(self):
+        return self._cached("mean", lambda: self.sum() / np.where(self.nonempty, self.lengths, 1))
+
+    def var(self):
+        def compute():
+            deviations = self.values - self.mean()[self.segment_ids]
+            var = self._reduce(np.add, deviations * deviations) / np.where(self.nonempty, self.lengths, 1)
+            # constant segments have exactly zero variance (the mean may be off by rounding)
+            var[self.max() == self.min()] = 0.0
+            return var
+        return self._cached("var", compute)
+
+    def std(self):
+        return self._cached("std", lambda: np.sqrt(self.var()))
+
+    def median(self):
+        def compute():
+            sorted_values = self.values[np.lexsort((self.values, self.segment_ids))]
+            median = np.full(self.count, np.nan)
+            starts, lengths = self.starts[self.nonempty], self.lengths[self.nonempty]
+            median[self.nonempty] = (sorted_values[starts + (lengths - 1) // 2] +
+                                     sorted_values[starts + lengths // 2]) / 2
+            # as np.median, segments with NaN samples have a NaN median
+            median[self._reduce(np.add, np.isnan(self.values)) > 0] = np.nan
+            return median
+        return self._cached("median", compute)
+
+    def abs_energy(self):
+        return self._cached("abs_energy", lambda: self._reduce(np.add, self.values * self.values))
+
+    def pk_pk_distance(self):
+        return self._cached("pk_pk_distance", lambda: np.abs(self.max() - self.min()))
+
+    def histogram(self, nbins=10, r=1):
+        # np.histogram(values, bins=nbins, range=[-r, r]) of each segment, as a (segment x bin) counts matrix;
+        # the bin of each sample is computed as in the uniform bins path of np.histogram (same edge semantics)
+        def compute():
+            first_edge, last_edge = -float(r), float(r)
+            edges = np.linspace(first_edge, last_edge, nbins + 1)
+            keep = (self.values >= first_edge) & (self.values <= last_edge)
+            values, segment_ids = self.values[keep], self.segment_ids[keep]
+            indices = ((values - first_edge) / (last_edge - first_edge) * nbins).astype(np.intp)
+            indices[indices == nbins] -= 1
+            indices[values < edges[indices]] -= 1
+            indices[(values >= edges[indices + 1]) & (indices != nbins - 1)] += 1
+            counts = np.bincount(segment_ids * nbins + indices, minlength=self.count * nbins)
+            return counts.reshape(self.count, nbins).astype(np.float64)
+        return self._cached(("histogram", nbins, r), compute)
+
+
+# tsfel function -> statistic (method of SegmentStatistics, called with the tsfel function parameters)
+STATISTICS = {
+    "calc_max": "max",
+    "calc_min": "min",
+    "calc_mean": "mean",
+    "calc_median": "median",
+    "calc_var": "var",
+    "calc_std": "std",
+    "abs_energy": "abs_energy",
+    "pk_pk_distance": "pk_pk_distance",
+    "hist": "histogram",
+}
+
+
+def load_features(features_json_file, statistics=STATISTICS, subtype="statistical", selected_features=None):
+    # (feature name, statistic, parameters) of the used features of a tsfel features configuration
+    # (only the ones producing the `selected_features` names, when given)
+    features_config = load_features_config(features_json_file, selected_features)
+    features = []
+    unsupported = []
+    for domain in features_config.values():
+        for feature_name, feature in domain.items():
+            if feature["use"] != "yes":
+                continue
+            function_name = feature["function"]
+            if function_name.startswith("tsfel."):
+                function_name = function_name[len("tsfel."):]
+            if function_name not in statistics:
+                unsupported.append(feature_name)
+                continue
+            parameters = dict(feature["parameters"]) if feature["parameters"] != "" else {}
+            features.append((feature_name, statistics[function_name], parameters))
+    if unsupported:
+        raise ValueError(f"features {unsupported} of {features_json_file} are not supported by the {subtype} "
+                         f"extract (supported tsfel functions: {sorted(statistics)}), use the tsfel extract")
+    return features
+
+
+def extract_features(features, statistics, header=HEADER):
+    # signals x features matrix and the feature names, in the column order of the tsfel subtype,
+    # from the per signal `statistics` (e.g. SegmentStatistics)
+    columns = []
+    names = []
+    for feature_name, statistic, parameters in features:
+        result = getattr(statistics, statistic)(**parameters)
+        if result.ndim == 2:
+            columns.extend(result.T)
+            names.extend(f"{header}_{feature_name}_{index}" for index in range(result.shape[1]))
+        else:
+            columns.append(result)
+            names.append(f"{header}_{feature_name}")
+    order = np.argsort(names, kind="stable")
+    matrix = np.column_stack(columns)[:, order] if columns else np.empty((statistics.count, 0))
+    return matrix, [names[index] for index in order]
+
+
+def extract_matrix(statistical_config, features, signals):
+    # (signals x features) matrix and feature names of `signals`
+    if statistical_config.resample_rate:
+        values, offsets = resample_signals(signals, statistical_config.resample_rate)
+        lengths = np.diff(offsets)
+    else:
+        store = signals.samples_store()
+        values, lengths = store.values, store.lengths
+    matrix, names = extract_features(features, SegmentStatistics(values, lengths))
+    logger.debug(f"extracted {matrix.shape[1]} features of {matrix.shape[0]} signals")
+    return matrix, names
+
+
+def extract(statistical_config, signals):
+    features = load_features(statistical_config.features_json_file,
+                             selected_features=statistical_config.features)
+    if statistical_config.cache_directory:
+        plan = plan_digest("statistical", file_digest(statistical_config.features_json_file),
+                           statistical_config.features, statistical_config.resample_rate)
+        matrix, names = cached_features(
+            signals, statistical_config.cache_directory, plan,
+            lambda missing_signals: extract_matrix(statistical_config, features, missing_signals),
+            statistical_config.cache_max_entries)
+    else:
+        matrix, names = extract_matrix(statistical_config, features, signals)
+    feature_store = FeatureStore(matrix, names)
+
+    extracted_signals = signals.with_features(feature_store)
+
+    if statistical_config.trim:
+        from extract.trim_time_series import extract as extract_trim
+        extracted_signals = extract_trim(None, extracted_signals)
+
+    return extracted_signals
@@ -12,60 +12,176 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
-import json
+import functools
+import importlib.metadata
 import logging
+import os
 
+import numpy as np
 import pandas as pd
 import tsfel
+from pandas.tseries.frequencies import to_offset
 
-from common.signal import Signals
+from common.feature_store import FeatureStore
+from common.process_pool import can_use_process_pool, get_process_pool
+from extract.feature_cache import cached_features, file_digest, plan_digest
+from extract.features_config import load_features_config
+from extract.resample import resample_signals
 
 logger = logging.getLogger(__name__)
 
 
 # ref: https://tsfel.readthedocs.io/en/latest/descriptions/get_started.html
 
-def extract_signal(signal, features_json_file, resample_rate=30, sampling_frequency=(1/30), verbose=0):
-    # Normalize the time series (to evenly sampled data in 30s granularity)
-    df_signal = pd.DataFrame(signal.time_series, columns=['Time', 'value'])
-    df_signal['value'] = pd.to_numeric(df_signal['value'])
-    df_signal["Time"] = pd.to_datetime(df_signal["Time"], unit='s')
-    df_signal = df_signal.set_index("Time")
-    df_signal = df_signal.resample(resample_rate).mean().interpolate('linear')
-
-    # list of features to extract from configuration file
-    # cfg_file = tsfel.get_features_by_domain('statistical') # ==> this will use all the statistical features
-    with open(features_json_file, 'r') as file:
-        # Load the JSON data from the file
-        cfg_file = json.load(file)
-
-    # execute feature extraction
-    extracted_features = tsfel.time_series_features_extractor(
-        dict_features=cfg_file, signal_windows=df_signal, fs=sampling_frequency, verbose=verbose)
-
-    logging.debug(extracted_features.shape)
-    logging.debug(extracted_features.describe())
-
-    # append the features as labels to the signals
-    signal.metadata["extracted_features"] = extracted_features
-
-    return signal
+class FeaturePlan:
+    """
+    Feature extraction prepared once per run: the parsed features configuration, the resolved
+    tsfel feature functions with their parameters, and the resample settings (see `extract.resample`).
+    `extract_features` returns the same DataFrame as `tsfel.time_series_features_extractor`
+    for a single window (`extract_row` its values, named by `columns`), without parsing the configuration
+    and resolving the functions for each signal.
+    """
+
+    def __init__(self, features_config, resample_rate="30s", sampling_frequency=(1/30)):
+        self.resample_rate = to_offset(resample_rate)
+        self.sampling_frequency = sampling_frequency
+        # (feature name, function, parameters) of the used features, in the order tsfel computes them
+        self.features = []
+        for domain in features_config.values():
+            for feature_name, feature in domain.items():
+                if feature["use"] != "yes":
+                    continue
+                function_name = feature["function"]
+                if function_name.startswith("tsfel."):
+                    function_name = function_name[len("tsfel."):]
+                parameters = dict(feature["parameters"]) if feature["parameters"] != "" else {}
+                if "fs" in parameters and sampling_frequency is not None:
+                    parameters["fs"] = sampling_frequency
+                self.features.append((feature_name, getattr(tsfel, function_name), parameters))
+        # tsfel sorts the feature columns by name, the order is computed once for the names of the first signal
+        self._names = None
+        self._column_order = None
+        self._columns = None
+
+    @property
+    def columns(self):
+        # feature names of the rows returned by `extract_row` (set by the first call)
+        return self._columns
+
+    def extract_features(self, window, header="value"):
+        row = self.extract_row(window, header)
+        return pd.DataFrame(row.reshape(1, len(row)), columns=self._columns)
+
+    def extract_row(self, window, header="value"):
+        results = []
+        names = []
+        for feature_name, function, parameters in self.features:
+            result = function(window, **parameters)
+            # function returns more than one element
+            if isinstance(result, tuple):
+                if np.isnan(result[0]):
+                    result = np.zeros(len(result))
+                results.extend(result)
+                names.extend(f"{header}_{feature_name}_{index}" for index in range(len(result)))
+            else:
+                results.append(result)
+                names.append(f"{header}_{feature_name}")
+        if names != self._names:
+            self._names = names
+            self._column_order = np.argsort(names, kind="stable")
+            self._columns = pd.Index([names[index] for index in self._column_order])
+        return np.array(results, dtype=np.float64)[self._column_order]
+
+
+@functools.lru_cache(maxsize=8)
+def _load_feature_plan(features_json_file, modification_time, resample_rate, sampling_frequency, features):
+    features_config = load_features_config(features_json_file, features)
+    return FeaturePlan(features_config, resample_rate, sampling_frequency)
+
+
+def get_feature_plan(features_json_file, resample_rate="30s", sampling_frequency=(1/30), features=None):
+    # plans are cached per process, so that map_reduce partitions computed in the same worker share them;
+    # the modification time of the configuration file is part of the key to pick up changes between runs.
+    # With `features`, the plan only extracts the features producing these names (see `load_features_config`)
+    return _load_feature_plan(features_json_file, os.path.getmtime(features_json_file),
+                              resample_rate, sampling_frequency, tuple(features) if features is not None else None)
+
+
+def extract_windows(args):
+    # features of a chunk of signals (possibly in a worker process): the resampled values of signal `i` are
+    # `windows[offsets[i]:offsets[i + 1]]`; returns their (signals x features) matrix, the feature names and None,
+    # or, when the features of a signal differ from those of the signals before it, the index of the signal
+    # in the chunk and its feature names (the signal is named by `extract_matrix`)
+    features_json_file, resample_rate, sampling_frequency, features, windows, offsets = args
+    plan = get_feature_plan(features_json_file, resample_rate, sampling_frequency, features)
+    rows = []
+    columns = None
+    for index in range(len(offsets) - 1):
+        rows.append(plan.extract_row(windows[offsets[index]:offsets[index + 1]]))
+        if columns is None:
+            columns = plan.columns
+        elif plan.columns is not columns:
+            return None, list(columns), (index, list(plan.columns))
+    return np.vstack(rows) if rows else np.empty((0, 0)), list(columns) if columns is not None else None, None
+
+
+def extract_matrix(tsfel_config, signals):
+    # (signals x features) matrix and feature names of `signals`
+    plan = get_feature_plan(tsfel_config.features_json_file, tsfel_config.resample_rate,
+                            tsfel_config.sampling_frequency, tsfel_config.features)
+
+    # Normalize the time series (to evenly sampled data in `resample_rate` granularity), all signals at once
+    windows, window_offsets = resample_signals(signals, plan.resample_rate)
+
+    # features extraction by chunks of signals; with workers, only the resampled values of the chunks
+    # are sent to the worker processes and only their features matrix is sent back
+    chunk_size = max(1, tsfel_config.chunk_size)
+    tasks = []
+    for start in range(0, len(signals.signals), chunk_size):
+        offsets = window_offsets[start:start + chunk_size + 1]
+        tasks.append((tsfel_config.features_json_file, tsfel_config.resample_rate, tsfel_config.sampling_frequency,
+                      tsfel_config.features, windows[offsets[0]:offsets[-1]], offsets - offsets[0]))
+    number_of_workers = tsfel_config.number_of_workers
+    if number_of_workers > 0 and len(tasks) > 1 and can_use_process_pool():
+        logger.info(f"extracting the features of {len(signals.signals)} signals using {number_of_workers} processes")
+        # imap keeps the chunks in order
+        results = get_process_pool(number_of_workers).imap(extract_windows, tasks)
+    else:
+        results = map(extract_windows, tasks)
+
+    # a single (signals x features) matrix
+    matrices = []
+    names = None
+    for start, (matrix, chunk_names, differing) in zip(range(0, len(signals.signals), chunk_size), results):
+        if names is None:
+            names = chunk_names
+        if chunk_names != names:
+            # the first signal of the chunk differs from the signals of the previous chunks
+            differing = (0, chunk_names)
+        if differing is not None:
+            index, signal_names = differing
+            raise ValueError(f"the features of signal {signals.signals[start + index].metadata.get('__name__')} "
+                             f"differ from the features of the other signals: {signal_names} != {names}")
+        matrices.append(matrix)
+    names = names if names is not None else []
+    matrix = np.vstack(matrices) if matrices else np.empty((0, len(names)))
+    logger.debug(f"extracted {len(names)} features of {len(matrix)} signals")
+    return matrix, names
 
 
 def extract(tsfel_config, signals):
-    extracted_signals = Signals(metadata=signals.metadata)
-    resample_rate = tsfel_config.resample_rate
-    sampling_frequency = tsfel_config.sampling_frequency
-    features_json_file = tsfel_config.features_json_file
-
-    verbose = 1 if logging.getLogger().getEffectiveLevel() == logging.DEBUG else 0
-
-    # features extraction
-    for index, signal in enumerate(signals.signals):
-        # extract features from the signal
-        extracted_signal = extract_signal(
-            signal, features_json_file, resample_rate, sampling_frequency, verbose)
-        extracted_signals.append(extracted_signal)
+    if tsfel_config.cache_directory:
+        plan = plan_digest("tsfel", importlib.metadata.version("tsfel"), file_digest(tsfel_config.features_json_file),
+                           tsfel_config.features, tsfel_config.resample_rate, tsfel_config.sampling_frequency)
+        matrix, names = cached_features(signals, tsfel_config.cache_directory, plan,
+                                        lambda missing_signals: extract_matrix(tsfel_config, missing_signals),
+                                        tsfel_config.cache_max_entries)
+    else:
+        matrix, names = extract_matrix(tsfel_config, signals)
+    feature_store = FeatureStore(matrix, names)
+
+    # append the features to the signals, as views onto the matrix
+    extracted_signals = signals.with_features(feature_store)
 
     if tsfel_config.trim:
         from extract.trim_time_series import extract as extract_trim
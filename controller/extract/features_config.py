@@ -0,0 +1,55 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# tsfel features configuration files (`features_json_file`), shared by the extract subtypes
+
+import copy
+import json
+import re
+
+HEADER = "value"
+
+
+def feature_matches(feature_name, names, header=HEADER):
+    # whether the tsfel feature `feature_name` produces one of the extracted feature `names`:
+    # `<header>_<feature name>`, or `<header>_<feature name>_<index>` for features with several values
+    prefix = f"{header}_{feature_name}"
+    return any(name == prefix or re.fullmatch(re.escape(prefix) + r"_\d+", name) for name in names)
+
+
+def select_features(features_config, features, header=HEADER):
+    # copy of the tsfel `features_config` using only the features producing the extracted feature names `features`
+    selected_config = copy.deepcopy(features_config)
+    for domain in selected_config.values():
+        for feature_name, feature in domain.items():
+            if feature["use"] == "yes" and not feature_matches(feature_name, features, header):
+                feature["use"] = "no"
+    return selected_config
+
+
+def used_features(features_config):
+    return [feature_name for domain in features_config.values()
+            for feature_name, feature in domain.items() if feature["use"] == "yes"]
+
+
+def load_features_config(features_json_file, features=None):
+    """
+    The tsfel features configuration in `features_json_file`, using only the features producing the extracted
+    feature names `features` (e.g. `value_Max`, `value_Histogram_0`) when given.
+    """
+    with open(features_json_file, 'r') as file:
+        features_config = json.load(file)
+    if features is not None:
+        features_config = select_features(features_config, features)
+    return features_config
@@ -0,0 +1,108 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Batched resampling of the samples of many signals (segments of the columnar samples arrays) onto evenly spaced
+# time grids, in a handful of array operations rather than one pandas resample per signal. Each signal gets the
+# same values, within 1e-12 relative (the bin sums are accumulated in a different order), as with
+#   pd.Series(values, index=pd.to_datetime(timestamps, unit='s')).resample(resample_rate).mean().interpolate('linear')
+
+import numpy as np
+from pandas.tseries.frequencies import to_offset
+
+NANOSECONDS = 1_000_000_000
+DAY_NANOSECONDS = 86400 * NANOSECONDS
+
+
+def to_nanoseconds(timestamps):
+    # epoch seconds to integer epoch nanoseconds, rounded as by pd.to_datetime(timestamps, unit='s')
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    seconds = timestamps.astype(np.int64)
+    fraction = np.round(timestamps - seconds, 9)
+    return seconds * NANOSECONDS + (fraction * NANOSECONDS).astype(np.int64)
+
+
+def rate_nanoseconds(resample_rate):
+    try:
+        return to_offset(resample_rate).nanos
+    except ValueError as e:
+        raise ValueError(f"resample rate {resample_rate} is not a fixed frequency") from e
+
+
+def resample_segments(timestamps, values, lengths, resample_rate="30s"):
+    """
+    Resample the samples of many signals at once (signal `i` is the segment of `lengths[i]` samples).
+    Samples are binned by integer arithmetic on their nanosecond timestamps into `resample_rate` bins
+    (anchored at midnight of the day of the first sample of the signal, as pandas), the mean of each bin is taken
+    and empty bins are filled by linear interpolation between the neighbouring bins of the same signal.
+    Returns the resampled values of all the signals, concatenated, and the number of bins of each signal.
+    """
+    rate = rate_nanoseconds(resample_rate)
+    values = np.asarray(values, dtype=np.float64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    count = len(lengths)
+    nanoseconds = to_nanoseconds(timestamps)
+    segment_ids = np.repeat(np.arange(count, dtype=np.int64), lengths)
+    nonempty = lengths > 0
+    starts = (np.cumsum(lengths) - lengths)[nonempty]
+
+    # bins of each signal: from the bin of its first sample to the bin of its last sample
+    first = np.zeros(count, dtype=np.int64)
+    last = np.zeros(count, dtype=np.int64)
+    if len(nanoseconds):
+        first[nonempty] = np.minimum.reduceat(nanoseconds, starts)
+        last[nonempty] = np.maximum.reduceat(nanoseconds, starts)
+    origin = first - first % DAY_NANOSECONDS
+    first_bin = (first - origin) // rate
+    bin_counts = np.where(nonempty, (last - origin) // rate - first_bin + 1, 0)
+    bin_starts = np.cumsum(bin_counts) - bin_counts
+    total = int(bin_counts.sum())
+    positions = bin_starts[segment_ids] + (nanoseconds - origin[segment_ids]) // rate - first_bin[segment_ids]
+
+    # mean of the (non NaN) samples of each bin, NaN for empty bins
+    has_value = ~np.isnan(values)
+    sums = np.bincount(positions[has_value], weights=values[has_value], minlength=total)
+    counts = np.bincount(positions[has_value], minlength=total)
+    with np.errstate(invalid='ignore'):
+        resampled = sums / counts
+
+    # linear interpolation of the empty bins between the previous and next non empty bins of the same signal
+    # (as np.interp over the bin positions); trailing empty bins get the last value, leading ones stay NaN
+    valid = ~np.isnan(resampled)
+    if valid.all():
+        return resampled, bin_counts
+    index = np.arange(total, dtype=np.int64)
+    bin_segments = np.repeat(np.arange(count, dtype=np.int64), bin_counts)
+    segment_start = bin_starts[bin_segments]
+    segment_end = segment_start + bin_counts[bin_segments]
+    previous = np.maximum.accumulate(np.where(valid, index, -1))
+    following = np.minimum.accumulate(np.where(valid, index, total)[::-1])[::-1]
+    has_previous = ~valid & (previous >= segment_start)
+    has_following = following < segment_end
+
+    between = has_previous & has_following
+    before, after, position = previous[between], following[between], index[between]
+    slope = (resampled[after] - resampled[before]) / (after - before)
+    interpolated = slope * (position - before) + resampled[before]
+    trailing = has_previous & ~has_following
+    resampled[trailing] = resampled[previous[trailing]]
+    resampled[between] = interpolated
+    return resampled, bin_counts
+
+
+def resample_signals(signals, resample_rate="30s"):
+    # resampled values of all the signals of `signals` (concatenated, in order) and their offsets:
+    # the values of signal `i` are at `offsets[i]:offsets[i + 1]`
+    store = signals.samples_store()
+    resampled, bin_counts = resample_segments(store.timestamps, store.values, store.lengths, resample_rate)
+    return resampled, np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(bin_counts)])
@@ -15,16 +15,28 @@
 import logging
 
 from common.signal import Signals, Signal
+from common.signal_store import segment_changes
 
 logger = logging.getLogger(__name__)
 
 
 # Take each Signal in Signals, save its metadata, but discard the time-series data
 def extract(config, signals):
-    extracted_signals = Signals(metadata=signals.metadata, signals=None)
+    extracted_signals = Signals(metadata=signals.metadata, signals=None, feature_store=signals.feature_store)
 
+    # the monotonic analysis needs the samples: the number of increases, decreases and counter resets of each
+    # signal are kept (signals trimmed before have no samples left, they keep the changes counted then), in a copy
+    # of the metadata so that the untrimmed signals are left unchanged
+    store = signals.samples_store()
+    increases, decreases, resets = segment_changes(store.values, store.offsets)
+    lengths = store.lengths
     for index, signal in enumerate(signals.signals):
-        new_signal = Signal(signal.type, signal.metadata)
+        metadata = dict(signal.metadata)
+        if lengths[index] > 0 or "monotonic_changes" not in metadata:
+            metadata["monotonic_changes"] = [int(increases[index]), int(decreases[index]), int(resets[index])]
+        new_signal = Signal(signal.type, metadata)
+        if signal.feature_store is not None:
+            new_signal.attach_features(signal.feature_store, signal.feature_index)
         extracted_signals.append(new_signal)
 
     return extracted_signals
@@ -0,0 +1,32 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import logging
+
+from common.columnar_format import read_signals
+
+logger = logging.getLogger(__name__)
+
+
+def ingest(ingest_config):
+    ingest_directory = ingest_config.file_name
+
+    logger.info(f"Reading columnar format from {ingest_directory}")
+    try:
+        data = read_signals(ingest_directory, columns=ingest_config.columns,
+                            memory_map=ingest_config.memory_map)
+    except Exception as e:
+        err = f"Error on directory {ingest_directory}: {e}"
+        raise RuntimeError(err) from e
+    return data
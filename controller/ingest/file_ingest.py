@@ -18,8 +18,15 @@ import os
 import re
 from string import Template
 
+import numpy as np
+
 from common.signal import Signal, Signals
+from common.signal_store import SignalStore, pairs_to_columns
+from common.conf import get_number_of_workers
+from common.process_pool import can_use_process_pool, get_process_pool
 from common.configuration_api import IngestSubType, IngestFormat, IngestTimeUnit
+from ingest.incremental import apply_incremental, load_state, series_key
+from ingest.json_stream import JsonStream
 
 
 logger = logging.getLogger(__name__)
@@ -36,7 +43,9 @@ def enrich_metric_signature_info(json_signal):
 
 
 def ingest(ingest_config):
-    signals = Signals()
+    # Prometheus dumps carry sample values as strings, keep rendering them that way in the legacy view
+    string_values = ingest_config.format == IngestFormat.PIPELINE_INGEST_FORMAT_PROM.value
+    signals = Signals(metadata={}, store=SignalStore(string_values=string_values))
 
     signals.metadata["ingest_type"] = IngestSubType.PIPELINE_INGEST_FILE.value
     signals.metadata["ingest_source"] = ingest_config.file_name
@@ -53,6 +62,10 @@ def ingest(ingest_config):
     logger.info(f"number of signals = {len(signals.signals)}")
     signals2 = combine_multiple_metrics_entries(signals)
     logger.info(f"number of combined signals = {len(signals2.signals)}")
+    if ingest_config.state_directory:
+        # incremental ingest: only samples newer than the previous ingest are added to the retained signals
+        state = load_state(ingest_config.state_directory)
+        signals2 = apply_incremental(ingest_config, state, signals2)
     return signals2
 
 
@@ -63,14 +76,17 @@ def ingest_prometheus_format(ingest_config, signals):
     metrics_metadata = []
 
     logger.info(f"Reading signals from {ingest_file}")
-    try:
-        with open(ingest_file, 'r') as file:
-            data = json.load(file)
-    except Exception as e:
-        err = f"The file {ingest_file} does not exist {e}"
-        raise RuntimeError(err) from e
+    if ingest_config.streaming:
+        json_signals = stream_prometheus_format(ingest_file)
+    else:
+        try:
+            with open(ingest_file, 'r') as file:
+                data = json.load(file)
+        except Exception as e:
+            err = f"The file {ingest_file} does not exist {e}"
+            raise RuntimeError(err) from e
+        json_signals = data["data"]["result"]
 
-    json_signals = data["data"]["result"]
     for signal_count, json_signal in enumerate(json_signals):
         if 'metric' in json_signal.keys():
             signal_type = "metric"
@@ -84,8 +100,7 @@ def ingest_prometheus_format(ingest_config, signals):
                 # build new name based on template
                 json_signal["metric"]["__name__"] = Template(
                     ingest_name_template).safe_substitute(json_signal["metric"])
-            signal_metadata = json_signal["metric"]
-            signal_time_series = json_signal["values"]
+            signal_metadata = signals.store.intern_labels(json_signal["metric"])
             metrics_metadata.append(signal_metadata)
 
         else:
@@ -96,12 +111,22 @@ def ingest_prometheus_format(ingest_config, signals):
             match = re.search(ingest_filter_metadata, str(signal_metadata))
             if match is None:
                 continue
-        signals.append(Signal(type=signal_type,
-                              metadata=signal_metadata,
-                              time_series=signal_time_series))
+        timestamps, values = pairs_to_columns(json_signal["values"])
+        signals.append_time_series(signal_type, signal_metadata, timestamps, values)
     signals.metadata["metrics_metadata"] = metrics_metadata
 
 
+def stream_prometheus_format(ingest_file):
+    # yields the items of `data.result` one at a time, without loading the whole file
+    try:
+        file = open(ingest_file, 'r')
+    except Exception as e:
+        err = f"The file {ingest_file} does not exist {e}"
+        raise RuntimeError(err) from e
+    with file:
+        yield from JsonStream(file).iter_path(["data", "result"])
+
+
 def ingest_instana_object(ingest_config, signals, object):
     # object is expected to be of type dict with a field named "metrics", also of type dict
     logger.debug(f"instana ingest config = {ingest_config}")
@@ -148,18 +173,12 @@ def ingest_instana_object(ingest_config, signals, object):
                     ingest_name_template).safe_substitute(json_signal["metric"])
             signal_type = "metric"
             enrich_metric_signature_info(json_signal)
-            signal_metadata = json_signal["metric"]
-            signal_time_series = json_signal["values"]
+            signal_metadata = signals.store.intern_labels(json_signal["metric"])
+            timestamps, values = pairs_to_columns(json_signal["values"])
             if multiplier != 1.0:
-                new_signal_time_series = []
-                for timestamp, value in signal_time_series:
-                    new_entry = [timestamp*multiplier, value]
-                    new_signal_time_series.append(new_entry)
-                signal_time_series = new_signal_time_series
+                timestamps = timestamps * multiplier
             logger.debug(f"adding signal {json_signal['metric']}")
-            signals.append(Signal(type=signal_type,
-                                  metadata=signal_metadata,
-                                  time_series=signal_time_series))
+            signals.append_time_series(signal_type, signal_metadata, timestamps, values)
             signal_count += 1
     else:
         raise Exception("Ingest: signal type - Not implemented")
@@ -183,30 +202,59 @@ def ingest_instana_format(ingest_config, signals):
     elif os.path.isdir(ingest_file):
         metrics_metadata = ingest_instana_format_directory(ingest_config, signals, ingest_file)
     else:
-        raise "object is neither a directory or a file"
+        raise RuntimeError(f"{ingest_file} is neither a directory or a file")
 
     signals.metadata["metrics_metadata"] = metrics_metadata
 
 
-def ingest_instana_format_directory(ingest_config, signals, ingest_dir):
-    metrics_metadata = []
-    for file_name in os.listdir(ingest_dir):
+def list_directory_files(ingest_dir):
+    # all the files under ingest_dir (recursively), sorted to keep the ingest order deterministic
+    file_paths = []
+    for file_name in sorted(os.listdir(ingest_dir)):
         file_path = os.path.join(ingest_dir, file_name)
         if os.path.isfile(file_path):
-            tmp_metrics_metadata = ingest_instana_format_file(ingest_config, signals, file_path)
-            metrics_metadata.append(tmp_metrics_metadata)
+            file_paths.append(file_path)
         elif os.path.isdir(file_path):
-            tmp_metrics_metadata = ingest_instana_format_directory(ingest_config, signals, file_path)
-            metrics_metadata.append(tmp_metrics_metadata)
+            file_paths.extend(list_directory_files(file_path))
         else:
-            raise "object is neither a directory or a file"
+            raise RuntimeError(f"{file_path} is neither a directory or a file")
+    return file_paths
 
-    return metrics_metadata
 
+def ingest_instana_format_directory(ingest_config, signals, ingest_dir):
+    file_paths = list_directory_files(ingest_dir)
+    parse_args = [(ingest_config, file_path) for file_path in file_paths]
+    number_of_workers = get_number_of_workers()
 
-def ingest_instana_format_file(ingest_config, signals, ingest_file):
+    if number_of_workers > 0 and len(file_paths) > 1 and can_use_process_pool():
+        logger.info(f"parsing {len(file_paths)} files from {ingest_dir} using {number_of_workers} processes")
+        chunk_size = max(1, len(file_paths) // (number_of_workers * 4))
+        # imap keeps the results in the order of the files
+        results = get_process_pool(number_of_workers).imap(parse_instana_format_file, parse_args, chunk_size)
+        return append_file_signals(signals, results)
+
+    return append_file_signals(signals, map(parse_instana_format_file, parse_args))
+
+
+def parse_instana_format_file(args):
+    # parses a single file (possibly in a worker process) into its own Signals
+    ingest_config, ingest_file = args
+    file_signals = Signals(metadata={}, store=SignalStore())
+    ingest_instana_format_file(ingest_config, file_signals, ingest_file)
+    return file_signals
+
+
+def append_file_signals(signals, all_file_signals):
     metrics_metadata = []
+    for file_signals in all_file_signals:
+        for signal in file_signals:
+            signal_metadata = signals.store.intern_labels(signal.metadata)
+            signals.append_time_series(signal.type, signal_metadata, signal.timestamps, signal.values)
+            metrics_metadata.append(signal_metadata)
+    return metrics_metadata
 
+
+def ingest_instana_format_file(ingest_config, signals, ingest_file):
     logger.info(f"Reading signals with instana format from {ingest_file}")
     try:
         with open(ingest_file, 'r') as file:
@@ -216,41 +264,63 @@ def ingest_instana_format_file(ingest_config, signals, ingest_file):
         raise RuntimeError(err) from e
 
     # could have list of list of dict
+    number_of_signals = len(signals.signals)
     ingest_instana_helper(ingest_config, signals, data)
 
-    for signal_count, signal in enumerate(signals.signals):
-        metrics_metadata.append(signal.metadata)
-
-    return metrics_metadata
+    # metadata of the signals added from this file
+    return [signal.metadata for signal in signals.signals[number_of_signals:]]
 
 
 def combine_multiple_metrics_entries(signals):
-    signals_dict = {}
-    metrics_metadata = []
-    merge_performed = False
-
-    for signal in signals.signals:
-        signal_name = signal.metadata["__name__"]
-        if signal_name in signals_dict:
-            merge_performed = True
-            signal0 = signals_dict[signal_name]
-            new_signals_list = signal0.time_series
-            if signal.metadata["signature_info"]["first_time"] < signal0.metadata["signature_info"]["first_time"]:
-                signal0.metadata["signature_info"]["first_time"] = signal.metadata["signature_info"]["first_time"]
-                new_signals_list = signal.time_series + signal0.time_series
-            if signal.metadata["signature_info"]["last_time"] > signal0.metadata["signature_info"]["last_time"]:
-                signal0.metadata["signature_info"]["last_time"] = signal.metadata["signature_info"]["last_time"]
-                new_signals_list = signal0.time_series + signal.time_series
-            signal0.time_series = new_signals_list
-            signal0.metadata["signature_info"]["num_of_items"] = len(signal0.time_series)
-            # TODO What about other metadata?
-            metrics_metadata.append(signal0.metadata)
-        else:
-            signals_dict[signal_name] = signal
-
-    if not merge_performed:
+    # group the entries (chunks) of each series (name and labels), in the order of first appearance
+    groups = {}
+    for position, signal in enumerate(signals.signals):
+        groups.setdefault(series_key(signal.metadata), []).append(position)
+    if len(groups) == len(signals.signals):
         return signals
 
-    signals_list = list(signals_dict.values())
-    new_signals = Signals(metadata=metrics_metadata, signals=signals_list)
-    return new_signals
+    store = signals.store
+    if all(signal.store is store for signal in signals.signals):
+        chunk_indices = [signals.signals[position].index for positions in groups.values() for position in positions]
+    else:
+        store = SignalStore(string_values=store.string_values if store is not None else False)
+        for signal in signals.signals:
+            store.append(signal.timestamps, signal.values)
+        chunk_indices = [position for positions in groups.values() for position in positions]
+
+    # chunks of the same metric are adjacent in `grouped`, in their ingest order
+    grouped = store.take(chunk_indices)
+    chunk_group = np.repeat(np.arange(len(groups)), [len(positions) for positions in groups.values()])
+    sample_group = np.repeat(chunk_group, grouped.lengths)
+
+    # a single stable sort by (metric, timestamp) merges the chunks of all the metrics at once
+    order = np.lexsort((grouped.timestamps, sample_group))
+    timestamps = grouped.timestamps[order]
+    values = grouped.values[order]
+    sample_group = sample_group[order]
+
+    # overlapping chunks: a timestamp found in several chunks keeps the sample of the first chunk
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (sample_group[1:] != sample_group[:-1]) | (timestamps[1:] != timestamps[:-1])
+    lengths = np.bincount(sample_group[keep], minlength=len(groups))
+    combined_store = SignalStore.from_arrays(timestamps[keep], values[keep], lengths,
+                                             string_values=store.string_values)
+
+    combined_signals = Signals(metadata=signals.metadata, store=combined_store)
+    for group, positions in enumerate(groups.values()):
+        signal0 = signals.signals[positions[0]]
+        metadata = signal0.metadata
+        if len(positions) > 1:
+            # the chunks share their labels (series_key), only the volatile metadata differs: signature_info
+            # covers all the chunks, the tags of the chunks are merged and `count` is the one of the first chunk
+            chunks_metadata = [signals.signals[position].metadata for position in positions]
+            metadata = dict(metadata)
+            signature_info = metadata["signature_info"] = dict(metadata["signature_info"])
+            signature_info["first_time"] = min(chunk["signature_info"]["first_time"] for chunk in chunks_metadata)
+            signature_info["last_time"] = max(chunk["signature_info"]["last_time"] for chunk in chunks_metadata)
+            signature_info["num_of_items"] = int(lengths[group])
+            tags = list(dict.fromkeys(tag for chunk in chunks_metadata for tag in chunk.get("tags", [])))
+            if tags:
+                metadata["tags"] = tags
+        combined_signals.append(Signal(signal0.type, metadata, store=combined_store, index=group))
+    return combined_signals
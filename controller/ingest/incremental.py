@@ -0,0 +1,168 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import logging
+import os
+import pickle
+
+import numpy as np
+
+from common.signal import Signal, Signals
+from common.signal_store import SignalStore
+from common.utils import parse_duration
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "incremental_state"
+
+# metadata fields that change from one ingest to the next and do not identify a series
+VOLATILE_METADATA = ("signature_info", "count", "tags")
+
+
+def series_key(metadata):
+    return tuple(sorted((key, str(value)) for key, value in metadata.items() if key not in VOLATILE_METADATA))
+
+
+class IncrementalState:
+    """
+    State kept between incremental ingests: the retained signals, the last ingested timestamp
+    of each series (high-water mark) and the end of the last queried window (promql).
+    """
+
+    def __init__(self, signals=None, high_water_marks=None, query_end=None):
+        self.signals = signals
+        self.high_water_marks = high_water_marks if high_water_marks is not None else {}
+        self.query_end = query_end
+
+
+def load_state(state_directory):
+    state_file = os.path.join(state_directory, STATE_FILE)
+    if not os.path.exists(state_file):
+        logger.info(f"No incremental state in {state_directory}, ingesting the whole window")
+        return IncrementalState()
+    try:
+        with open(state_file, 'rb') as file:
+            state = pickle.load(file)
+    except Exception as e:
+        err = f"Error on file {state_file}: {e}"
+        raise RuntimeError(err) from e
+    logger.info(f"Loaded incremental state from {state_file}: {len(state.signals)} retained signals")
+    return state
+
+
+def save_state(state_directory, state):
+    state_file = os.path.join(state_directory, STATE_FILE)
+    try:
+        os.makedirs(state_directory, exist_ok=True)
+        # write to a temporary file first so that a failed ingest never leaves a truncated state
+        with open(state_file + ".tmp", 'wb') as file:
+            pickle.dump(state, file)
+        os.replace(state_file + ".tmp", state_file)
+    except Exception as e:
+        err = f"Error on file {state_file}: {e}"
+        raise RuntimeError(err) from e
+
+
+def merge_incremental(state, signals, retention_seconds=0):
+    """
+    Append the samples of `signals` newer than the high-water mark of their series to the retained signals.
+    Samples older than `retention_seconds` before the newest sample are dropped (0 keeps everything).
+    Returns the merged signals and the updated high-water marks.
+    """
+    retained = state.signals if state.signals is not None else Signals(metadata={})
+    string_values = signals.store.string_values if signals.store is not None else False
+
+    key_index = {}
+    types = []
+    metadata = []
+    timestamps_parts = []
+    values_parts = []
+    group_parts = []
+
+    def add_samples(group, timestamps, values):
+        timestamps_parts.append(timestamps)
+        values_parts.append(values)
+        group_parts.append(np.full(len(timestamps), group, dtype=np.int64))
+
+    for signal in retained:
+        key_index[series_key(signal.metadata)] = len(metadata)
+        types.append(signal.type)
+        metadata.append(signal.metadata)
+        add_samples(len(metadata) - 1, signal.timestamps, signal.values)
+
+    new_samples = 0
+    for signal in signals:
+        key = series_key(signal.metadata)
+        group = key_index.get(key)
+        if group is None:
+            group = key_index[key] = len(metadata)
+            types.append(signal.type)
+            metadata.append(signal.metadata)
+        else:
+            # keep the labels of the latest ingest
+            metadata[group] = signal.metadata
+        timestamps = signal.timestamps
+        high_water_mark = state.high_water_marks.get(key)
+        if high_water_mark is not None:
+            new = timestamps > high_water_mark
+            add_samples(group, timestamps[new], signal.values[new])
+            new_samples += int(new.sum())
+        else:
+            add_samples(group, timestamps, signal.values)
+            new_samples += len(timestamps)
+
+    if not metadata:
+        return Signals(metadata=signals.metadata, store=SignalStore(string_values=string_values)), {}
+
+    timestamps = np.concatenate(timestamps_parts)
+    values = np.concatenate(values_parts)
+    sample_group = np.concatenate(group_parts)
+    if retention_seconds and len(timestamps):
+        keep = timestamps >= timestamps.max() - retention_seconds
+        timestamps, values, sample_group = timestamps[keep], values[keep], sample_group[keep]
+
+    # a single stable sort by (series, timestamp) appends the new samples to their series
+    order = np.lexsort((timestamps, sample_group))
+    timestamps, values, sample_group = timestamps[order], values[order], sample_group[order]
+    lengths = np.bincount(sample_group, minlength=len(metadata))
+    # series without samples left in the retention window are dropped
+    kept_groups = np.flatnonzero(lengths)
+    store = SignalStore.from_arrays(timestamps, values, lengths[kept_groups], string_values=string_values)
+    starts = np.concatenate([[0], np.cumsum(lengths[kept_groups])])
+
+    merged = Signals(metadata=signals.metadata, store=store)
+    high_water_marks = {}
+    for index, group in enumerate(kept_groups.tolist()):
+        signal_metadata = metadata[group]
+        first_time, last_time = timestamps[starts[index]], timestamps[starts[index + 1] - 1]
+        if "signature_info" in signal_metadata:
+            signal_metadata["signature_info"] = dict(signal_metadata["signature_info"],
+                                                     first_time=first_time.item(), last_time=last_time.item(),
+                                                     num_of_items=int(lengths[group]))
+        merged.append(Signal(types[group], signal_metadata, store=store, index=index))
+        high_water_marks[series_key(signal_metadata)] = last_time.item()
+    if "metrics_metadata" in merged.metadata:
+        merged.metadata = dict(merged.metadata, metrics_metadata=[signal.metadata for signal in merged])
+
+    logger.info(f"Incremental ingest: {new_samples} new samples, {len(merged)} signals retained "
+                f"({len(kept_groups)}/{len(metadata)} series in the retention window)")
+    return merged, high_water_marks
+
+
+def apply_incremental(ingest_config, state, signals, query_end=None):
+    # merge freshly ingested `signals` into the retained ones and persist the result for the next run
+    retention_seconds = parse_duration(ingest_config.retention) if ingest_config.retention else 0
+    merged, high_water_marks = merge_incremental(state, signals, retention_seconds)
+    save_state(ingest_config.state_directory, IncrementalState(merged, high_water_marks, query_end))
+    return merged
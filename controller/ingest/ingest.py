@@ -37,10 +37,19 @@ def ingest(subtype, config):
         typed_config = api.IngestSerialized(**config)
         from ingest.pickle_ingest import ingest
         signals = ingest(typed_config)
+    elif subtype == api.IngestSubType.PIPELINE_INGEST_COLUMNAR.value:
+        # verify config parameters conform to structure
+        typed_config = api.IngestColumnar(**config)
+        from ingest.columnar_ingest import ingest
+        signals = ingest(typed_config)
     elif subtype == api.IngestSubType.PIPELINE_INGEST_PROMQL.value:
         typed_config = api.IngestPromql(**config)
         from ingest.promql_ingest import ingest
         signals = ingest(typed_config)
+    elif subtype == api.IngestSubType.PIPELINE_INGEST_PROMQL_SERIES.value:
+        typed_config = api.IngestPromqlSeries(**config)
+        from ingest.promql_series_ingest import ingest
+        signals = ingest(typed_config)
     else:
         raise "unsupported ingest configuration"
     return [signals]
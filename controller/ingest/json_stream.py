@@ -0,0 +1,114 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import json
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+
+
+class JsonStream:
+    """
+    Minimal incremental JSON reader over a text file.
+    Walks objects and arrays structurally and decodes only the values asked for,
+    so only the value currently being decoded has to be in memory.
+    """
+
+    def __init__(self, file, chunk_size=1 << 20):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        # drop the consumed part of the buffer and read more data
+        chunk = self.file.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def _peek(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in _whitespace:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                raise ValueError("unexpected end of JSON data")
+            self._fill()
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"expected '{char}' at offset {self.position}, found '{self.buffer[self.position]}'")
+        self.position += 1
+
+    def read_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # the value is not complete yet, grow the buffer geometrically to keep the decoding linear
+            self._fill(max(self.chunk_size, len(self.buffer) - self.position))
+
+    def iter_object(self):
+        # yields the keys of an object, the caller must consume the value of each key
+        # (read_value, iter_object or iter_array) before moving to the next one
+        self._expect("{")
+        if self._peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            self._expect(":")
+            yield key
+            if self._peek() == ",":
+                self.position += 1
+                continue
+            self._expect("}")
+            return
+
+    def iter_array(self):
+        # yields the decoded items of an array, one at a time
+        self._expect("[")
+        if self._peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.read_value()
+            if self._peek() == ",":
+                self.position += 1
+                continue
+            self._expect("]")
+            return
+
+    def iter_path(self, path):
+        # yields the decoded items of the array at `path` (list of object keys),
+        # other values on the way are decoded and discarded
+        if not path:
+            yield from self.iter_array()
+            return
+        for key in self.iter_object():
+            if key == path[0]:
+                yield from self.iter_path(path[1:])
+            else:
+                self.read_value()
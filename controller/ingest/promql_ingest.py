@@ -14,62 +14,212 @@
 
 import logging
 import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from string import Template
-from prometheus_api_client import PrometheusConnect
+
+import numpy as np
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
 from prometheus_api_client.utils import parse_datetime
 
 from common.configuration_api import IngestSubType
-from common.signal import Signal, Signals
+from common.signal import Signals
+from common.signal_store import SignalStore, pairs_to_columns
+from common.utils import parse_duration
+from ingest.incremental import apply_incremental, load_state
 
 logger = logging.getLogger(__name__)
 
+# status codes worth retrying, anything else is reported immediately
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Prometheus refuses range queries returning more than 11000 points per series
+MAX_POINTS_PER_QUERY = 11000
+
+
+def create_session(concurrency):
+    # one keep-alive connection per worker thread, shared by all the requests of the ingest
+    session = requests.Session()
+    session.verify = False
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, concurrency))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def query_prometheus(session, url, params, ingest_config):
+    # GET `url` and return the `data` of the response, retrying with exponential backoff
+    attempt = 0
+    while True:
+        try:
+            response = session.get(url, params=params, timeout=ingest_config.request_timeout)
+            if response.status_code == 200:
+                return response.json()["data"]
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= ingest_config.retries:
+                raise RuntimeError(f"HTTP Status Code {response.status_code} ({response.content!r}) from {url}")
+            reason = f"HTTP Status Code {response.status_code}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= ingest_config.retries:
+                raise
+            reason = str(e)
+        delay = ingest_config.retry_backoff * (2 ** attempt)
+        attempt += 1
+        logger.debug(f"retrying {url} ({attempt}/{ingest_config.retries}) in {delay}s: {reason}")
+        time.sleep(delay)
+
+
+def get_metric_names(session, ingest_config):
+    return query_prometheus(session, f"{ingest_config.url}/api/v1/label/__name__/values", None, ingest_config)
+
+
+def split_window(start, end, chunk_seconds, step):
+    # split [start, end] into consecutive (chunk_start, chunk_end) chunks of at most `chunk_seconds`
+    if step:
+        # range queries return the points of the step grid, both ends included:
+        # keep every chunk on the grid and start the next chunk one step after the end of the previous one
+        max_chunk = step * (MAX_POINTS_PER_QUERY - 1)
+        chunk_seconds = min(chunk_seconds, max_chunk) if chunk_seconds else max_chunk
+        chunk_seconds = max(step, chunk_seconds // step * step)
+    elif end <= start:
+        # empty window (e.g. nothing new since the previous incremental ingest)
+        return []
+    elif not chunk_seconds:
+        return [(start, end)]
+    chunks = []
+    chunk_start = start
+    while chunk_start < end or (step and chunk_start == end):
+        chunk_end = min(chunk_start + chunk_seconds, end)
+        chunks.append((chunk_start, chunk_end))
+        # raw chunks share their boundary, the duplicated sample (if any) is dropped when stitching
+        chunk_start = chunk_end + step
+    return chunks
+
+
+def get_metric_range_data(session, ingest_config, metric, chunk, step):
+    chunk_start, chunk_end = chunk
+    if step:
+        # server side downsampling: one point per `step` seconds
+        params = {"query": metric, "start": chunk_start, "end": chunk_end, "step": step}
+        return query_prometheus(session, f"{ingest_config.url}/api/v1/query_range", params, ingest_config)["result"]
+    # raw samples of `metric` in the chunk, queried as a range vector selector at the end of the chunk
+    params = {"query": f"{metric}[{round(chunk_end - chunk_start)}s]", "time": chunk_end}
+    return query_prometheus(session, f"{ingest_config.url}/api/v1/query", params, ingest_config)["result"]
+
+
+def stitch_chunks(chunks_data):
+    # merge the results of the chunks of a metric into one series per label set (in order of first appearance)
+    series = {}
+    for chunk_data in chunks_data:
+        for signal in chunk_data:
+            key = tuple(sorted(signal["metric"].items()))
+            if key in series:
+                series[key]["values"].extend(signal["values"])
+            else:
+                series[key] = {"metric": signal["metric"], "values": list(signal["values"])}
+    for signal in series.values():
+        timestamps, values = pairs_to_columns(signal["values"])
+        # chunks are in time order, drop samples repeated on chunk boundaries
+        keep = np.ones(len(timestamps), dtype=bool)
+        keep[1:] = np.diff(timestamps) > 0
+        yield signal["metric"], timestamps[keep], values[keep]
+
+
+def fetch_range_data(session, executor, ingest_config, metrics, chunks, step):
+    # yields (metric, series) for each of `metrics`, series are the stitched (labels, timestamps, values) of the metric;
+    # requests (one per metric and chunk) run concurrently on `executor`, results are yielded in the order
+    # of `metrics` so that the ingested signals do not depend on the response timing. Requests are submitted at most
+    # `concurrency` metrics ahead of the metric yielded, so the responses waiting to be consumed stay bounded
+    tasks = ((metric, chunk) for metric in metrics for chunk in chunks)
+    pending = deque()
+
+    def submit(count):
+        for metric, chunk in islice(tasks, count):
+            pending.append(executor.submit(get_metric_range_data, session, ingest_config, metric, chunk, step))
+
+    submit(max(1, ingest_config.concurrency) * len(chunks))
+    progress_step = max(1, len(metrics) // 10)
+    started = time.monotonic()
+    try:
+        for metric_index, metric in enumerate(metrics, start=1):
+            chunks_data = [pending.popleft().result() for _ in chunks]
+            submit(len(chunks))
+            yield metric, stitch_chunks(chunks_data)
+            if metric_index % progress_step == 0 or metric_index == len(metrics):
+                logger.info(f"Fetched {metric_index}/{len(metrics)} metrics in {time.monotonic() - started:.1f}s")
+    finally:
+        # requests not started yet when a request fails (or the caller stops early) are dropped
+        for future in pending:
+            future.cancel()
+
+
+def relabel(labels, ingest_config, signal_count):
+    # apply `filter_metadata` and `ingest_name_template` to the labels of a series, None if filtered out
+    if ingest_config.filter_metadata != "":
+        if not re.findall(ingest_config.filter_metadata, str(labels)):
+            return None
+    if ingest_config.ingest_name_template != "":
+        # adding `count` to allow usage by template
+        labels["count"] = signal_count
+        # save original signal name into `original_name` if needed
+        if "__name__" in labels:
+            labels["original_name"] = labels["__name__"]
+        # build new name based on template
+        labels["__name__"] = Template(ingest_config.ingest_name_template).safe_substitute(labels)
+    return labels
+
 
 def ingest(ingest_config):
     ingest_url = ingest_config.url
     ingest_window = ingest_config.ingest_window
-    ingest_name_template = ingest_config.ingest_name_template
-    ingest_filter_metadata = ingest_config.filter_metadata
+    concurrency = max(1, ingest_config.concurrency)
+    step = parse_duration(ingest_config.step) if ingest_config.step else 0
+    chunk_seconds = parse_duration(ingest_config.chunk_size) if ingest_config.chunk_size else 0
 
-    signals = Signals()
+    signals = Signals(metadata={}, store=SignalStore(string_values=True))
     signal_type = "metric"
 
     signals.metadata["ingest_type"] = IngestSubType.PIPELINE_INGEST_PROMQL.value
     signals.metadata["ingest_source"] = ingest_url
     signals.metadata["ingest_window"] = ingest_window
+    if step:
+        signals.metadata["ingest_step"] = step
 
+    state = load_state(ingest_config.state_directory) if ingest_config.state_directory else None
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    session = create_session(concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
     try:
-        prom = PrometheusConnect(url=ingest_url, disable_ssl=True)
-        metrics = prom.all_metrics()
+        metrics = get_metric_names(session, ingest_config)
+        start = round(parse_datetime(ingest_window).timestamp())
+        end = round(parse_datetime("now").timestamp())
+        if state is not None and state.query_end is not None:
+            # incremental ingest: query only what was not fetched by the previous ingest
+            start = max(start, min(state.query_end, end))
+        chunks = split_window(start, end, chunk_seconds, step)
+        logger.info(f"Ingesting {len(metrics)} metrics in {len(chunks)} time chunks from {ingest_url} "
+                    f"with concurrency {concurrency}")
+
         signal_count = 0
-        for metric in metrics:
-            start_time = parse_datetime(ingest_window)
-            end_time = parse_datetime("now")
-            metric_data = prom.get_metric_range_data(
-                metric,
-                start_time=start_time,
-                end_time=end_time,
-            )
-            for signal in metric_data:
-                if ingest_filter_metadata != "":
-                    if not re.findall(ingest_filter_metadata, str(signal["metric"])):
-                        continue
-                if ingest_name_template != "":
-                    # adding `count` to allow usage by template
-                    signal["metric"]["count"] = signal_count
-                    # save original signal name into `original_name` if needed
-                    if "__name__" in signal["metric"]:
-                        signal["metric"]["original_name"] = signal["metric"]["__name__"]
-                    # build new name based on template
-                    signal["metric"]["__name__"] = Template(
-                        ingest_name_template).safe_substitute(signal["metric"])
-
-                signals.append(Signal(
-                    type=signal_type, metadata=signal['metric'], time_series=signal['values']))
+        for metric, series in fetch_range_data(session, executor, ingest_config, metrics, chunks, step):
+            for labels, timestamps, values in series:
+                labels = relabel(labels, ingest_config, signal_count)
+                if labels is None:
+                    continue
+                signals.append_time_series(signal_type, signals.store.intern_labels(labels), timestamps, values)
                 signal_count += 1
 
     except Exception as e:
         err = f"The url {ingest_url} does not exist {e}"
         raise RuntimeError(err) from e
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        session.close()
 
     logger.info(f"Ingested {len(signals.signals)} signals from {ingest_url} ")
+    if state is not None:
+        signals = apply_incremental(ingest_config, state, signals, query_end=end)
     return signals
@@ -0,0 +1,132 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import urllib3
+from prometheus_api_client.utils import parse_datetime
+
+from common.configuration_api import IngestSubType
+from common.signal import Signals
+from common.signal_store import SignalStore
+from common.utils import parse_duration
+from ingest.incremental import series_key
+from ingest.promql_ingest import create_session, fetch_range_data, query_prometheus, relabel, split_window
+
+logger = logging.getLogger(__name__)
+
+# metadata added by the ingest, not part of the Prometheus labels of the series
+INGEST_METADATA = ("count", "original_name", "signature_info", "tags")
+
+
+def query_labels(metadata):
+    # Prometheus labels of an ingested signal (undoing `ingest_name_template`)
+    labels = {key: value for key, value in metadata.items() if key not in INGEST_METADATA}
+    if "original_name" in metadata:
+        labels["__name__"] = metadata["original_name"]
+    return labels
+
+
+class PromqlSampleLoader:
+    """
+    Fetches the samples of signals ingested by the `promql_series` ingest, on first use by a later stage.
+    Samples are queried once per metric name (as in the `promql` ingest) for the names of the requested signals only.
+    """
+
+    def __init__(self, ingest_config, start, end):
+        self.ingest_config = ingest_config
+        self.start = start
+        self.end = end
+
+    def load(self, signals):
+        # returns a store holding the samples of `signals`, in order
+        ingest_config = self.ingest_config
+        step = parse_duration(ingest_config.step) if ingest_config.step else 0
+        chunk_seconds = parse_duration(ingest_config.chunk_size) if ingest_config.chunk_size else 0
+        concurrency = max(1, ingest_config.concurrency)
+
+        wanted = {}
+        for position, signal in enumerate(signals):
+            wanted.setdefault(series_key(query_labels(signal.metadata)), []).append(position)
+        metrics = list(dict.fromkeys(query_labels(signal.metadata).get("__name__") for signal in signals))
+        metrics = [metric for metric in metrics if metric is not None]
+        chunks = split_window(self.start, self.end, chunk_seconds, step)
+        logger.info(f"Loading the samples of {len(signals)} signals ({len(metrics)} metrics) "
+                    f"from {ingest_config.url}")
+
+        samples = [(np.empty(0), np.empty(0))] * len(signals)
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        session = create_session(concurrency)
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            for metric, series in fetch_range_data(session, executor, ingest_config, metrics, chunks, step):
+                for labels, timestamps, values in series:
+                    for position in wanted.get(series_key(labels), []):
+                        samples[position] = (timestamps, values)
+        except Exception as e:
+            err = f"Error loading samples from {ingest_config.url}: {e}"
+            raise RuntimeError(err) from e
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            session.close()
+
+        store = SignalStore(string_values=True)
+        for timestamps, values in samples:
+            store.append(timestamps, values)
+        return store
+
+
+def ingest(ingest_config):
+    ingest_url = ingest_config.url
+    ingest_window = ingest_config.ingest_window
+
+    store = SignalStore(string_values=True)
+    signals = Signals(metadata={}, store=store)
+    signal_type = "metric"
+
+    signals.metadata["ingest_type"] = IngestSubType.PIPELINE_INGEST_PROMQL_SERIES.value
+    signals.metadata["ingest_source"] = ingest_url
+    signals.metadata["ingest_window"] = ingest_window
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    session = create_session(1)
+    try:
+        start = round(parse_datetime(ingest_window).timestamp())
+        end = round(parse_datetime("now").timestamp())
+        window = {"start": start, "end": end}
+        signals.metadata["label_names"] = query_prometheus(
+            session, f"{ingest_url}/api/v1/labels", window, ingest_config)
+        series = query_prometheus(
+            session, f"{ingest_url}/api/v1/series", dict(window, **{"match[]": ingest_config.match}), ingest_config)
+    except Exception as e:
+        err = f"The url {ingest_url} does not exist {e}"
+        raise RuntimeError(err) from e
+    finally:
+        session.close()
+
+    # the samples are fetched by `Signals.load_samples` for the signals that are still needed by then
+    store.sample_loader = PromqlSampleLoader(ingest_config, start, end)
+    empty = np.empty(0, dtype=np.float64)
+    signal_count = 0
+    for labels in series:
+        labels = relabel(labels, ingest_config, signal_count)
+        if labels is None:
+            continue
+        signals.append_time_series(signal_type, store.intern_labels(labels), empty, empty)
+        signal_count += 1
+
+    logger.info(f"Ingested the labels of {len(signals.signals)} signals from {ingest_url} ")
+    return signals
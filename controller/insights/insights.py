@@ -24,6 +24,32 @@ from analysis.analyze_zero_values import ZeroValuesAnalyzer
 
 logger = logging.getLogger(__name__)
 
+# analyzer of each analysis process type
+ANALYZERS = {
+    api.InsightsAnalysisChainType.INSIGHTS_ANALYSIS_ZERO_VALUES: ZeroValuesAnalyzer,
+    api.InsightsAnalysisChainType.INSIGHTS_ANALYSIS_FIXED_VALUES: FixedValuesAnalyzer,
+    api.InsightsAnalysisChainType.INSIGHTS_ANALYSIS_MONOTONIC: MonotonicAnalyzer,
+    api.InsightsAnalysisChainType.INSIGHTS_ANALYSIS_PAIRWISE_CORRELATIONS: PairwiseCorrelationAnalyzer,
+    api.InsightsAnalysisChainType.INSIGHTS_ANALYSIS_COMPOUND_CORRELATIONS: CompoundCorrelationAnalyzer,
+    api.InsightsAnalysisChainType.INSIGHTS_ANALYSIS_METADATA_CLASSIFICATION: MetadataClassificationAnalyzer,
+    api.InsightsAnalysisChainType.INSIGHTS_ANALYSIS_ACCESS_LOG_INTERSECT: AccessLogIntersectionAnalyzer,
+}
+
+
+def required_features(config):
+    """
+    Names of the extracted features read by the analysis chain of the insights `config`,
+    None when an analysis reads all the extracted features.
+    """
+    typed_config = api.GenerateInsights(**config)
+    features = set()
+    for analysis_process in typed_config.analysis_chain:
+        analyzer = ANALYZERS.get(analysis_process.type)
+        if analyzer is None or analyzer.required_features is None:
+            return None
+        features.update(analyzer.required_features)
+    return features
+
 
 def generate_insights(subtype, config, input_data):
     if len(input_data) != 1:
@@ -75,7 +101,7 @@ def generate_insights(subtype, config, input_data):
 
             signals, result_insights = (
 
-                monotonic_analyzer.analyze())
+                monotonic_analyzer.analyze(monotonic_counter_resets=analysis_process.monotonic_counter_resets))
 
             insights.append(result_insights)
 
@@ -93,7 +119,15 @@ def generate_insights(subtype, config, input_data):
                 pairwise_correlation_analyzer.analyze(
                     pairwise_similarity_threshold=pairwise_similarity_threshold,
                     pairwise_similarity_method=pairwise_similarity_method,
-                    pairwise_similarity_distance_method=pairwise_similarity_distance_method))
+                    pairwise_similarity_distance_method=pairwise_similarity_distance_method,
+                    pairwise_correlation_mode=analysis_process.pairwise_correlation_mode,
+                    pairwise_block_size=analysis_process.pairwise_block_size,
+                    pairwise_top_k=analysis_process.pairwise_top_k,
+                    pairwise_lsh_tables=analysis_process.pairwise_lsh_tables,
+                    pairwise_lsh_bits=analysis_process.pairwise_lsh_bits,
+                    pairwise_reduction=analysis_process.pairwise_reduction,
+                    pairwise_representative_policy=analysis_process.pairwise_representative_policy,
+                    access_log_file=analysis_process.access_log_file))
             insights.append(result_insights)
 
         elif analysis_process.type == api.InsightsAnalysisChainType.INSIGHTS_ANALYSIS_COMPOUND_CORRELATIONS:
@@ -105,7 +139,9 @@ def generate_insights(subtype, config, input_data):
 
             compound_correlation_analyzer.filter_signals_by_tags(filter_signals_by_tags, out=True, _any=True)
             signals, result_insights = (
-                compound_correlation_analyzer.analyze(compound_similarity_threshold=compound_similarity_threshold))
+                compound_correlation_analyzer.analyze(compound_similarity_threshold=compound_similarity_threshold,
+                                                      compound_engine=analysis_process.compound_engine,
+                                                      compound_top_k=analysis_process.compound_top_k))
             insights.append(result_insights)
         elif analysis_process.type == api.InsightsAnalysisChainType.INSIGHTS_ANALYSIS_METADATA_CLASSIFICATION:
             # finding pairwise correlated signals
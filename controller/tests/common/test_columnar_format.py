@@ -0,0 +1,140 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import numpy as np
+import pandas as pd
+import pytest
+from common.columnar_format import read_signals, write_signals
+from common.configuration_api import FeatureExtractionStatistical
+from common.feature_store import FeatureStore
+from common.signal import Signal, Signals
+from common.signal_store import SignalStore, pairs_to_columns
+from extract.feature_extraction_statistical import extract
+from insights.insights import generate_insights
+
+
+def build_signals():
+    signals = Signals(metadata={"ingest_type": "file"}, store=SignalStore(string_values=True))
+    for index, time_series in enumerate([[[10, "1"], [20, "2.5"]],
+                                         [[10, "NaN"]],
+                                         [[10.5, "3"], [20, "4"], [30, "5"]]]):
+        timestamps, values = pairs_to_columns(time_series)
+        signal = signals.append_time_series("metric", {"__name__": f"signal_{index}", "job": "test"},
+                                            timestamps, values)
+        signal.metadata["extracted_features"] = pd.DataFrame({"value_Min": [index], "value_Max": [index + 1.5]})
+    signals.signals[1].metadata["extracted_features"] = pd.DataFrame({"value_Var": [0.25]})
+    signals.tag_by_names(["signal_0", "signal_2"], "keep")
+    signals.tag_by_names(["signal_2"], "zero")
+    # a signal without samples (e.g. after trim)
+    signals.append(Signal("metric", {"__name__": "trimmed"}))
+    signals.metadata["metrics_metadata"] = [signal.metadata for signal in signals]
+    return signals
+
+
+@pytest.mark.parametrize("compression", [True, False])
+def test_round_trip(tmpdir, compression):
+    signals = build_signals()
+    write_signals(str(tmpdir), signals, compression=compression)
+    restored = read_signals(str(tmpdir))
+
+    assert len(restored) == 4
+    assert restored.metadata["ingest_type"] == "file"
+    assert restored.metadata["metrics_metadata"][0] == {"__name__": "signal_0", "job": "test"}
+    for signal, restored_signal in zip(signals.signals[:3], restored.signals[:3]):
+        assert restored_signal.time_series == signal.time_series
+        assert restored_signal.metadata["__name__"] == signal.metadata["__name__"]
+        assert restored_signal.metadata.get("tags") == signal.metadata.get("tags")
+        pd.testing.assert_frame_equal(restored_signal.extracted_features,
+                                      signal.extracted_features, check_dtype=False)
+    assert restored[2].extracted_features["value_Min"][0] == 2
+    assert restored[3].store is None and restored[3].time_series is None
+    assert restored[3].extracted_features is None
+    assert restored.filter_by_tags(["zero"])[0].metadata["__name__"] == "signal_2"
+
+
+def test_read_selected_columns(tmpdir):
+    write_signals(str(tmpdir), build_signals())
+    restored = read_signals(str(tmpdir), columns=["features"])
+
+    assert [signal.metadata["__name__"] for signal in restored] == ["signal_0", "signal_1", "signal_2", "trimmed"]
+    assert restored[0].store is None and len(restored[0].values) == 0
+    assert "tags" not in restored[0].metadata
+    assert np.isclose(restored[1].extracted_features["value_Var"][0], 0.25)
+
+    with pytest.raises(ValueError):
+        read_signals(str(tmpdir), columns=["values"])
+
+
+def is_memory_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def test_read_memory_mapped(tmpdir):
+    signals = build_signals()
+    write_signals(str(tmpdir), signals, compression=False)
+    restored = read_signals(str(tmpdir), memory_map=True)
+
+    # samples and features are views onto the mapped files
+    assert is_memory_mapped(restored.store.values)
+    assert restored[2].values.base is restored.store.values
+    assert is_memory_mapped(restored[0].feature_store.matrix)
+    assert restored[2].time_series == signals[2].time_series
+    assert restored[2].extracted_features["value_Max"][0] == 3.5
+    assert np.isclose(restored[1].extracted_features["value_Var"][0], 0.25)
+
+    # compressed directories are read
+    write_signals(str(tmpdir.join("compressed")), signals)
+    restored = read_signals(str(tmpdir.join("compressed")), memory_map=True)
+    assert not is_memory_mapped(restored.store.values)
+    assert restored[2].time_series == signals[2].time_series
+
+
+def test_round_trip_feature_store(tmpdir):
+    signals = build_signals()
+    feature_store = FeatureStore(np.arange(8, dtype=np.float64).reshape(4, 2), ["value_Max", "value_Min"])
+    signals = signals.with_features(feature_store)
+    write_signals(str(tmpdir), signals)
+    restored = read_signals(str(tmpdir))
+
+    assert restored.feature_store.names == ["value_Max", "value_Min"]
+    assert np.array_equal(restored.features_matrix()[0], feature_store.matrix)
+    assert restored[3].feature_index == 3 and restored[3].extracted_features["value_Min"][0] == 7
+
+
+def test_write_after_insights(tmpdir):
+    # the pandas objects kept by the correlations analyses are not encoded, the other analyses results are
+    random = np.random.default_rng(0)
+    signals = Signals(metadata={}, store=SignalStore())
+    timestamps = 1700000000 + 30 * np.arange(40, dtype=np.float64)
+    base = random.normal(size=40)
+    for index in range(6):
+        values = np.cumsum(np.abs(base)) if index == 0 else base * (index + 1) + random.normal(scale=0.01, size=40)
+        signals.append_time_series("metric", {"__name__": f"signal_{index}"}, timestamps, values)
+    extracted_signals = extract(FeatureExtractionStatistical(trim=True), signals)
+    generate_insights(None, {"analysis_chain": [{"type": "monotonic"},
+                                                {"type": "pairwise_correlations", "pairwise_similarity_threshold": 0.9,
+                                                 "pairwise_reduction": "clusters"}]}, [extracted_signals])
+    assert isinstance(extracted_signals[1].metadata["corr_signals"], pd.Series)
+
+    write_signals(str(tmpdir), extracted_signals)
+    restored = read_signals(str(tmpdir))
+    assert "corr_signals" not in restored[1].metadata and "corr_matrix" not in restored.metadata
+    assert restored.metadata["corr_clusters"] == extracted_signals.metadata["corr_clusters"]
+    assert restored[0].metadata["monotonic_changes"] == extracted_signals[0].metadata["monotonic_changes"]
+    assert [signal.metadata.get("tags") for signal in restored] == \
+        [signal.metadata.get("tags") for signal in extracted_signals]
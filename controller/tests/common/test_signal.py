@@ -0,0 +1,103 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from common.feature_store import FeatureStore
+from common.signal import Signal, Signals
+
+
+def build_signals():
+    return Signals(metadata={}, signals=[Signal("metric", {"__name__": name}) for name in ["a", "ab", "b", "a"]])
+
+
+def test_filter_by_names():
+    signals = build_signals()
+
+    assert [signal.metadata["__name__"] for signal in signals.filter_by_names("ab")] == ["ab"]
+    assert [signal.metadata["__name__"] for signal in signals.filter_by_names(["a", "b"])] == ["a", "b", "a"]
+    assert [signal.metadata["__name__"] for signal in signals.filter_by_names(["a"], filter_in=False)] == ["ab", "b"]
+
+
+def test_tag_and_filter_by_tags():
+    signals = build_signals()
+    signals.tag_by_names(["a"], "t1")
+    signals.tag_by_names(["b"], "t2")
+    signals.tag_by_names(["a", "ab"], "t2", filter_in=False)
+
+    assert signals[0].metadata["tags"] == ["t1"]
+    assert signals[2].is_tagged(["t2"], True)
+    assert signals.filter_by_tags(["t1", "t2"], _any=True) == [signals[0], signals[2], signals[3]]
+    assert signals.filter_by_tags(["t1", "t2"], filter_in=False, _any=True) == [signals[1]]
+    assert signals.filter_by_tags(["t1", "t2"], _any=False) == []
+
+    # signals appended after a filter are filtered too
+    signals.append(Signal("metric", {"__name__": "c", "tags": ["t1"]}))
+    assert signals.filter_by_tags(["t1"]) == [signals[0], signals[3], signals[4]]
+
+    # signals tagged directly, through other Signals sharing them, or by editing their metadata
+    signals[1].tag("t1")
+    assert signals.filter_by_tags(["t1"]) == [signals[0], signals[1], signals[3], signals[4]]
+    Signals(metadata={}, signals=signals.signals[2:3]).tag_by_names(["b"], "t3")
+    assert signals.filter_by_tags(["t3"]) == [signals[2]]
+    signals[4].metadata["tags"] = ["t3"]
+    assert signals.filter_by_tags(["t1"]) == [signals[0], signals[1], signals[3]]
+    assert signals.filter_by_tags(["t3"]) == [signals[2], signals[4]]
+
+    # signals replaced in place
+    signals.signals[0] = Signal("metric", {"__name__": "a", "tags": ["t3"]})
+    assert signals.filter_by_tags(["t1"]) == [signals[1], signals[3]]
+    assert signals.filter_by_tags(["t3"]) == [signals[0], signals[2], signals[4]]
+
+
+def build_extracted_signals():
+    signals = build_signals()
+    return signals.with_features(FeatureStore(np.arange(12, dtype=np.float64).reshape(4, 3),
+                                              ["value_Max", "value_Mean", "value_Min"]))
+
+
+def test_features_matrix():
+    signals = build_extracted_signals()
+
+    matrix, names = signals.features_matrix()
+    assert matrix is signals.feature_store.matrix and names == ["value_Max", "value_Mean", "value_Min"]
+    subset = Signals(signals=[signals[3], signals[1]])
+    assert subset.features_matrix(["value_Min", "value_Max"])[0].tolist() == [[11, 9], [5, 3]]
+    assert signals[1].extracted_features["value_Mean"][0] == 4
+
+    # features of other stores and per signal DataFrames (signals extracted before the feature store)
+    legacy = Signal("metric", {"__name__": "c", "extracted_features": pd.DataFrame({"value_Min": [-1.0]})})
+    mixed = Signals(signals=[signals[0], legacy])
+    matrix, names = mixed.features_matrix()
+    assert names == ["value_Max", "value_Mean", "value_Min"]
+    assert np.array_equal(matrix, [[0, 1, 2], [np.nan, np.nan, -1]], equal_nan=True)
+
+    # one row of features per signal
+    with pytest.raises(ValueError, match="3 rows for 4 signals"):
+        build_signals().with_features(FeatureStore(np.zeros((3, 1)), ["value_Min"]))
+
+
+def test_pickle_features():
+    signals = build_extracted_signals()
+    subset = Signals(signals.metadata, [signals[2], Signal("metric", {"__name__": "c"}), signals[0]])
+
+    restored = pickle.loads(pickle.dumps(subset))
+
+    assert len(restored.feature_store) == 2
+    assert restored[0].extracted_features["value_Min"][0] == 8
+    assert restored[2].feature_index == 1 and restored[2].extracted_features["value_Min"][0] == 2
+    assert restored[1].feature_store is None
+    assert pickle.loads(pickle.dumps(signals[3])).extracted_features["value_Max"][0] == 9
@@ -0,0 +1,59 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import pickle
+
+import numpy as np
+from common.signal import Signals
+from common.signal_store import SignalStore, pairs_to_columns
+
+
+def build_signals():
+    signals = Signals(metadata={}, store=SignalStore(string_values=True))
+    for index, time_series in enumerate([[[10, "1"], [20, "2.5"]],
+                                         [[10, "NaN"]],
+                                         [[10.5, "3"], [20, "4"], [30, "5"]]]):
+        timestamps, values = pairs_to_columns(time_series)
+        signals.append_time_series("metric", {"__name__": f"signal_{index}"}, timestamps, values)
+    return signals
+
+
+def test_store_layout():
+    signals = build_signals()
+
+    assert len(signals.store) == 3
+    assert signals.store.offsets.tolist() == [0, 2, 3, 6]
+    assert signals[2].values.tolist() == [3, 4, 5]
+    assert signals[2].timestamps.base is signals.store.timestamps
+
+
+def test_legacy_time_series():
+    signals = build_signals()
+
+    assert signals[0].time_series == [[10, "1"], [20, "2.5"]]
+    assert signals[1].time_series == [[10, "NaN"]]
+    assert signals[2].time_series == [[10.5, "3"], [20, "4"], [30, "5"]]
+
+
+def test_pickle_subset_keeps_only_its_samples():
+    signals = build_signals()
+    subset = Signals(signals.metadata, [signals[0], signals[2]])
+
+    restored = pickle.loads(pickle.dumps(subset))
+
+    assert len(restored.store) == 2
+    assert restored.store.offsets.tolist() == [0, 2, 5]
+    assert restored[1].metadata["__name__"] == "signal_2"
+    assert np.array_equal(restored[1].values, [3, 4, 5])
+    assert restored[1].time_series == [[10.5, "3"], [20, "4"], [30, "5"]]
@@ -0,0 +1,38 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import numpy as np
+import pytest
+from common.feature_store import FeatureStore
+from common.signal import Signals
+from common.signal_store import SignalStore
+
+
+def feature_signals(features, names=None, lengths=None):
+    # signals signal_0, signal_1... with the rows of the (signals x features) matrix `features` as their extracted
+    # features (named value_feature_0, value_feature_1... by default) and `lengths` zero samples (3 by default)
+    features = np.ascontiguousarray(features, dtype=np.float64)
+    signals = Signals(metadata={}, store=SignalStore())
+    for index in range(len(features)):
+        length = 3 if lengths is None else lengths[index]
+        signals.append_time_series("metric", {"__name__": f"signal_{index}"}, np.arange(length, dtype=np.float64),
+                                   np.zeros(length))
+    if names is None:
+        names = [f"value_feature_{index}" for index in range(features.shape[1])]
+    return signals.with_features(FeatureStore(features, list(names)))
+
+
+@pytest.fixture
+def make_feature_signals():
+    return feature_signals
@@ -0,0 +1,104 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+
+import numpy as np
+from common.configuration_api import FeatureExtractionStatistical, FeatureExtractionTsfel
+from common.signal import Signals
+from common.signal_store import SignalStore
+from extract.feature_cache import get_statistics
+from extract.feature_extraction_statistical import extract
+from extract.feature_extraction_tsfel import extract as extract_tsfel
+
+
+def make_signals(count=5, changed=None):
+    random = np.random.default_rng(0)
+    signals = Signals(metadata={}, store=SignalStore())
+    for index in range(count):
+        values = random.normal(size=40)
+        if index == changed:
+            values[-1] += 1
+        timestamps = 1700000010 + 30 * np.arange(len(values), dtype=np.float64)
+        signals.append_time_series("metric", {"__name__": f"signal_{index}"}, timestamps, values)
+    return signals
+
+
+def test_cache_hits_and_misses(tmp_path):
+    config = FeatureExtractionStatistical(cache_directory=str(tmp_path))
+    expected = extract(FeatureExtractionStatistical(), make_signals()).feature_store.matrix
+
+    before = get_statistics()
+    extracted_signals = extract(config, make_signals())
+    assert get_statistics()["last_run"] == {"directory": str(tmp_path), "hits": 0, "misses": 5, "evictions": 0}
+    np.testing.assert_array_equal(extracted_signals.feature_store.matrix, expected)
+
+    extracted_signals = extract(config, make_signals())
+    assert get_statistics()["last_run"]["hits"] == 5
+    assert get_statistics()["last_run"]["misses"] == 0
+    np.testing.assert_array_equal(extracted_signals.feature_store.matrix, expected)
+
+    # only the signal whose samples changed is extracted again
+    extracted_signals = extract(config, make_signals(changed=2))
+    assert get_statistics()["last_run"]["hits"] == 4
+    assert get_statistics()["last_run"]["misses"] == 1
+    np.testing.assert_array_equal(extracted_signals.feature_store.matrix[[0, 1, 3, 4]], expected[[0, 1, 3, 4]])
+    assert extracted_signals.feature_store.matrix[2, extracted_signals.feature_store.columns(["value_Max"])[0]] \
+        == make_signals(changed=2)[2].values.max()
+
+    statistics = get_statistics()
+    assert statistics["hits"] - before["hits"] == 9
+    assert statistics["misses"] - before["misses"] == 6
+
+
+def test_cache_plans(tmp_path):
+    # another feature plan (here, resample rate) does not use the cached features
+    extract(FeatureExtractionStatistical(cache_directory=str(tmp_path)), make_signals())
+    extract(FeatureExtractionStatistical(cache_directory=str(tmp_path), resample_rate="1min"), make_signals())
+    assert get_statistics()["last_run"]["misses"] == 5
+    assert len(os.listdir(tmp_path)) == 2
+
+    signals = make_signals()
+    expected = extract_tsfel(FeatureExtractionTsfel(), make_signals()).feature_store
+    config = FeatureExtractionTsfel(cache_directory=str(tmp_path))
+    extract_tsfel(config, make_signals())
+    extracted_signals = extract_tsfel(config, signals)
+    assert get_statistics()["last_run"]["hits"] == 5
+    assert extracted_signals.feature_store.names == expected.names
+    np.testing.assert_array_equal(extracted_signals.feature_store.matrix, expected.matrix)
+
+
+def test_cache_eviction(tmp_path):
+    config = FeatureExtractionStatistical(cache_directory=str(tmp_path), cache_max_entries=6)
+    extract(config, make_signals(count=4))
+    extract(config, make_signals(count=4, changed=0))
+    assert get_statistics()["last_run"] == {"directory": str(tmp_path), "hits": 3, "misses": 1, "evictions": 0}
+    extract(config, make_signals(count=4, changed=1))
+    assert get_statistics()["last_run"]["evictions"] == 0
+    # 7 entries: the least recently used one (changed signal_0 or original signal_1) is evicted
+    extract(config, make_signals(count=4, changed=3))
+    assert get_statistics()["last_run"]["evictions"] == 1
+    extract(config, make_signals(count=4))
+    assert get_statistics()["last_run"]["hits"] == 4
+
+
+def test_damaged_cache(tmp_path):
+    config = FeatureExtractionStatistical(cache_directory=str(tmp_path))
+    extract(config, make_signals())
+    for file_name in os.listdir(tmp_path):
+        with open(os.path.join(tmp_path, file_name), 'wb') as file:
+            file.write(b"damaged")
+    extracted_signals = extract(config, make_signals())
+    assert get_statistics()["last_run"]["misses"] == 5
+    assert len(extracted_signals.feature_store) == 5
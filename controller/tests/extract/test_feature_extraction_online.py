@@ -0,0 +1,122 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import numpy as np
+import pytest
+from common.configuration_api import FeatureExtractionOnline, FeatureExtractionStatistical
+from common.signal import Signals
+from common.signal_store import SignalStore
+from extract.feature_extraction_online import (ONLINE_STATISTICS, FeatureAccumulators, extract, histograms_of,
+                                               load_state)
+from extract.feature_extraction_statistical import extract as extract_statistical, load_features
+
+FEATURES_JSON_FILE = "extract/tsfel_conf/online_statistical.json"
+
+
+def make_samples():
+    random = np.random.default_rng(0)
+    samples = [1000 + random.normal(size=300), random.uniform(-2, 2, size=137), np.full(120, 0.3),
+               np.array([5.0]), np.round(random.normal(size=64), 1)]
+    return [(1700000010 + 30 * np.arange(len(values), dtype=np.float64), values) for values in samples]
+
+
+def make_signals(samples, start=0, end=None):
+    # the samples of [start, end) of each series, series without samples in the window are not ingested
+    signals = Signals(metadata={}, store=SignalStore())
+    for index, (timestamps, values) in enumerate(samples):
+        if len(timestamps[start:end]):
+            signals.append_time_series("metric", {"__name__": f"signal_{index}"}, timestamps[start:end],
+                                       values[start:end])
+    return signals
+
+
+def test_extract_matches_statistical():
+    samples = make_samples()
+    expected = extract_statistical(FeatureExtractionStatistical(features_json_file=FEATURES_JSON_FILE,
+                                                                resample_rate=None), make_signals(samples))
+    extracted_signals = extract(FeatureExtractionOnline(), make_signals(samples))
+    assert extracted_signals.feature_store.names == expected.feature_store.names
+    np.testing.assert_allclose(extracted_signals.feature_store.matrix, expected.feature_store.matrix, rtol=1e-12)
+    # constant signals have exactly zero variance, as used by the fixed values analysis
+    assert extracted_signals[2].extracted_features["value_Var"][0] == 0
+
+
+@pytest.mark.parametrize("windows", [[(0, 50), (50, 51), (51, 200), (200, None)],
+                                     # overlapping windows (e.g. incremental ingest retaining the previous samples)
+                                     [(0, 50), (0, 120), (100, 250), (0, None)]])
+def test_extract_chunks(tmp_path, windows):
+    samples = make_samples()
+    expected = extract(FeatureExtractionOnline(), make_signals(samples))
+    config = FeatureExtractionOnline(state_directory=str(tmp_path))
+    for start, end in windows:
+        extract(config, make_signals(samples, start, end))
+    # the features of all the accumulated samples, whatever the samples in the input
+    extracted_signals = extract(config, make_signals(samples, -1))
+    assert extracted_signals.feature_store.names == expected.feature_store.names
+    np.testing.assert_allclose(extracted_signals.feature_store.matrix, expected.feature_store.matrix, rtol=1e-9)
+
+    # only the series in the input get features, from all the samples accumulated so far
+    extracted_signals = extract(config, make_signals(samples[:2], 290))
+    assert len(extracted_signals) == 1
+    np.testing.assert_allclose(extracted_signals.feature_store.matrix, expected.feature_store.matrix[:1], rtol=1e-9)
+
+
+def test_accumulators_update():
+    timestamps = np.arange(10, dtype=np.float64)
+    values = np.array([1.0, 2.0, np.nan, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0])
+    accumulators = FeatureAccumulators()
+    # the same series twice: both occurrences are folded, in order; NaN samples are skipped
+    assert accumulators.update(["a", "a"], np.concatenate([timestamps[:5], timestamps[5:]]), values, [5, 5]) == 9
+    assert accumulators.update(["a"], timestamps, values, [10]) == 0
+    statistics = accumulators.statistics(["a"])
+    expected = values[~np.isnan(values)]
+    assert statistics.mean()[0] == pytest.approx(expected.mean())
+    assert statistics.var()[0] == pytest.approx(expected.var())
+    assert statistics.abs_energy()[0] == pytest.approx((expected ** 2).sum())
+    assert (statistics.min()[0], statistics.max()[0]) == (1.0, 10.0)
+
+
+def test_retention_runs(tmp_path):
+    samples = make_samples()
+    config = FeatureExtractionOnline(state_directory=str(tmp_path), retention_runs=2)
+    histograms = histograms_of(load_features(FEATURES_JSON_FILE, ONLINE_STATISTICS, "online"))
+    extract(config, make_signals(samples, 0, 100))
+    # signal_3 and signal_4 (less than 100 samples) are not in the next windows, they are dropped after 2 runs
+    extract(config, make_signals(samples, 100, 200))
+    assert len(load_state(str(tmp_path), histograms)) == 5
+    extract(config, make_signals(samples, 200))
+    accumulators = load_state(str(tmp_path), histograms)
+    assert sorted(accumulators.key_index.values()) == [0, 1, 2]
+    # the kept series are accumulated as before, the dropped ones start over from their new samples
+    extracted_signals = extract(config, make_signals(samples, -1))
+    expected = extract(FeatureExtractionOnline(), make_signals(samples))
+    np.testing.assert_allclose(extracted_signals.feature_store.matrix[:3], expected.feature_store.matrix[:3],
+                               rtol=1e-9)
+    assert extracted_signals[4].extracted_features["value_Max"][0] == samples[4][1][-1]
+
+    # a series seen again after being dropped starts from its new samples
+    accumulators = FeatureAccumulators()
+    timestamps = np.arange(4, dtype=np.float64)
+    accumulators.update(["a", "b"], np.concatenate([timestamps, timestamps]), np.arange(8.0), [4, 4])
+    assert accumulators.evict(1) == 0
+    accumulators.update(["b"], timestamps + 4, np.arange(4.0), [4])
+    assert accumulators.evict(1) == 1
+    accumulators.update(["a"], timestamps, np.arange(4.0), [4])
+    assert accumulators.count.tolist() == [8, 4]
+
+
+def test_unsupported_features():
+    with pytest.raises(ValueError, match="not supported by the online extract"):
+        extract(FeatureExtractionOnline(features_json_file="extract/tsfel_conf/limited_statistical.json"),
+                make_signals(make_samples()))
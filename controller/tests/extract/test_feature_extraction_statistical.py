@@ -0,0 +1,65 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+from common.configuration_api import FeatureExtractionStatistical, FeatureExtractionTsfel
+from common.signal import Signals
+from common.signal_store import SignalStore
+from extract.feature_extraction_statistical import extract
+from extract.feature_extraction_tsfel import extract as extract_tsfel
+
+
+def make_signals():
+    random = np.random.default_rng(0)
+    signals = Signals(metadata={}, store=SignalStore())
+    samples = [random.normal(size=100), random.uniform(-2, 2, size=37), np.full(20, 0.3), np.array([5.0]),
+               np.array([-1.0, -0.8, 0.0, 0.2, 1.0, 1.0]), np.round(random.normal(size=64), 1)]
+    for index, values in enumerate(samples):
+        timestamps = 1700000010 + 30 * np.arange(len(values), dtype=np.float64)
+        signals.append_time_series("metric", {"__name__": f"signal_{index}"}, timestamps, values)
+    # irregularly sampled, with gaps (resampled)
+    timestamps = 1700000000 + np.cumsum(random.choice([10, 15, 30, 45, 300], size=90))
+    signals.append_time_series("metric", {"__name__": "irregular"}, timestamps, random.uniform(-1, 1, size=90))
+    return signals
+
+
+@pytest.mark.parametrize("features_json_file", ["extract/tsfel_conf/limited_statistical.json",
+                                                "extract/tsfel_conf/minimum_statistical.json"])
+def test_extract_matches_tsfel(features_json_file):
+    signals = make_signals()
+    expected = extract_tsfel(FeatureExtractionTsfel(features_json_file=features_json_file), copy.deepcopy(signals))
+    extracted_signals = extract(FeatureExtractionStatistical(features_json_file=features_json_file), signals)
+
+    assert len(extracted_signals) == len(expected)
+    for signal, expected_signal in zip(extracted_signals, expected):
+        assert signal.metadata["__name__"] == expected_signal.metadata["__name__"]
+        pd.testing.assert_frame_equal(signal.extracted_features, expected_signal.extracted_features, rtol=1e-12)
+    # without resampling, the features are computed over the samples as is
+    signals = make_signals()
+    extracted_signals = extract(FeatureExtractionStatistical(features_json_file=features_json_file,
+                                                             resample_rate=None), signals)
+    assert extracted_signals[6].extracted_features["value_Max"][0] == signals[6].values.max()
+    # constant signals have exactly zero variance, as used by the fixed values analysis
+    if "value_Var" in extracted_signals.feature_store.names:
+        assert extracted_signals[2].extracted_features["value_Var"][0] == 0
+
+
+def test_extract_unsupported_features():
+    with pytest.raises(ValueError, match="not supported"):
+        extract(FeatureExtractionStatistical(features_json_file="extract/tsfel_conf/limited_features.json"),
+                make_signals())
@@ -0,0 +1,110 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import copy
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+import tsfel
+from common.configuration_api import FeatureExtractionTsfel
+from common.signal import Signals
+from common.signal_store import SignalStore
+from extract.feature_extraction_tsfel import extract, get_feature_plan
+
+
+@pytest.mark.parametrize("features_json_file", ["extract/tsfel_conf/limited_statistical.json",
+                                                "extract/tsfel_conf/minimum_statistical.json"])
+def test_feature_plan_matches_tsfel(features_json_file):
+    random = np.random.default_rng(0)
+    window = pd.DataFrame({"value": random.normal(size=100)})
+    with open(features_json_file, 'r') as file:
+        features_config = json.load(file)
+    expected = tsfel.time_series_features_extractor(dict_features=features_config, signal_windows=window,
+                                                    fs=1 / 30, verbose=0)
+
+    plan = get_feature_plan(features_json_file, "30s", 1 / 30)
+    features = plan.extract_features(window["value"].to_numpy())
+
+    pd.testing.assert_frame_equal(features, expected)
+    # the plan is prepared once and reused
+    assert get_feature_plan(features_json_file, "30s", 1 / 30) is plan
+
+
+def test_extract():
+    signals = Signals(metadata={}, store=SignalStore())
+    timestamps = 1700000000 + 30 * np.arange(50, dtype=np.float64)
+    for index in range(3):
+        signals.append_time_series("metric", {"__name__": f"signal_{index}"}, timestamps,
+                                   np.full(50, float(index)))
+    extracted_signals = extract(FeatureExtractionTsfel(), signals)
+
+    assert len(extracted_signals) == 3
+    features = extracted_signals[2].extracted_features
+    assert features["value_Min"][0] == 2 and features["value_Max"][0] == 2
+    assert features["value_Var"][0] == 0
+    assert list(features.columns) == sorted(features.columns)
+    # the features of all the signals are a single matrix
+    matrix, names = extracted_signals.features_matrix(["value_Min", "value_Max"])
+    assert matrix.tolist() == [[0, 0], [1, 1], [2, 2]]
+    assert "extracted_features" not in extracted_signals[2].metadata
+
+
+def test_extract_with_workers():
+    random = np.random.default_rng(0)
+    signals = Signals(metadata={}, store=SignalStore())
+    for index in range(7):
+        timestamps = 1700000000 + np.cumsum(random.choice([15, 30, 60], size=40))
+        signals.append_time_series("metric", {"__name__": f"signal_{index}"}, timestamps, random.normal(size=40))
+    expected, names = extract(FeatureExtractionTsfel(), copy.deepcopy(signals)).features_matrix()
+
+    extracted_signals = extract(FeatureExtractionTsfel(number_of_workers=2, chunk_size=3), signals)
+
+    matrix, extracted_names = extracted_signals.features_matrix()
+    assert extracted_names == names
+    assert np.array_equal(matrix, expected)
+    assert extracted_signals[6].extracted_features["value_Max"][0] == matrix[6, names.index("value_Max")]
+
+
+def test_extract_selected_features():
+    random = np.random.default_rng(0)
+    signals = Signals(metadata={}, store=SignalStore())
+    timestamps = 1700000000 + 30 * np.arange(50, dtype=np.float64)
+    for index in range(3):
+        signals.append_time_series("metric", {"__name__": f"signal_{index}"}, timestamps, random.normal(size=50))
+    expected = extract(FeatureExtractionTsfel(), copy.deepcopy(signals)).feature_store
+    features = ["value_Max", "value_Var", "value_Histogram_3"]
+    extracted_signals = extract(FeatureExtractionTsfel(features=features), signals)
+
+    # all the values of the selected tsfel features (e.g. the 10 histogram bins), and only them
+    names = extracted_signals.feature_store.names
+    assert names == [f"value_Histogram_{index}" for index in range(10)] + ["value_Max", "value_Var"]
+    np.testing.assert_array_equal(extracted_signals.feature_store.matrix, expected.matrix[:, expected.columns(names)])
+
+
+@pytest.mark.parametrize("chunk_size, number_of_workers", [(1, 0), (2, 0), (10, 0), (2, 2)])
+def test_extract_features_differ(tmp_path, chunk_size, number_of_workers):
+    # the ECDF has fewer values for windows shorter than `d`: the features of signal_2 differ
+    features_json_file = str(tmp_path / "ecdf.json")
+    with open(features_json_file, "w") as file:
+        json.dump({"statistical": {"ECDF": {"function": "tsfel.ecdf", "parameters": {"d": 10}, "n_features": 10,
+                                            "use": "yes"}}}, file)
+    signals = Signals(metadata={}, store=SignalStore())
+    for index, length in enumerate([40, 40, 5, 40]):
+        samples = np.arange(length, dtype=np.float64)
+        signals.append_time_series("metric", {"__name__": f"signal_{index}"}, 1700000000 + 30 * samples, samples)
+    with pytest.raises(ValueError, match="the features of signal signal_2 differ"):
+        extract(FeatureExtractionTsfel(features_json_file=features_json_file, chunk_size=chunk_size,
+                                       number_of_workers=number_of_workers), signals)
@@ -0,0 +1,54 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import numpy as np
+import pandas as pd
+import pytest
+from extract.resample import resample_segments
+
+
+def build_segments():
+    random = np.random.default_rng(0)
+    segments = [(np.empty(0), np.empty(0)), (np.array([1700000000.0]), np.array([np.nan]))]
+    for index in range(50):
+        count = int(random.integers(1, 80))
+        # irregular intervals, gaps and fractional timestamps
+        timestamps = 1700000000 + random.uniform(0, 3 * 86400) + \
+            np.cumsum(random.choice([7.5, 15, 30, 30, 30, 45, 60, 600], size=count))
+        if index % 3 == 0:
+            timestamps = np.round(timestamps)
+        values = random.normal(size=count)
+        if index % 4 == 0:
+            values[random.integers(0, count, size=2)] = np.nan
+        segments.append((timestamps, values))
+    return segments
+
+
+@pytest.mark.parametrize("resample_rate", ["30s", "1min", "7s", "13min"])
+def test_resample_segments_matches_pandas(resample_rate):
+    segments = build_segments()
+    resampled, bin_counts = resample_segments(np.concatenate([timestamps for timestamps, _ in segments]),
+                                              np.concatenate([values for _, values in segments]),
+                                              [len(timestamps) for timestamps, _ in segments], resample_rate)
+
+    offsets = np.concatenate([[0], np.cumsum(bin_counts)])
+    for index, (timestamps, values) in enumerate(segments):
+        expected = pd.Series(values, index=pd.to_datetime(timestamps, unit='s')).resample(resample_rate).mean() \
+            .interpolate('linear').to_numpy()
+        np.testing.assert_allclose(resampled[offsets[index]:offsets[index + 1]], expected, rtol=1e-12, atol=1e-15)
+
+
+def test_resample_segments_rate():
+    with pytest.raises(ValueError, match="not a fixed frequency"):
+        resample_segments(np.array([1.0]), np.array([1.0]), [1], "MS")
@@ -12,6 +12,8 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import json
+
 import pytest
 from common.configuration_api import IngestFile
 
@@ -63,3 +65,131 @@ def test_ingest(input_file):
 
     assert signals[0].type == "metric"
     assert signals[0].time_series == time_series_type1
+
+
+def test_ingest_streaming(input_file):
+    ingest_config = IngestFile(file_name=str(input_file), streaming=True)
+    from ingest.file_ingest import ingest
+    signals = ingest(ingest_config)
+
+    assert signals[0].type == "metric"
+    assert signals[0].metadata["__name__"] == "fake_same_a_1"
+    assert signals[0].time_series == time_series_type1
+
+
+def test_json_stream_small_chunks():
+    import io
+    from ingest.json_stream import JsonStream
+    text = '{"status": "success", "data": {"result": [{"metric": {"a": 1}, "values": [[1, "2"]]}, ' \
+           '{"metric": {}, "values": [[12345.5, "-1e-7"]]}], "resultType": "matrix"}, "tail": [1, 2]}'
+
+    items = list(JsonStream(io.StringIO(text), chunk_size=7).iter_path(["data", "result"]))
+
+    assert items == [{"metric": {"a": 1}, "values": [[1, "2"]]},
+                     {"metric": {}, "values": [[12345.5, "-1e-7"]]}]
+
+
+def write_instana_file(file_path, host, metrics):
+    import json
+    with open(file_path, 'w') as f:
+        json.dump([{"host": host, "plugin": "host", "label": host, "snapshotId": host, "metrics": metrics}], f)
+
+
+@pytest.mark.parametrize("number_of_workers", [0, 2])
+def test_ingest_instana_directory(tmpdir, number_of_workers):
+    from common.conf import set_configuration
+    from ingest.file_ingest import ingest
+    tmpdir.mkdir("sub")
+    write_instana_file(tmpdir.join("b.json"), "host_b", {"cpu": [[1000, 1], [2000, 2]]})
+    write_instana_file(tmpdir.join("a.json"), "host_a", {"cpu": [[1000, 3]], "memory": [[1000, 4]]})
+    write_instana_file(tmpdir.join("sub", "c.json"), "host_c", {"cpu": [[3000, 5]]})
+    set_configuration({"global_settings": {"number_of_workers": number_of_workers}})
+    try:
+        signals = ingest(IngestFile(file_name=str(tmpdir), format="instana_infra", time_unit="ms",
+                                    ingest_name_template="$instance-$__name__"))
+    finally:
+        set_configuration(None)
+
+    assert [signal.metadata["__name__"] for signal in signals] == \
+        ["host_a-cpu", "host_a-memory", "host_b-cpu", "host_c-cpu"]
+    assert signals[2].time_series == [[1, 1.0], [2, 2.0]]
+    assert len(signals.metadata["metrics_metadata"]) == 4
+
+
+def test_combine_multiple_metrics_entries():
+    from common.signal import Signals
+    from common.signal_store import SignalStore
+    from ingest.file_ingest import combine_multiple_metrics_entries
+    signals = Signals(metadata={"ingest_source": "test"}, store=SignalStore())
+    for name, timestamps in [("a", [30, 40]), ("b", [10]), ("a", [10, 20, 30]), ("a", [35, 50])]:
+        signature_info = {"first_time": timestamps[0], "last_time": timestamps[-1], "num_of_items": len(timestamps)}
+        signals.append_time_series("metric", {"__name__": name, "signature_info": signature_info},
+                                   timestamps, [timestamp + len(timestamps) for timestamp in timestamps])
+
+    combined = combine_multiple_metrics_entries(signals)
+
+    assert combined.metadata["ingest_source"] == "test"
+    assert [signal.metadata["__name__"] for signal in combined] == ["a", "b"]
+    # overlapping timestamp 30 keeps the sample of the first chunk
+    assert combined[0].time_series == [[10, 13.0], [20, 23.0], [30, 32.0], [35, 37.0], [40, 42.0], [50, 52.0]]
+    assert combined[0].metadata["signature_info"] == {"first_time": 10, "last_time": 50, "num_of_items": 6}
+    assert combined[1].time_series == [[10, 11.0]]
+
+
+def test_combine_multiple_metrics_entries_labels():
+    from common.signal import Signals
+    from common.signal_store import SignalStore
+    from ingest.file_ingest import combine_multiple_metrics_entries
+    signals = Signals(metadata={}, store=SignalStore())
+    for count, (host, timestamps, tags) in enumerate([("x", [10, 20], ["t1"]), ("y", [10], []),
+                                                      ("x", [30], ["t2", "t1"])]):
+        signature_info = {"first_time": timestamps[0], "last_time": timestamps[-1], "num_of_items": len(timestamps)}
+        signals.append_time_series("metric", {"__name__": "cpu", "host": host, "count": count, "tags": tags,
+                                              "signature_info": signature_info}, timestamps, timestamps)
+
+    combined = combine_multiple_metrics_entries(signals)
+
+    # same name, different labels: separate series
+    assert [signal.metadata["host"] for signal in combined] == ["x", "y"]
+    assert combined[0].time_series == [[10, 10.0], [20, 20.0], [30, 30.0]]
+    assert combined[0].metadata["signature_info"] == {"first_time": 10, "last_time": 30, "num_of_items": 3}
+    assert combined[0].metadata["tags"] == ["t1", "t2"]
+    assert combined[0].metadata["count"] == 0
+    assert combined[1].time_series == [[10, 10.0]]
+    # the metadata of the ingested chunks is not modified
+    assert signals[0].metadata["signature_info"]["num_of_items"] == 2
+
+
+def write_prometheus_file(file_path, result):
+    with open(file_path, 'w') as f:
+        json.dump({"status": "success", "data": {"resultType": "matrix", "result": result}}, f)
+
+
+def test_ingest_incremental(tmpdir):
+    from ingest.file_ingest import ingest
+    input_file = str(tmpdir.join("dump.json"))
+    state_directory = str(tmpdir.join("state"))
+    ingest_config = IngestFile(file_name=input_file, state_directory=state_directory, retention="60s")
+
+    write_prometheus_file(input_file, [
+        {"metric": {"__name__": "a", "job": "x"}, "values": [[10, "1"], [20, "2"], [30, "3"]]},
+        {"metric": {"__name__": "b", "job": "x"}, "values": [[10, "4"]]}])
+    signals = ingest(ingest_config)
+    assert [signal.time_series for signal in signals] == [time_series_type1, [[10, "4"]]]
+
+    # the next dump overlaps the previous one, only the newer samples are added
+    write_prometheus_file(input_file, [
+        {"metric": {"__name__": "c", "job": "x"}, "values": [[80, "9"]]},
+        {"metric": {"__name__": "a", "job": "x"}, "values": [[20, "7"], [30, "7"], [40, "4"], [50, "5"]]}])
+    signals = ingest(ingest_config)
+    assert [signal.metadata["__name__"] for signal in signals] == ["a", "c"]
+    assert signals[0].time_series == [[20, "2"], [30, "3"], [40, "4"], [50, "5"]]
+    assert signals[0].metadata["signature_info"]["first_time"] == 20
+    assert signals[0].metadata["signature_info"]["num_of_items"] == 4
+    assert signals[1].time_series == [[80, "9"]]
+    assert len(signals.metadata["metrics_metadata"]) == 2
+
+    # the retained signals survive across runs, `b` fell out of the retention window
+    signals = ingest(ingest_config)
+    assert [signal.metadata["__name__"] for signal in signals] == ["a", "c"]
+    assert signals[0].time_series == [[20, "2"], [30, "3"], [40, "4"], [50, "5"]]
@@ -12,10 +12,17 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import json
 import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
 from common.configuration_api import IngestPromql
 
+import numpy as np
+import pytest
 import requests_mock
 
 
@@ -40,3 +47,211 @@ def test_ingest():
     assert signals[0].time_series == [[500, "7"]]
     assert signals[1].type == "metric"
     assert signals[1].time_series == [[500, "7"]]
+
+
+class StubPrometheusHandler(BaseHTTPRequestHandler):
+    # metric name -> number of requests that fail with 503 before answering
+    failures = {}
+    # parameters of the data queries received
+    requests = []
+    # metric name -> delay (in seconds) before answering, to shuffle the completion order
+    delays = {}
+    metrics = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/api/v1/label/__name__/values":
+            self.reply(200, {"status": "success", "data": self.metrics})
+            return
+        if url.path == "/api/v1/labels":
+            self.reply(200, {"status": "success", "data": ["__name__", "instance"]})
+            return
+        if url.path == "/api/v1/series":
+            self.requests.append({key: values[0] for key, values in parse_qs(url.query).items()})
+            series = [{"__name__": metric, "instance": f"host{i}"} for metric in self.metrics for i in range(2)]
+            self.reply(200, {"status": "success", "data": series})
+            return
+        if url.path not in ("/api/v1/query", "/api/v1/query_range"):
+            self.reply(404, {"status": "error"})
+            return
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        metric = params["query"].split("[")[0]
+        self.requests.append(params)
+        with lock:
+            if self.failures.get(metric, 0) > 0:
+                self.failures[metric] -= 1
+                self.reply(503, {"status": "error"})
+                return
+        time.sleep(self.delays.get(metric, 0))
+        index = self.metrics.index(metric)
+        if url.path == "/api/v1/query_range":
+            # points of the step grid, both ends included
+            start, end, step = float(params["start"]), float(params["end"]), float(params["step"])
+            values = [[t, str(index)] for t in np.arange(start, end + step / 2, step).tolist()]
+        elif "[" in params["query"]:
+            # raw samples every 60s in the range, both ends included
+            end = int(float(params["time"]))
+            start = end - int(params["query"].split("[")[1].rstrip("s]"))
+            values = [[t, str(index)] for t in range(-(-start // 60) * 60, end + 1, 60)]
+        else:
+            values = [[500, str(index)]]
+        result = [{"metric": {"__name__": metric, "instance": f"host{i}"}, "values": values} for i in range(2)]
+        self.reply(200, {"status": "success", "data": {"resultType": "matrix", "result": result}})
+
+    def reply(self, status, body):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+lock = threading.Lock()
+
+
+@pytest.fixture
+def stub_prometheus():
+    StubPrometheusHandler.metrics = [f"metric{i}" for i in range(20)]
+    StubPrometheusHandler.failures = {"metric3": 2, "metric7": 1}
+    StubPrometheusHandler.delays = {"metric0": 0.2, "metric1": 0.1}
+    StubPrometheusHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPrometheusHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("concurrency", [1, 8])
+def test_ingest_stub_server(stub_prometheus, concurrency):
+    from ingest.promql_ingest import ingest
+    ingest_config = IngestPromql(url=stub_prometheus, ingest_window="10m", concurrency=concurrency,
+                                 retry_backoff=0.01)
+    signals = ingest(ingest_config)
+
+    assert len(signals) == 40
+    # signals are in the order of the metric names whatever the order of the responses
+    assert [signal.metadata["__name__"] for signal in signals] == \
+        [f"metric{i}" for i in range(20) for _ in range(2)]
+    assert [signal.metadata["instance"] for signal in signals[:2]] == ["host0", "host1"]
+    assert all(signal.time_series[-1][1] == str(i // 2) for i, signal in enumerate(signals))
+    assert signals[6].metadata["instance"] == "host0"
+
+
+def test_ingest_stub_server_retries_exhausted(stub_prometheus):
+    from ingest.promql_ingest import ingest
+    StubPrometheusHandler.failures = {"metric5": 10}
+    ingest_config = IngestPromql(url=stub_prometheus, ingest_window="10m", concurrency=4,
+                                 retries=2, retry_backoff=0.01)
+    with pytest.raises(RuntimeError, match="503"):
+        ingest(ingest_config)
+    # the initial request and the 2 retries
+    assert StubPrometheusHandler.failures["metric5"] == 7
+
+
+def test_fetch_range_data_bounded(stub_prometheus):
+    from concurrent.futures import ThreadPoolExecutor
+    from ingest.promql_ingest import create_session, fetch_range_data
+    StubPrometheusHandler.failures = {}
+    StubPrometheusHandler.delays = {}
+    ingest_config = IngestPromql(url=stub_prometheus, ingest_window="10m", concurrency=2)
+    chunks = [(0, 300), (300, 600)]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = fetch_range_data(create_session(2), executor, ingest_config, StubPrometheusHandler.metrics,
+                                   chunks, 60)
+        assert next(results)[0] == "metric0"
+        time.sleep(0.5)
+        # the requests of the next `concurrency` metrics only, not of all the metrics
+        assert len(StubPrometheusHandler.requests) == 3 * len(chunks)
+        # the other metrics are still yielded in order
+        assert [metric for metric, _ in results] == StubPrometheusHandler.metrics[1:]
+    assert len(StubPrometheusHandler.requests) == 20 * len(chunks)
+
+
+def test_split_window():
+    from common.utils import parse_duration
+    from ingest.promql_ingest import split_window
+    assert parse_duration("1h30m") == 5400
+    assert parse_duration("300") == 300
+    with pytest.raises(ValueError):
+        parse_duration("5 minutes")
+
+    assert split_window(0, 1000, 0, 0) == [(0, 1000)]
+    # raw chunks share their boundaries
+    assert split_window(0, 1000, 400, 0) == [(0, 400), (400, 800), (800, 1000)]
+    # step chunks stay on the step grid and do not overlap
+    assert split_window(0, 1000, 450, 100) == [(0, 400), (500, 900), (1000, 1000)]
+    # chunks are capped to the maximum number of points of a query
+    assert len(split_window(0, 30 * 86400, 0, 60)) == 4
+
+
+@pytest.mark.parametrize("step, chunk_size, spacing", [("", "200s", 60), ("30s", "2m", 30), ("1m", "", 60)])
+def test_ingest_stub_server_chunks(stub_prometheus, step, chunk_size, spacing):
+    from ingest.promql_ingest import ingest
+    StubPrometheusHandler.failures = {}
+    StubPrometheusHandler.delays = {}
+    ingest_config = IngestPromql(url=stub_prometheus, ingest_window="10m", concurrency=4,
+                                 step=step, chunk_size=chunk_size)
+    signals = ingest(ingest_config)
+
+    assert len(signals) == 40
+    number_of_chunks = len(StubPrometheusHandler.requests) // 20
+    assert number_of_chunks == (1 if chunk_size == "" else 3 if step == "" else 5)
+    for i, signal in enumerate(signals):
+        # the chunks are stitched into a single series, without repeated samples
+        assert signal.metadata["instance"] == f"host{i % 2}"
+        assert np.all(np.diff(signal.timestamps) == spacing)
+        assert len(signal.timestamps) >= 600 // spacing
+        assert np.all(signal.values == i // 2)
+
+
+def test_ingest_stub_server_incremental(stub_prometheus, tmpdir):
+    from ingest.promql_ingest import ingest
+    StubPrometheusHandler.failures = {}
+    StubPrometheusHandler.delays = {}
+    ingest_config = IngestPromql(url=stub_prometheus, ingest_window="10m", concurrency=4,
+                                 state_directory=str(tmpdir.join("state")))
+    signals = ingest(ingest_config)
+    time_series = [signal.time_series for signal in signals]
+    assert len(signals) == 40
+
+    # the second ingest only queries the time elapsed since the first one and keeps the retained samples
+    StubPrometheusHandler.requests = []
+    signals = ingest(ingest_config)
+    assert len(StubPrometheusHandler.requests) <= 20
+    assert all(int(params["query"].split("[")[1].rstrip("s]")) <= 5 for params in StubPrometheusHandler.requests)
+    assert len(signals) == 40
+    assert [signal.time_series[:len(series)] for signal, series in zip(signals, time_series)] == time_series
+
+
+def test_ingest_series_lazy_samples(stub_prometheus):
+    import pickle
+    from ingest.promql_series_ingest import ingest
+    from common.configuration_api import IngestPromqlSeries
+    StubPrometheusHandler.failures = {}
+    StubPrometheusHandler.delays = {}
+    ingest_config = IngestPromqlSeries(url=stub_prometheus, ingest_window="10m", concurrency=4,
+                                       ingest_name_template="renamed_$original_name")
+    signals = ingest(ingest_config)
+
+    # labels only, no sample was downloaded
+    assert len(signals) == 40
+    assert [params.get("match[]") for params in StubPrometheusHandler.requests] == ['{__name__=~".+"}']
+    assert signals.metadata["label_names"] == ["__name__", "instance"]
+    assert signals[2].metadata["__name__"] == "renamed_metric1"
+    assert len(signals[2].timestamps) == 0
+
+    # samples are fetched only for the metrics of the signals left after filtering (e.g. in a map_reduce worker)
+    StubPrometheusHandler.requests = []
+    filtered = pickle.loads(pickle.dumps(signals.filter_by_names(["renamed_metric3", "renamed_metric12"])))
+    filtered.load_samples()
+    assert sorted(params["query"].split("[")[0] for params in StubPrometheusHandler.requests) == \
+        ["metric12", "metric3"]
+    assert [signal.metadata["instance"] for signal in filtered] == ["host0", "host1", "host0", "host1"]
+    assert [signal.time_series[-1][1] for signal in filtered] == ["3", "3", "12", "12"]
+    assert np.all(np.diff(filtered[0].timestamps) == 60)
@@ -0,0 +1,143 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+from analysis.analyze_compound_correlations import CandidateRegressions, CompoundCorrelationAnalyzer, ols_pvalues
+
+FEATURES = CompoundCorrelationAnalyzer.required_features
+
+
+@pytest.fixture(autouse=True)
+def ignore_statsmodels_warnings():
+    # the summaries of the statsmodels fits warn about their normality tests on 6 observations
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+def series_features(number_of_signals, seed):
+    # the features of random series (value_PeakToPeakDistance is value_Max - value_Min)
+    random = np.random.default_rng(seed)
+    features = []
+    for _ in range(number_of_signals):
+        values = random.normal(random.normal(scale=5), random.uniform(0.1, 2), size=random.integers(5, 60))
+        features.append([values.min(), values.max(), values.mean(), values.var(), np.ptp(values),
+                         (values * values).sum()])
+    return np.array(features).T
+
+
+def combined_features(number_of_signals, seed):
+    # random features, the third signal a linear combination of the first two
+    features = np.random.default_rng(seed).normal(size=(len(FEATURES), number_of_signals))
+    features[:, 2] = features[:, 0] + 2 * features[:, 1]
+    return features
+
+
+def features_matrix(features):
+    return pd.DataFrame(features, index=FEATURES, columns=[f"signal_{index}" for index in range(features.shape[1])])
+
+
+@pytest.mark.parametrize("make_features", [series_features, combined_features])
+@pytest.mark.parametrize("number_of_signals", [3, 4, 5, 6, 12])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_batched_matches_statsmodels(make_features, number_of_signals, seed):
+    signals_features_matrix = features_matrix(make_features(number_of_signals, seed))
+    expected, expected_predictors = CompoundCorrelationAnalyzer.statsmodels_regressions(signals_features_matrix,
+                                                                                        0.01)
+    dependent_signals, predictors = CompoundCorrelationAnalyzer.batched_regressions(signals_features_matrix, 0.01)
+    assert dependent_signals == expected
+    for name in expected:
+        assert predictors(name) == expected_predictors(name)
+
+
+def test_batched_dependent_signals():
+    # the design of 5 signals spans 5 of the 6 observations, the 3 combined signals are fitted exactly
+    dependent_signals, predictors = CompoundCorrelationAnalyzer.batched_regressions(
+        features_matrix(combined_features(5, 0)), 0.01)
+    assert dependent_signals[:3] == ["signal_0", "signal_1", "signal_2"]
+    assert predictors("signal_2") == ["signal_0", "signal_1"]
+
+
+def test_ols_pvalues():
+    random = np.random.default_rng(0)
+    designs = np.concatenate([np.ones((4, 6, 1)), random.normal(size=(4, 6, 3))], axis=2)
+    # a rank deficient design (minimum norm solution)
+    designs[3, :, 3] = designs[3, :, 1]
+    responses = random.normal(size=(4, 6))
+    pvalues = ols_pvalues(designs, responses)
+    for design, response, expected in zip(designs, responses, pvalues):
+        np.testing.assert_allclose(expected, sm.OLS(response, design).fit().pvalues, rtol=1e-6)
+
+    # a design without residual degrees of freedom
+    design = np.column_stack([np.ones(6), random.normal(size=(6, 5))])
+    assert np.isnan(ols_pvalues(design, random.normal(size=6))).all()
+
+
+@pytest.mark.parametrize("top_k", [1, 3])
+def test_candidate_regressions(top_k):
+    features = series_features(40, 1)
+    features[:, 7] = 1.0
+    regressions = CandidateRegressions(features, top_k, 0.01)
+    correlations = np.abs(np.corrcoef(features.T))
+    dependent = 0
+    for column in range(features.shape[1]):
+        candidates = regressions.candidates[column]
+        if column == 7:
+            # a constant signal has no correlated candidates
+            assert (candidates == -1).all()
+            assert len(regressions.predictors(column, 0.01)) == 0
+            continue
+        others = np.delete(np.arange(features.shape[1]), [column, 7])
+        expected_candidates = others[np.argsort(-correlations[column, others], kind="stable")[:top_k]]
+        assert sorted(candidates.tolist()) == sorted(expected_candidates.tolist())
+
+        design = sm.add_constant(features[:, candidates], has_constant='add')
+        pvalues = sm.OLS(features[:, column], design).fit().pvalues[1:]
+        expected = np.sort(candidates[pvalues < 0.01])
+        np.testing.assert_array_equal(regressions.predictors(column, 0.01), expected)
+        dependent += len(expected) > 0
+    assert dependent
+    assert regressions.significant(0.01).sum() == dependent
+
+
+def test_analyze(make_feature_signals):
+    def analyzer(features):
+        return CompoundCorrelationAnalyzer(make_feature_signals(features.T, FEATURES))
+
+    features = combined_features(5, 0)
+    expected_signals, expected_insights = analyzer(features).analyze(compound_similarity_threshold=0.99)
+    signals, insights = analyzer(features).analyze(compound_similarity_threshold=0.99, compound_engine="batched")
+    assert insights == expected_insights
+    reduced = [signal.metadata["__name__"] for signal in signals.filter_by_tags(["compound_correlations"])]
+    assert reduced == ["signal_0"]
+    assert reduced == [signal.metadata["__name__"]
+                       for signal in expected_signals.filter_by_tags(["compound_correlations"])]
+
+    # with the top-k candidates, the fits on many signals keep residual degrees of freedom
+    features = series_features(60, 1)
+    signals, insights = analyzer(features).analyze(compound_similarity_threshold=0.99, compound_engine="batched",
+                                                   compound_top_k=2)
+    reduced = signals.filter_by_tags(["compound_correlations"])
+    assert reduced
+    assert "it is constructed from" in insights
+    with pytest.raises(ValueError, match="compound_top_k requires compound_engine: batched"):
+        analyzer(features).analyze(compound_similarity_threshold=0.99, compound_top_k=2)
+
+    with pytest.raises(ValueError, match="unsupported compound correlation engine"):
+        analyzer(features).analyze(compound_similarity_threshold=0.99, compound_engine="gradient_descent")
@@ -0,0 +1,54 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import numpy as np
+from common.configuration_api import FeatureExtractionStatistical
+from common.signal import Signal, Signals
+from common.signal_store import SignalStore
+from extract.feature_extraction_statistical import extract
+from insights.insights import generate_insights
+
+
+def build_extracted_signals():
+    random = np.random.default_rng(0)
+    signals = Signals(metadata={}, store=SignalStore())
+    timestamps = 1700000000 + 30 * np.arange(60, dtype=np.float64)
+    base = random.normal(size=60)
+    samples = {"zero": np.zeros(60), "fixed": np.full(60, 7.0), "base": base, "scaled": 2 * base + 1,
+               "counter": np.cumsum(random.uniform(size=60))}
+    for index in range(6):
+        samples[f"random_{index}"] = random.normal(loc=index, scale=index + 1, size=60)
+    for name, values in samples.items():
+        signals.append_time_series("metric", {"__name__": name}, timestamps, values)
+    return extract(FeatureExtractionStatistical(), signals)
+
+
+def legacy_signals(signals):
+    # the same signals with their features as per signal DataFrames (as extracted before the feature store)
+    legacy = Signals(metadata={})
+    for signal in signals:
+        metadata = {key: value for key, value in signal.metadata.items() if key != "tags"}
+        metadata["extracted_features"] = signal.extracted_features.copy()
+        legacy.append(Signal(signal.type, metadata, signal.time_series))
+    return legacy
+
+
+def test_insights_from_features_matrix():
+    signals = build_extracted_signals()
+    expected = generate_insights(None, {}, [legacy_signals(signals)])
+    signals_to_keep, signals_to_reduce, insights = generate_insights(None, {}, [signals])
+
+    assert (signals_to_keep, signals_to_reduce, insights) == tuple(expected)
+    assert {"zero", "fixed"} <= set(signals_to_reduce)
+    assert "base" in signals_to_keep
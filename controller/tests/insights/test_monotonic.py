@@ -0,0 +1,103 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import numpy as np
+import pytest
+from analysis.analyze_monotonic import MonotonicAnalyzer
+from common.configuration_api import FeatureExtractionStatistical
+from common.signal import Signal, Signals
+from common.signal_store import SignalStore, segment_changes
+from extract.feature_extraction_statistical import extract
+from insights.insights import generate_insights
+
+
+def test_segment_changes():
+    segments = [[1.0, 2.0, 2.0, 3.0], [3.0, 1.0, np.nan, 0.0, 4.0], [], [5.0], [np.nan, np.nan], [2.0, 1.0],
+                [10.0, 0.5, 3.0]]
+    offsets = np.cumsum([0] + [len(segment) for segment in segments])
+    increases, decreases, resets = segment_changes(np.array([value for segment in segments for value in segment]),
+                                                   offsets)
+    # the NaN values are skipped, the changes between segments are not counted
+    assert increases.tolist() == [2, 1, 0, 0, 0, 0, 1]
+    assert decreases.tolist() == [0, 2, 0, 0, 0, 1, 1]
+    # decreases to a value smaller than the decrease (counter resets)
+    assert resets.tolist() == [0, 2, 0, 0, 0, 0, 1]
+
+
+def build_signals():
+    random = np.random.default_rng(0)
+    signals = Signals(metadata={}, store=SignalStore())
+    timestamps = 1700000000 + 30 * np.arange(60, dtype=np.float64)
+    counter = np.cumsum(random.uniform(size=60))
+    samples = {"counter": counter, "gauge_down": -counter, "fixed": np.full(60, 7.0),
+               "reset_counter": np.concatenate([counter[:30], counter[:30]]),
+               # a gauge decreasing once, not towards zero (not a counter reset)
+               "gauge_dip": np.concatenate([counter[:30], counter[30:] - 1.2 * (counter[30] - counter[29])]),
+               "random": random.normal(size=60)}
+    for name, values in samples.items():
+        signals.append_time_series("metric", {"__name__": name}, timestamps, values)
+    return signals
+
+
+def monotonic_names(signals):
+    return [signal.metadata["__name__"] for signal in signals.filter_by_tags(["monotonic"])]
+
+
+@pytest.mark.parametrize("counter_resets, expected", [(0, ["counter", "gauge_down", "fixed"]),
+                                                      (1, ["counter", "gauge_down", "fixed", "reset_counter"])])
+def test_analyze(counter_resets, expected):
+    signals, insights = MonotonicAnalyzer(build_signals()).analyze(monotonic_counter_resets=counter_resets)
+    assert monotonic_names(signals) == expected
+    assert insights.count("Signal is monotonic") == len(expected)
+
+
+def test_analyze_string_values():
+    # samples from Prometheus JSON are strings, they are compared as numbers
+    signals = Signals(metadata={})
+    signals.append(Signal("metric", {"__name__": "counter"}, [[0, "9"], [30, "10"], [60, "11"]]))
+    signals.append(Signal("metric", {"__name__": "random"}, [[0, "9"], [30, "10"], [60, "8"]]))
+    # a name is monotonic if any of its signals is monotonic
+    signals.append(Signal("metric", {"__name__": "random"}, [[0, "1"], [30, "1"]]))
+    signals, insights = MonotonicAnalyzer(signals).analyze()
+    assert monotonic_names(signals) == ["counter", "random", "random"]
+    assert insights.count("Signal is monotonic") == 2
+
+
+def test_analyze_trimmed():
+    expected, _ = MonotonicAnalyzer(build_signals()).analyze(monotonic_counter_resets=1)
+    # the samples are discarded by the extract, the changes of the signals are kept in their metadata
+    trimmed = extract(FeatureExtractionStatistical(trim=True), build_signals())
+    assert all(len(signal.values) == 0 for signal in trimmed)
+    signals, _ = MonotonicAnalyzer(trimmed).analyze(monotonic_counter_resets=1)
+    assert monotonic_names(signals) == monotonic_names(expected)
+
+    # a second trim keeps the changes counted by the first one
+    changes = [signal.metadata["monotonic_changes"] for signal in trimmed]
+    trimmed = extract(FeatureExtractionStatistical(trim=True), trimmed)
+    assert [signal.metadata["monotonic_changes"] for signal in trimmed] == changes
+    signals, _ = MonotonicAnalyzer(trimmed).analyze(monotonic_counter_resets=1)
+    assert monotonic_names(signals) == monotonic_names(expected)
+
+    # the changes are kept in a copy of the metadata of the untrimmed signals
+    signals = build_signals()
+    trimmed = extract(FeatureExtractionStatistical(trim=True), signals)
+    assert "monotonic_changes" in trimmed[0].metadata and "monotonic_changes" not in signals[0].metadata
+
+    # monotonic signals are kept (their measurement frequency may be reduced)
+    signals_to_keep, signals_to_reduce, insights = generate_insights(
+        None, {"analysis_chain": [{"type": "monotonic", "monotonic_counter_resets": 1}]},
+        [extract(FeatureExtractionStatistical(trim=True), build_signals())])
+    assert signals_to_keep == ["counter", "gauge_down", "fixed", "reset_counter", "gauge_dip", "random"]
+    assert signals_to_reduce == []
+    assert insights[0].count("Signal is monotonic") == 4
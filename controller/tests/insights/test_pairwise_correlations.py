@@ -0,0 +1,282 @@
+#  Copyright 2024 IBM, Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.analyze_pairwise_correlations import (PairwiseCorrelationAnalyzer, approximate_correlations,
+                                                    blocked_correlations, correlated_pairs, first_correlated,
+                                                    redundancy_clusters)
+from common.signal import Signals
+from extract.trim_time_series import extract as trim
+from scipy.spatial.distance import pdist, squareform
+
+
+def legacy_reduction(corr_matrix, threshold, distance):
+    # the reduction pass before it was vectorized: the upper triangle of the matrix scanned with `upper.loc`
+    upper = corr_matrix.where(np.triu(np.ones(corr_matrix.shape), k=1).astype(bool))
+    signals_to_reduce = []
+    for column in upper.columns:
+        for index in upper.index:
+            if (upper.loc[index, column] <= threshold) if distance else (upper.loc[index, column] > threshold):
+                signals_to_reduce.append({"signal": column, "correlated_signals": index})
+                break
+    return signals_to_reduce
+
+
+def make_features(number_of_signals=120, number_of_features=12):
+    # clusters of signals with almost the same features, and signals with constant features (NaN correlations)
+    random = np.random.default_rng(0)
+    centers = random.normal(size=(number_of_signals // 6, number_of_features))
+    features = centers[random.integers(len(centers), size=number_of_signals)]
+    features = features + random.normal(scale=0.05, size=features.shape)
+    features[::17] = 1.0
+    return features
+
+
+def corr_matrix_of(features, method, distance_method="euclidean"):
+    names = [f"signal_{index}" for index in range(len(features))]
+    if method == "distance":
+        return pd.DataFrame(squareform(pdist(features, metric=distance_method)), index=names, columns=names)
+    return pd.DataFrame(features.T, columns=names).corr(method=method)
+
+
+@pytest.mark.parametrize("method, threshold", [("pearson", 0.95), ("pearson", 0.5), ("spearman", 0.9),
+                                               ("kendall", 0.8), ("distance", 0.3), ("distance", 2.0)])
+@pytest.mark.parametrize("block_size", [1024, 7])
+def test_first_correlated_matches_legacy(method, threshold, block_size):
+    corr_matrix = corr_matrix_of(make_features(), method)
+    first = first_correlated(corr_matrix.to_numpy(), threshold, distance=method == "distance",
+                             block_size=block_size)
+    names = list(corr_matrix.columns)
+    signals_to_reduce = [{"signal": names[column], "correlated_signals": names[index]}
+                         for column, index in enumerate(first.tolist()) if index >= 0]
+
+    expected = legacy_reduction(corr_matrix, threshold, method == "distance")
+    assert expected
+    assert signals_to_reduce == expected
+
+
+def test_analyze(make_feature_signals):
+    features = make_features(40)
+    signals = make_feature_signals(features)
+    analyzed_signals, _ = PairwiseCorrelationAnalyzer(signals).analyze(
+        pairwise_similarity_threshold=0.95, pairwise_similarity_method="pearson",
+        pairwise_similarity_distance_method="")
+    expected = legacy_reduction(corr_matrix_of(features, "pearson"), 0.95, False)
+    assert expected
+    reduced = analyzed_signals.filter_by_tags(["pairwise_correlations"], filter_in=True)
+    assert [signal.metadata["__name__"] for signal in reduced] == [signal["signal"] for signal in expected]
+
+    # a single signal is kept
+    single = Signals(metadata={}, signals=[signals.signals[0]])
+    _, insights = PairwiseCorrelationAnalyzer(single).analyze(
+        pairwise_similarity_threshold=0.95, pairwise_similarity_method="pearson",
+        pairwise_similarity_distance_method="")
+    assert "it is highly correlated" not in insights
+
+
+@pytest.mark.parametrize("method, threshold", [("pearson", 0.95), ("spearman", 0.9), ("distance", 0.3)])
+@pytest.mark.parametrize("block_size", [2048, 16, 7])
+def test_blocked_correlations(method, threshold, block_size):
+    features = make_features()
+    corr_matrix = corr_matrix_of(features, method).to_numpy()
+    distance = method == "distance"
+    first, (rows, columns, values), (top_indexes, top_values) = blocked_correlations(
+        features, threshold, method, "euclidean", block_size=block_size, top_k=5)
+
+    np.testing.assert_array_equal(first, first_correlated(corr_matrix, threshold, distance))
+    # the edges are the pairs of the upper triangle over the threshold
+    upper = np.triu(np.ones(corr_matrix.shape, dtype=bool), 1)
+    hits = (corr_matrix <= threshold if distance else corr_matrix > threshold) & upper
+    expected_rows, expected_columns = np.nonzero(hits)
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_array_equal(columns, expected_columns)
+    np.testing.assert_allclose(values, corr_matrix[hits], rtol=1e-9)
+    # the top-k neighbors of each signal (the signal itself and NaN correlations excluded)
+    for index in range(len(features)):
+        column = corr_matrix[:, index].copy()
+        column[index] = np.nan
+        valid = np.flatnonzero(~np.isnan(column))
+        expected_values = np.sort(column[valid])[:5] if distance else -np.sort(-column[valid])[:5]
+        np.testing.assert_allclose(top_values[index][:len(expected_values)], expected_values, rtol=1e-9)
+        assert (top_indexes[index][len(expected_values):] == -1).all()
+        np.testing.assert_allclose(column[top_indexes[index][:len(expected_values)]], expected_values, rtol=1e-9)
+
+
+def test_analyze_blocked(make_feature_signals):
+    features = make_features(40)
+    dense_signals, dense_insights = PairwiseCorrelationAnalyzer(make_feature_signals(features)).analyze(
+        pairwise_similarity_threshold=0.95, pairwise_similarity_method="pearson",
+        pairwise_similarity_distance_method="")
+    signals, insights = PairwiseCorrelationAnalyzer(make_feature_signals(features)).analyze(
+        pairwise_similarity_threshold=0.95, pairwise_similarity_method="pearson",
+        pairwise_similarity_distance_method="", pairwise_correlation_mode="blocked", pairwise_block_size=8,
+        pairwise_top_k=3)
+
+    assert insights == dense_insights
+    assert "corr_matrix" not in signals.metadata
+    edges = signals.metadata["corr_edges"]
+    corr_matrix = dense_signals.metadata["corr_matrix"]
+    assert len(edges) == int((np.triu(corr_matrix.to_numpy(), 1) > 0.95).sum())
+    for edge in edges.itertuples():
+        assert edge.value == pytest.approx(corr_matrix.loc[edge.signal, edge.correlated_signal])
+    neighbors = signals[1].metadata["corr_signals"]
+    assert len(neighbors) == 3
+    expected = dense_signals[1].metadata["corr_signals"].drop("signal_1").sort_values(ascending=False)[:3]
+    assert [name for name, _ in neighbors] == list(expected.index)
+
+    # options forwarded unset (None) use their defaults
+    for mode, top_k in (("blocked", [10]), ("approximate", range(1, 11))):
+        signals, _ = PairwiseCorrelationAnalyzer(make_feature_signals(features)).analyze(
+            pairwise_similarity_threshold=0.95, pairwise_similarity_method="pearson",
+            pairwise_similarity_distance_method="", pairwise_correlation_mode=mode, pairwise_block_size=None,
+            pairwise_top_k=None, pairwise_lsh_tables=None, pairwise_lsh_bits=None)
+        assert len(signals[1].metadata["corr_signals"]) in top_k
+
+    with pytest.raises(ValueError, match="kendall"):
+        PairwiseCorrelationAnalyzer(make_feature_signals(features)).analyze(
+            pairwise_similarity_threshold=0.95, pairwise_similarity_method="kendall",
+            pairwise_similarity_distance_method="", pairwise_correlation_mode="blocked")
+
+
+@pytest.mark.parametrize("method, threshold", [("pearson", 0.95), ("pearson", 0.5), ("spearman", 0.9)])
+def test_approximate_correlations(method, threshold):
+    features = make_features()
+    exact_first, (exact_rows, exact_columns, _), _ = blocked_correlations(features, threshold, method)
+    exact_pairs = set(zip(exact_rows.tolist(), exact_columns.tolist()))
+
+    # enough tables of few bits: every correlated pair shares a bucket
+    first, (rows, columns, values), (top_indexes, top_values) = approximate_correlations(
+        features, threshold, method, tables=32, bits=4, block_size=7, top_k=5)
+    np.testing.assert_array_equal(first, exact_first)
+    assert set(zip(rows.tolist(), columns.tolist())) == exact_pairs
+    assert (np.diff(rows * len(features) + columns) > 0).all()
+    corr_matrix = corr_matrix_of(features, method).to_numpy()
+    np.testing.assert_allclose(values, corr_matrix[rows, columns], rtol=1e-9)
+    for index in range(len(features)):
+        column = corr_matrix[:, index].copy()
+        column[index] = np.nan
+        expected_values = -np.sort(-column[column > threshold])[:5]
+        np.testing.assert_allclose(top_values[index][:len(expected_values)], expected_values, rtol=1e-9)
+        assert (top_indexes[index][len(expected_values):] == -1).all()
+
+    # few tables of many bits: only correlated pairs are found, and signals are reduced only by signals before them
+    first, (rows, columns, values), _ = approximate_correlations(features, threshold, method, tables=1, bits=16)
+    assert set(zip(rows.tolist(), columns.tolist())) < exact_pairs
+    assert ((first < 0) | ((first < np.arange(len(features))) & (exact_first >= 0))).all()
+
+
+def test_analyze_approximate(make_feature_signals):
+    features = make_features(40)
+    blocked_signals, blocked_insights = PairwiseCorrelationAnalyzer(make_feature_signals(features)).analyze(
+        pairwise_similarity_threshold=0.95, pairwise_similarity_method="pearson",
+        pairwise_similarity_distance_method="", pairwise_correlation_mode="blocked")
+    signals, insights = PairwiseCorrelationAnalyzer(make_feature_signals(features)).analyze(
+        pairwise_similarity_threshold=0.95, pairwise_similarity_method="pearson",
+        pairwise_similarity_distance_method="", pairwise_correlation_mode="approximate", pairwise_lsh_tables=32,
+        pairwise_lsh_bits=4)
+    assert insights == blocked_insights
+    pd.testing.assert_frame_equal(signals.metadata["corr_edges"], blocked_signals.metadata["corr_edges"])
+
+    for method in ["kendall", "distance"]:
+        with pytest.raises(ValueError, match=method):
+            PairwiseCorrelationAnalyzer(make_feature_signals(features)).analyze(
+                pairwise_similarity_threshold=0.95, pairwise_similarity_method=method,
+                pairwise_similarity_distance_method="euclidean", pairwise_correlation_mode="approximate")
+
+
+@pytest.mark.parametrize("method, threshold", [("pearson", 0.95), ("distance", 0.3)])
+def test_correlated_pairs(method, threshold):
+    corr_matrix = corr_matrix_of(make_features(), method).to_numpy()
+    rows, columns = correlated_pairs(corr_matrix, threshold, distance=method == "distance", block_size=7)
+    hits = corr_matrix <= threshold if method == "distance" else corr_matrix > threshold
+    expected_rows, expected_columns = np.nonzero(np.triu(hits, 1))
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_array_equal(columns, expected_columns)
+
+
+def test_redundancy_clusters():
+    # 0 - 3 - 5 are chained, 1 - 4 are correlated, 2 and 6 are alone
+    rows, columns = np.array([0, 3, 1]), np.array([3, 5, 4])
+    labels, representatives = redundancy_clusters(7, rows, columns)
+    assert representatives.tolist() == [0, 1, 2, 0, 1, 0, 6]
+    assert len(set(labels.tolist())) == 4
+    # the clusters do not depend on the order of the edges
+    shuffled_labels, shuffled_representatives = redundancy_clusters(7, columns[::-1], rows[::-1])
+    assert shuffled_representatives.tolist() == representatives.tolist()
+    assert (shuffled_labels[:, None] == shuffled_labels).tolist() == (labels[:, None] == labels).tolist()
+    # the signal with the lowest priority represents its cluster, the first one on ties
+    _, representatives = redundancy_clusters(7, rows, columns, priority=np.array([2, 1, 0, 1, 1, 1, 0]))
+    assert representatives.tolist() == [3, 1, 2, 3, 1, 3, 6]
+
+
+def test_analyze_clusters(tmp_path, make_feature_signals):
+    features = make_features(40)
+    lengths = np.random.default_rng(1).integers(2, 50, size=len(features))
+    corr_matrix = corr_matrix_of(features, "pearson")
+    rows, columns = correlated_pairs(corr_matrix.to_numpy(), 0.95)
+    access_log_file = tmp_path / "access_log.json"
+    # the access log entries are matched by metric name: signal_1 is not accessed by the queries of signal_1x
+    entries = [f"rate(signal_{index}[5m])" for index in range(0, 40, 3)] * 2 + \
+        [f"signal_{index} > 0" for index in range(0, 40, 2)]
+    access_log_file.write_text(json.dumps(entries))
+    accesses = np.array([2 * (index % 3 == 0) + (index % 2 == 0) for index in range(40)])
+
+    for policy, priority in [("first", np.zeros(len(features))), ("fewest_samples", lengths),
+                             ("most_connected", -np.bincount(np.concatenate([rows, columns]), minlength=40)),
+                             ("most_accessed", -accesses)]:
+        _, expected_representatives = redundancy_clusters(len(features), rows, columns, np.array(priority))
+        expected = [f"signal_{index}" for index in range(40) if expected_representatives[index] != index]
+        assert expected
+        for mode in ["dense", "blocked"]:
+            signals, insights = PairwiseCorrelationAnalyzer(make_feature_signals(features, lengths=lengths)).analyze(
+                pairwise_similarity_threshold=0.95, pairwise_similarity_method="pearson",
+                pairwise_similarity_distance_method="", pairwise_correlation_mode=mode, pairwise_reduction="clusters",
+                pairwise_representative_policy=policy, access_log_file=str(access_log_file))
+            reduced = signals.filter_by_tags(["pairwise_correlations"], filter_in=True)
+            assert [signal.metadata["__name__"] for signal in reduced] == expected
+            clusters = signals.metadata["corr_clusters"]
+            assert sorted(name for members in clusters.values() for name in members) == sorted(expected)
+            for representative, members in clusters.items():
+                assert representative not in expected
+                assert f"{members[0]}</a> - it is highly correlated with" in insights
+                assert f"&apos;{representative}&apos;]);" in insights
+
+    # the samples trimmed by the extract: the number of samples is the number of ingested samples
+    for with_signature_info in [True, False]:
+        signals = make_feature_signals(features, lengths=lengths)
+        if with_signature_info:
+            for signal, length in zip(signals, lengths.tolist()):
+                signal.metadata["signature_info"] = {"num_of_items": length}
+        signals = trim(None, signals)
+        kwargs = dict(pairwise_similarity_threshold=0.95, pairwise_similarity_method="pearson",
+                      pairwise_similarity_distance_method="", pairwise_reduction="clusters",
+                      pairwise_representative_policy="fewest_samples")
+        if not with_signature_info:
+            with pytest.raises(ValueError, match="fewest_samples representative policy needs the number of samples"):
+                PairwiseCorrelationAnalyzer(signals).analyze(**kwargs)
+            continue
+        signals, _ = PairwiseCorrelationAnalyzer(signals).analyze(**kwargs)
+        _, expected_representatives = redundancy_clusters(len(features), rows, columns, lengths)
+        assert [signal.metadata["__name__"] for signal in signals.filter_by_tags(["pairwise_correlations"])] == \
+            [f"signal_{index}" for index in range(40) if expected_representatives[index] != index]
+
+    with pytest.raises(ValueError, match="access_log_file"):
+        PairwiseCorrelationAnalyzer(make_feature_signals(features)).analyze(
+            pairwise_similarity_threshold=0.95, pairwise_similarity_method="pearson",
+            pairwise_similarity_distance_method="", pairwise_reduction="clusters",
+            pairwise_representative_policy="most_accessed")
@@ -12,8 +12,9 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import pytest
 import yaml
-from common.conf import set_configuration
+from common.conf import get_configuration, set_configuration
 from workflow_orchestration.pipeline import Pipeline
 
 
@@ -219,3 +220,224 @@ def test_duplicate_stage():
         assert False
     except Exception:
         assert True
+
+
+config_prune_features = """
+pipeline:
+- name: ingest
+- name: extract
+  follows: [ingest]
+- name: insights
+  follows: [extract]
+- name: config_generator
+  follows: [extract, insights]
+parameters:
+- name: ingest
+  type: ingest
+  subtype: file
+  input_data: []
+  output_data: [signals]
+  config:
+    file_name: dummy_file.txt
+- name: extract
+  type: extract
+  subtype: tsfel
+  input_data: [signals]
+  output_data: [extracted_signals]
+  config:
+- name: insights
+  type: insights
+  subtype:
+  input_data: [extracted_signals]
+  output_data: [signals_to_keep, signals_to_reduce, text_insights]
+  config:
+    analysis_chain:
+    - type: zero_values
+    - type: fixed_values
+    - type: monotonic
+- name: config_generator
+  type: config_generator
+  subtype: pmf_processor
+  input_data: [extracted_signals, signals_to_keep, signals_to_reduce]
+  output_data: [r_value]
+"""
+
+
+def get_stage(pipeline, name):
+    return next(stage for stage in pipeline.stage_execution_order if stage.base_stage.name == name)
+
+
+def test_prune_features():
+    build_config(config_prune_features)
+    p = Pipeline()
+    p.build_pipeline()
+    assert get_stage(p, "extract").base_stage.config["features"] == ["value_Max", "value_Min", "value_Var"]
+    # the configuration is not modified: the insights of a reloaded configuration may read other features
+    assert get_configuration()["parameters"][1]["config"] is None
+
+    # opt-out
+    build_config(config_prune_features.replace("  output_data: [extracted_signals]\n  config:\n",
+                                               "  output_data: [extracted_signals]\n  config:\n"
+                                               "    prune_features: false\n"))
+    p = Pipeline()
+    p.build_pipeline()
+    assert "features" not in get_stage(p, "extract").base_stage.config
+
+    # the pairwise correlations are computed over all the features
+    build_config(config_prune_features.replace("    - type: monotonic\n", "    - type: pairwise_correlations\n"))
+    p = Pipeline()
+    p.build_pipeline()
+    assert "features" not in get_stage(p, "extract").base_stage.config
+
+    # the extracted features are also encoded
+    build_config(config_prune_features + """- name: encode
+  type: encode
+  subtype: columnar
+  input_data: [extracted_signals]
+  config:
+    directory: /tmp
+""")
+    p = Pipeline()
+    p.build_pipeline()
+    assert "features" not in get_stage(p, "extract").base_stage.config
+
+
+config_prune_features_classified = """
+pipeline:
+- name: ingest
+- name: extract
+  follows: [ingest]
+- name: metadata_classification
+  follows: [extract]
+- name: insights
+  follows: [metadata_classification]
+- name: config_generator
+  follows: [metadata_classification, insights]
+parameters:
+- name: ingest
+  type: ingest
+  subtype: file
+  input_data: []
+  output_data: [signals]
+  config:
+    file_name: dummy_file.txt
+- name: extract
+  type: extract
+  subtype: tsfel
+  input_data: [signals]
+  output_data: [extracted_signals]
+  config:
+- name: metadata_classification
+  type: metadata_classification
+  subtype: metadata_classification_regex
+  input_data: [extracted_signals]
+  output_data: [classified_signals]
+- name: insights
+  type: insights
+  subtype:
+  input_data: [classified_signals]
+  output_data: [signals_to_keep, signals_to_reduce, text_insights]
+  config:
+    analysis_chain:
+    - type: zero_values
+    - type: fixed_values
+- name: config_generator
+  type: config_generator
+  subtype: pmf_processor
+  input_data: [classified_signals, signals_to_keep, signals_to_reduce]
+  output_data: [r_value]
+"""
+
+
+def test_prune_features_pass_through():
+    # the classification passes the extracted signals (and their features) through to the insights stage
+    build_config(config_prune_features_classified)
+    p = Pipeline()
+    p.build_pipeline()
+    assert get_stage(p, "extract").base_stage.config["features"] == ["value_Max", "value_Min", "value_Var"]
+
+    # the classified signals are also encoded
+    build_config(config_prune_features_classified + """- name: encode
+  type: encode
+  subtype: columnar
+  input_data: [classified_signals]
+  config:
+    directory: /tmp
+""")
+    p = Pipeline()
+    p.build_pipeline()
+    assert "features" not in get_stage(p, "extract").base_stage.config
+
+    # the classified signals are not used by any stage
+    build_config(config_prune_features_classified.replace("input_data: [classified_signals",
+                                                          "input_data: [extracted_signals"))
+    p = Pipeline()
+    p.build_pipeline()
+    assert "features" not in get_stage(p, "extract").base_stage.config
+
+
+config_map_reduce_online = """
+pipeline:
+- name: ingest
+- name: extract
+  follows: [ingest]
+parameters:
+- name: ingest
+  type: ingest
+  subtype: file
+  input_data: []
+  output_data: [signals]
+  config:
+    file_name: dummy_file.txt
+- name: extract
+  type: map_reduce
+  input_data: [signals]
+  output_data: [extracted_signals]
+  config:
+    map_function:
+      name: map
+      type: map
+      subtype: simple
+      config:
+        number: 2
+    compute_function:
+      name: extract_in_parallel
+      type: extract
+      subtype: online
+      config:
+        state_directory: /tmp/online_features
+    reduce_function:
+      name: reduce
+      type: reduce
+      subtype: simple
+"""
+
+
+def test_map_reduce_online_state():
+    # the workers of the partitions would overwrite each other's accumulators
+    build_config(config_map_reduce_online)
+    with pytest.raises(Exception, match="can not keep a state_directory in map_reduce"):
+        Pipeline().build_pipeline()
+
+    build_config(config_map_reduce_online.replace("        state_directory: /tmp/online_features\n", ""))
+    Pipeline().build_pipeline()
+
+
+def test_prune_features_map_reduce():
+    config = config_map_reduce_online.replace("state_directory: /tmp/online_features", "trim: true")
+    config = config.replace("- name: extract\n  follows: [ingest]\n",
+                            "- name: extract\n  follows: [ingest]\n- name: insights\n  follows: [extract]\n")
+    build_config(config + """- name: insights
+  type: insights
+  input_data: [extracted_signals]
+  output_data: [signals_to_keep, signals_to_reduce, text_insights]
+  config:
+    analysis_chain:
+    - type: zero_values
+""")
+    p = Pipeline()
+    p.build_pipeline()
+    compute_function = get_stage(p, "extract").base_stage.config["compute_function"]
+    assert compute_function["config"]["features"] == ["value_Max", "value_Min"]
+    assert compute_function["config"]["trim"] is True
+    assert get_configuration()["parameters"][1]["config"]["compute_function"]["config"] == {"trim": True}
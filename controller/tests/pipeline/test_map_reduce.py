@@ -13,9 +13,12 @@
 #  limitations under the License.
 
 
+import numpy as np
 import yaml
 from common.conf import set_configuration
-from workflow_orchestration.pipeline import Pipeline
+from common.signal import Signals
+from common.signal_store import SignalStore
+from workflow_orchestration.pipeline import Pipeline, run_stage
 
 
 def build_config(yaml_string):
@@ -124,3 +127,40 @@ def test_bad_map_reduce():
         p.build_pipeline()
     except Exception as e:
         raise e
+
+
+class RecordingSampleLoader:
+    # stands for the `promql_series` sample loader, records the signals it loads the samples of
+    def __init__(self):
+        self.loaded = []
+
+    def load(self, signals):
+        self.loaded.append([signal.metadata["__name__"] for signal in signals])
+        store = SignalStore()
+        for position, _ in enumerate(signals):
+            store.append(np.arange(10, dtype=np.float64), np.full(10, float(position)))
+        return store
+
+
+def test_map_reduce_loads_samples():
+    # the signals are ingested without their samples (labels only), the extract in map_reduce reads them
+    build_config(config1.replace("      subtype: tsfel\n", "      subtype: statistical\n"))
+    p = Pipeline()
+    p.build_pipeline()
+    stage = next(stage for stage in p.stage_execution_order if stage.base_stage.name == "stage2")
+
+    loader = RecordingSampleLoader()
+    signals = Signals(metadata={}, store=SignalStore())
+    signals.store.sample_loader = loader
+    empty = np.empty(0, dtype=np.float64)
+    for index in range(6):
+        signals.append_time_series("metric", {"__name__": f"metric_{index}"}, empty, empty)
+
+    output_data = run_stage([stage, [signals]])
+
+    # the samples are loaded once, before the signals are split into partitions
+    assert loader.loaded == [[f"metric_{index}" for index in range(6)]]
+    extracted_signals = output_data[0]
+    assert len(extracted_signals) == 6
+    matrix, _ = extracted_signals.features_matrix(["value_Max"])
+    np.testing.assert_array_equal(matrix[:, 0], np.arange(6))
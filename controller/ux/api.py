@@ -16,6 +16,7 @@ import logging
 import os
 
 from flask import Blueprint
+from extract.feature_cache import get_statistics
 from ux.utils import fill_time_series, fill_insights
 from workflow_orchestration.pipeline import Pipeline
 
@@ -89,3 +90,36 @@ def _rerun():
         logger.error(f"An error occurred: {e}")
         response = {"error": str(e)}
         return response, 500
+
+
+@api.route(f'{api_prefix}feature_cache', methods=['GET'])
+def _feature_cache():
+    """
+    Feature cache statistics
+    ---
+    summary: Returns the counters of the feature cache of the extract stages.
+    description: Number of signals whose features were found in the feature cache (hits), extracted (misses)
+      and evicted from the cache, since the controller started and for the last extract stage.
+    tags:
+      - Pipeline
+    responses:
+      200:
+        description: Feature cache counters.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                hits:
+                  type: integer
+                  example: 19500
+                misses:
+                  type: integer
+                  example: 500
+                evictions:
+                  type: integer
+                  example: 0
+                last_run:
+                  type: object
+    """
+    return get_statistics(), 200
@@ -63,10 +63,10 @@ def _visualize():
     # Plot selected time series
     for series_name in selected_series:
         if series_name in get_time_series():
-            time_stamps, data = zip(*get_time_series()[series_name])
+            signal = get_time_series()[series_name]
             dates = [datetime.fromtimestamp(timestamp)
-                     for timestamp in time_stamps]
-            points = [float(point) for point in data]
+                     for timestamp in signal.timestamps.tolist()]
+            points = signal.values
             plt.plot_date(x=dates, y=points, linestyle='solid',
                           linewidth=1, label=series_name, marker='o')
         else:
@@ -25,7 +25,8 @@ def fill_time_series(extracted_signals):
     time_series = {}
     for extracted_signal in extracted_signals:
         time_series_name = extracted_signal.metadata["__name__"]
-        time_series[time_series_name] = extracted_signal.time_series
+        # keep the signal itself, samples are read from its columnar store when plotted
+        time_series[time_series_name] = extracted_signal
 
 
 def get_time_series():
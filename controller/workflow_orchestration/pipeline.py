@@ -22,13 +22,15 @@ import time
 
 import common.configuration_api as api
 from common.conf import get_configuration
+from common.signal import Signals
 from multiprocessing import Pool
 
 from config_generator.config_generator import config_generator
 from encode.encode import encode
 from extract.extract import extract
+from extract.features_config import load_features_config, select_features, used_features
 from ingest.ingest import ingest
-from insights.insights import generate_insights
+from insights.insights import generate_insights, required_features
 from map_reduce.map import _map
 from map_reduce.reduce import reduce
 from metadata_classification.metadata_classification import metadata_classification
@@ -41,6 +43,23 @@ logger = logging.getLogger(__name__)
 # TODO: refactor to get rid of this global variable
 process_pool = None
 
+# stages that read the samples of their input signals (the other stages only need the labels)
+SAMPLE_STAGE_TYPES = (api.StageType.EXTRACT.value, api.StageType.INSIGHTS.value, api.StageType.ENCODE.value)
+
+# extract subtypes computing the features of a tsfel features configuration, limited by the pipeline
+# to the features read by the following insights stages (see `prune_extract_features`)
+FEATURE_EXTRACT_CONFIGS = {
+    api.ExtractSubType.PIPELINE_EXTRACT_TSFEL.value: api.FeatureExtractionTsfel,
+    api.ExtractSubType.PIPELINE_EXTRACT_STATISTICAL.value: api.FeatureExtractionStatistical,
+    api.ExtractSubType.PIPELINE_EXTRACT_ONLINE.value: api.FeatureExtractionOnline,
+}
+
+# stages that do not read the extracted features of their input signals
+FEATURELESS_STAGE_TYPES = (api.StageType.CONFIG_GENERATOR.value,)
+
+# stages passing their input signals (and their extracted features) through to their output
+PASS_THROUGH_STAGE_TYPES = (api.StageType.METADATA_CLASSIFICATION.value,)
+
 
 class Pipeline:
     def __init__(self):
@@ -85,6 +104,11 @@ class Pipeline:
             stages_params_dict[stg.base_stage.name] = stg
             if stg.base_stage.type == api.StageType.MAP_REDUCE.value:
                 map_reduce_stage_exists = True
+                # the workers of the partitions would overwrite each other's accumulators
+                subtype, config = extract_function(stg.base_stage)
+                if subtype == api.ExtractSubType.PIPELINE_EXTRACT_ONLINE.value and config.get("state_directory"):
+                    raise Exception(
+                        f"stage {stg.base_stage.name}: the online extract can not keep a state_directory in map_reduce")
         logger.info(f"stages = {stages_params_dict}")
 
         # Parse pipeline sections to create connections
@@ -136,6 +160,8 @@ class Pipeline:
         for stage in stages_params_dict.values():
             self.add_stage_to_schedule(stage)
 
+        prune_extract_features(list(stages_params_dict.values()))
+
         global_settings = api.GlobalSettings(**pipeline_def.global_settings)
 
         # allocate process pool for map_reduce
@@ -162,7 +188,8 @@ class Pipeline:
 
         if stage.base_stage.type == api.StageType.INGEST.value:
             self.signals = output_data[0]
-            if stage.base_stage.subtype == api.IngestSubType.PIPELINE_INGEST_SERIALIZED.value:
+            if stage.base_stage.subtype in (api.IngestSubType.PIPELINE_INGEST_SERIALIZED.value,
+                                            api.IngestSubType.PIPELINE_INGEST_COLUMNAR.value):
                 self.extracted_signals = output_data[0]
         elif stage.base_stage.type == api.StageType.METADATA_CLASSIFICATION.value:
             self.classified_signals = output_data[0]
@@ -203,6 +230,96 @@ class Pipeline:
             self.run_stage_wrapper(args)
 
 
+def extract_function(base_stage):
+    # (subtype, config) of the extract run by a stage: the stage itself or the compute function of a map_reduce;
+    # the config is the dict used to run the stage (an empty config is set to {})
+    if base_stage.type == api.StageType.EXTRACT.value:
+        subtype, config = base_stage.subtype, base_stage.config
+    else:
+        compute_function = (base_stage.config or {}).get("compute_function") or {}
+        if base_stage.type != api.StageType.MAP_REDUCE.value or \
+                compute_function.get("type") != api.StageType.EXTRACT.value:
+            return None, None
+        subtype, config = compute_function.get("subtype"), compute_function.get("config")
+    if config is None:
+        config = {}
+        set_extract_config(base_stage, config)
+    return subtype, config
+
+
+def set_extract_config(base_stage, extract_config):
+    # run the extract of a stage (see `extract_function`) with `extract_config`; the dicts of the stage are
+    # replaced, not modified, as they may be shared with the configuration the stage was built from
+    if base_stage.type == api.StageType.EXTRACT.value:
+        base_stage.config = extract_config
+    else:
+        compute_function = dict(base_stage.config["compute_function"], config=extract_config)
+        base_stage.config = dict(base_stage.config, compute_function=compute_function)
+
+
+def reads_samples(base_stage):
+    # the stage reads the samples of its input signals, itself or through the compute function of a map_reduce
+    # (loaded once before the signals are split into partitions)
+    if base_stage.type == api.StageType.MAP_REDUCE.value:
+        compute_function = (base_stage.config or {}).get("compute_function") or {}
+        return compute_function.get("type") in SAMPLE_STAGE_TYPES
+    return base_stage.type in SAMPLE_STAGE_TYPES
+
+
+def consumers_features(output_data, stages, visited=()):
+    """
+    Features read from the signals of `output_data` by the stages using them, following the outputs of the stages
+    passing their signals through to the stages using these in turn. None when all the features may be read: the
+    signals are used by other stages, by an analysis reading all the features, by no stage or the stages form a cycle.
+    """
+    consumers = [other.base_stage for other in stages if set(other.base_stage.input_data or []) & set(output_data)]
+    if not consumers:
+        return None
+    features = set()
+    for consumer in consumers:
+        if consumer.type == api.StageType.INSIGHTS.value:
+            consumer_features = required_features(consumer.config or {})
+        elif consumer.type in FEATURELESS_STAGE_TYPES:
+            consumer_features = set()
+        elif consumer.type in PASS_THROUGH_STAGE_TYPES and consumer.name not in visited:
+            consumer_features = consumers_features(consumer.output_data or [], stages, (*visited, consumer.name))
+        else:
+            consumer_features = None
+        if consumer_features is None:
+            return None
+        features |= consumer_features
+    return features
+
+
+def prune_extract_features(stages):
+    """
+    Let each extract stage only extract the features read by the stages using its output (see `consumers_features`):
+    the features read by the analysis chains of the insights stages (see `required_features`), also through stages
+    passing the signals through (e.g. metadata classification). Extract stages whose output is used by other stages
+    (besides the stages reading labels only), by an analysis reading all the features (e.g. pairwise correlations),
+    or configured with `prune_features: false` or `features` extract all their features.
+    """
+    for stage in stages:
+        subtype, config = extract_function(stage.base_stage)
+        config_class = FEATURE_EXTRACT_CONFIGS.get(subtype)
+        if config_class is None:
+            continue
+        typed_config = config_class(**config)
+        if not typed_config.prune_features or typed_config.features is not None:
+            continue
+        features = consumers_features(stage.base_stage.output_data or [], stages, (stage.base_stage.name,))
+        if features is None:
+            continue
+
+        set_extract_config(stage.base_stage, dict(config, features=sorted(features)))
+        features_config = load_features_config(typed_config.features_json_file)
+        extracted = len(used_features(select_features(features_config, features)))
+        skipped = len(used_features(features_config)) - extracted
+        logger.info(f"stage {stage.base_stage.name} extracts the {extracted} features read by the following stages, "
+                    f"{skipped} features of {typed_config.features_json_file} skipped "
+                    f"(prune_features: false extracts all the features)")
+
+
 def map_reduce(config, input_data):
     # verify config parameters structure
     logger.debug("running map_reduce")
@@ -332,6 +449,11 @@ def run_stage(args):
             if found:
                 return signals_out
     logger.info(f"running stage: {stage.base_stage.name}, len(input_data) = {len(input_data)}")
+    if reads_samples(stage.base_stage):
+        # signals ingested without their samples get them now, for the signals left after filtering only
+        for data in input_data:
+            if isinstance(data, Signals):
+                data.load_samples()
     start_time = time.time()
     logger.debug(f"stage = {stage}, input = {input_data}")
     if stage.base_stage.type == api.StageType.INGEST.value: